@@ -6,21 +6,50 @@ import subprocess
 from pathlib import Path
 
 
-def run(cmd: list[str]) -> None:
-    subprocess.run(cmd, check=True)
+def run(cmd: list[str], cwd: Path | None = None) -> None:
+    subprocess.run(cmd, check=True, cwd=cwd)
+
+
+def speedcheck_cmd(args: argparse.Namespace, *extra: str) -> list[str]:
+    cmd = [
+        args.python,
+        "-m",
+        "app.utils.speedcheck",
+        "--samples",
+        str(args.bench_samples),
+        "--repeat",
+        str(args.bench_repeat),
+        "--threshold",
+        str(args.bench_threshold),
+    ]
+    if args.baseline_dir:
+        cmd.extend(["--baseline-dir", args.baseline_dir])
+    if args.allow_missing_baseline:
+        cmd.append("--allow-missing")
+    cmd.extend(extra)
+    return cmd
 
 
 def deploy(args: argparse.Namespace) -> None:
     target_path = Path(args.path).expanduser().resolve()
     source_path = Path(args.source).expanduser().resolve()
+    backup = target_path.with_suffix(".bak")
     if target_path.exists():
-        backup = target_path.with_suffix(".bak")
         if backup.exists():
             shutil.rmtree(backup)
         shutil.move(target_path, backup)
     shutil.copytree(source_path, target_path)
-    run([args.python, "-m", "pip", "install", "-r", str(target_path / "requirements.txt")])
-    run([args.python, "-m", "pytest", str(target_path / "tests")])
+    try:
+        run([args.python, "-m", "pip", "install", "-r", str(target_path / "requirements.txt")])
+        run([args.python, "-m", "pytest", str(target_path / "tests")])
+        if not args.skip_bench:
+            run(speedcheck_cmd(args, "--compare"), cwd=target_path)
+    except subprocess.CalledProcessError:
+        # the gate failed: put the running release back so a later restart does not pick this one up
+        if backup.exists():
+            shutil.rmtree(target_path)
+            shutil.move(backup, target_path)
+        raise
     run(["systemctl", "restart", args.service])
 
 
@@ -45,7 +74,26 @@ def logs(args: argparse.Namespace) -> None:
 def check(args: argparse.Namespace) -> None:
     run([args.python, "-m", "pip", "install", "-r", "requirements.txt"])
     run([args.python, "-m", "pytest", "tests"])
-    run([args.python, "-m", "app.utils.speedcheck"])
+    run(speedcheck_cmd(args, "--compare"))
+
+
+def bench_baseline(args: argparse.Namespace) -> None:
+    run(speedcheck_cmd(args, "--save"))
+
+
+def bench_compare(args: argparse.Namespace) -> None:
+    run(speedcheck_cmd(args, "--compare"))
+
+
+def add_bench_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--python", default="python3")
+    parser.add_argument("--baseline-dir", default=None)
+    parser.add_argument("--bench-samples", type=int, default=2000)
+    parser.add_argument("--bench-repeat", type=int, default=5)
+    parser.add_argument("--bench-threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--allow-missing-baseline", action="store_true", help="do not fail the comparison on a host with no baseline"
+    )
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -56,7 +104,8 @@ def build_parser() -> argparse.ArgumentParser:
     deploy_parser = sub.add_parser("deploy")
     deploy_parser.add_argument("--path", required=True)
     deploy_parser.add_argument("--source", default=".")
-    deploy_parser.add_argument("--python", default="python3")
+    deploy_parser.add_argument("--skip-bench", action="store_true")
+    add_bench_options(deploy_parser)
     deploy_parser.set_defaults(func=deploy)
 
     rollback_parser = sub.add_parser("rollback")
@@ -70,9 +119,17 @@ def build_parser() -> argparse.ArgumentParser:
     logs_parser.set_defaults(func=logs)
 
     check_parser = sub.add_parser("check")
-    check_parser.add_argument("--python", default="python3")
+    add_bench_options(check_parser)
     check_parser.set_defaults(func=check)
 
+    baseline_parser = sub.add_parser("bench-baseline")
+    add_bench_options(baseline_parser)
+    baseline_parser.set_defaults(func=bench_baseline)
+
+    compare_parser = sub.add_parser("bench-compare")
+    add_bench_options(compare_parser)
+    compare_parser.set_defaults(func=bench_compare)
+
     return parser
 
 
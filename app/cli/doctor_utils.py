@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any
+
 
 def mask_secret(value: str, visible: int = 4) -> str:
     if not value:
@@ -13,3 +15,21 @@ def parse_sqlite_path(db_url: str) -> str:
     if db_url.startswith("sqlite:///"):
         return db_url.replace("sqlite:///", "", 1)
     return db_url
+
+
+def summarize_api_telemetry(telemetry: dict[str, Any]) -> list[dict[str, Any]]:
+    rows = []
+    for method, entry in sorted(telemetry.items(), key=lambda item: -item[1].get("calls", 0)):
+        attempts = entry.get("remote", {}).get("count", 0)
+        rows.append(
+            {
+                "method": method,
+                "calls": entry.get("calls", 0),
+                "retries": entry.get("retries", 0),
+                "error_rate": entry.get("errors", 0) / attempts if attempts else 0.0,
+                "remote_p99_ms": entry.get("remote", {}).get("p99_ms", 0.0),
+                "limiter_avg_ms": entry.get("limiter_wait", {}).get("avg_ms", 0.0),
+                "limiter_share": entry.get("limiter_share", 0.0),
+            }
+        )
+    return rows
@@ -18,7 +18,7 @@ from rich.table import Table
 from rich.text import Text
 
 from install import render_env
-from app.cli.doctor_utils import mask_secret, parse_sqlite_path
+from app.cli.doctor_utils import mask_secret, parse_sqlite_path, summarize_api_telemetry
 
 app = typer.Typer(help="Rubika Bot control CLI", rich_markup_mode=None)
 console = Console()
@@ -623,6 +623,32 @@ def doctor(
         except httpx.RequestError as exc:
             _add_warning(checks, section, "Queue Status", str(exc), "Ensure app is running")
 
+        try:
+            response = httpx.get(f"http://127.0.0.1:{port}/health/api", timeout=5)
+            if response.status_code == 200:
+                for row in summarize_api_telemetry(response.json().get("telemetry", {})):
+                    detail = (
+                        f"calls {row['calls']}, retries {row['retries']}, errors {row['error_rate']:.1%}, "
+                        f"remote p99 {row['remote_p99_ms']:.0f}ms, limiter avg {row['limiter_avg_ms']:.0f}ms "
+                        f"({row['limiter_share']:.0%} of outbound time)"
+                    )
+                    if row["error_rate"] > 0.05:
+                        _add_warning(
+                            checks, section, f"API {row['method']}", detail, "Check Rubika API status and Retry-After"
+                        )
+                    elif row["limiter_share"] > 0.5:
+                        _add_warning(
+                            checks,
+                            section,
+                            f"API {row['method']}",
+                            detail,
+                            "Most time is spent in our own limiter; review RUBIKA_API_*_RATE_LIMIT settings",
+                        )
+                    else:
+                        _add_check(checks, section, True, f"API {row['method']}", detail)
+        except httpx.RequestError as exc:
+            _add_warning(checks, section, "API Telemetry", str(exc), "Ensure app is running")
+
     section = "F) SQLite Database"
 
     if skip_db:
@@ -17,13 +17,68 @@ class Settings(BaseSettings):
     api_retry_attempts: int = Field(default=3, env="RUBIKA_API_RETRY_ATTEMPTS")
     api_retry_backoff: float = Field(default=0.5, env="RUBIKA_API_RETRY_BACKOFF")
     api_rate_limit_per_second: int = Field(default=20, env="RUBIKA_API_RATE_LIMIT_PER_SECOND")
+    api_method_burst: int = Field(default=5, env="RUBIKA_API_METHOD_BURST")
+    api_method_rate_limits: dict[str, float] = Field(default_factory=dict, env="RUBIKA_API_METHOD_RATE_LIMITS")
+    api_global_rate_limit_per_second: float = Field(default=30.0, env="RUBIKA_API_GLOBAL_RATE_LIMIT_PER_SECOND")
+    api_global_burst: int = Field(default=10, env="RUBIKA_API_GLOBAL_BURST")
+    api_chat_rate_limit_per_second: float = Field(default=0.0, env="RUBIKA_API_CHAT_RATE_LIMIT_PER_SECOND")
+    api_chat_burst: int = Field(default=5, env="RUBIKA_API_CHAT_BURST")
+    api_chat_idle_seconds: float = Field(default=60.0, env="RUBIKA_API_CHAT_IDLE_SECONDS")
+    api_chat_max_buckets: int = Field(default=10000, env="RUBIKA_API_CHAT_MAX_BUCKETS")
+    api_adaptive_enabled: bool = Field(default=True, env="RUBIKA_API_ADAPTIVE_ENABLED")
+    api_adaptive_min_rate_per_second: float = Field(default=1.0, env="RUBIKA_API_ADAPTIVE_MIN_RATE_PER_SECOND")
+    api_max_concurrency_per_method: int = Field(default=8, env="RUBIKA_API_MAX_CONCURRENCY_PER_METHOD")
+    api_retry_budget_ratio: float = Field(default=0.2, env="RUBIKA_API_RETRY_BUDGET_RATIO")
+    api_retry_budget_min_per_second: float = Field(default=2.0, env="RUBIKA_API_RETRY_BUDGET_MIN_PER_SECOND")
+    api_retry_after_max_seconds: float = Field(default=60.0, env="RUBIKA_API_RETRY_AFTER_MAX_SECONDS")
+    api_outbound_max_pending: dict[str, int] = Field(default_factory=dict, env="RUBIKA_API_OUTBOUND_MAX_PENDING")
+    api_outbound_deadlines: dict[str, float] = Field(default_factory=dict, env="RUBIKA_API_OUTBOUND_DEADLINES")
+    api_coalesce_window_ms: int = Field(default=0, env="RUBIKA_API_COALESCE_WINDOW_MS")
+    api_max_text_length: int = Field(default=4096, env="RUBIKA_API_MAX_TEXT_LENGTH")
+    api_read_cache_size: int = Field(default=4096, env="RUBIKA_API_READ_CACHE_SIZE")
+    api_read_cache_ttls: dict[str, int] = Field(default_factory=dict, env="RUBIKA_API_READ_CACHE_TTLS")
+    api_pool_max_connections: int = Field(default=32, env="RUBIKA_API_POOL_MAX_CONNECTIONS")
+    api_pool_max_keepalive: int = Field(default=32, env="RUBIKA_API_POOL_MAX_KEEPALIVE")
+    api_pool_keepalive_expiry_seconds: float = Field(default=30.0, env="RUBIKA_API_POOL_KEEPALIVE_EXPIRY_SECONDS")
+    api_http2: bool = Field(default=False, env="RUBIKA_API_HTTP2")
+    api_prewarm_connections: int = Field(default=4, env="RUBIKA_API_PREWARM_CONNECTIONS")
+    db_busy_timeout_ms: int = Field(default=3000, env="RUBIKA_DB_BUSY_TIMEOUT_MS")
+    db_synchronous: str = Field(default="NORMAL", env="RUBIKA_DB_SYNCHRONOUS")
+    db_cache_size_kb: int = Field(default=20000, env="RUBIKA_DB_CACHE_SIZE_KB")
+    db_wal_autocheckpoint: int = Field(default=1000, env="RUBIKA_DB_WAL_AUTOCHECKPOINT")
+    db_journal_size_limit: int = Field(default=64 * 1024 * 1024, env="RUBIKA_DB_JOURNAL_SIZE_LIMIT")
+    moderation_action_timeouts: dict[str, float] = Field(default_factory=dict, env="RUBIKA_MODERATION_ACTION_TIMEOUTS")
+    bulk_delete_concurrency: int = Field(default=8, env="RUBIKA_BULK_DELETE_CONCURRENCY")
+    outbox_enabled: bool = Field(default=True, env="RUBIKA_OUTBOX_ENABLED")
+    outbox_max_age_seconds: float = Field(default=3600.0, env="RUBIKA_OUTBOX_MAX_AGE_SECONDS")
+    outbox_batch_size: int = Field(default=50, env="RUBIKA_OUTBOX_BATCH_SIZE")
+    outbox_rate_per_second: float = Field(default=5.0, env="RUBIKA_OUTBOX_RATE_PER_SECOND")
+    outbox_interval_seconds: float = Field(default=10.0, env="RUBIKA_OUTBOX_INTERVAL_SECONDS")
     webhook_base_url: str | None = Field(default=None, env="RUBIKA_WEBHOOK_BASE_URL")
     log_level: str = Field(default="INFO", env="RUBIKA_LOG_LEVEL")
     log_file: str = Field(default="/var/log/rubika-bot/app.log", env="RUBIKA_LOG_FILE")
     worker_concurrency: int = Field(default=4, env="RUBIKA_WORKER_CONCURRENCY")
     queue_max_size: int = Field(default=1000, env="RUBIKA_QUEUE_MAX_SIZE")
     queue_full_policy: str = Field(default="reject", env="RUBIKA_QUEUE_FULL_POLICY")
+    queue_backend: str = Field(default="memory", env="RUBIKA_QUEUE_BACKEND")
+    queue_visibility_seconds: float = Field(default=60.0, env="RUBIKA_QUEUE_VISIBILITY_SECONDS")
+    queue_max_attempts: int = Field(default=5, env="RUBIKA_QUEUE_MAX_ATTEMPTS")
+    queue_poll_ms: float = Field(default=50.0, env="RUBIKA_QUEUE_POLL_MS")
+    process_role: str = Field(default="all", env="RUBIKA_PROCESS_ROLE")
+    worker_processes: int = Field(default=1, env="RUBIKA_WORKER_PROCESSES")
+    shared_state_path: str = Field(default="", env="RUBIKA_SHARED_STATE_PATH")
+    shared_state_slots: int = Field(default=65536, env="RUBIKA_SHARED_STATE_SLOTS")
+    queue_spill_dir: str = Field(default="data/spill", env="RUBIKA_QUEUE_SPILL_DIR")
+    queue_spill_segment_bytes: int = Field(default=8 * 1024 * 1024, env="RUBIKA_QUEUE_SPILL_SEGMENT_BYTES")
+    queue_spill_max_bytes: int = Field(default=512 * 1024 * 1024, env="RUBIKA_QUEUE_SPILL_MAX_BYTES")
+    admission_enabled: bool = Field(default=True, env="RUBIKA_ADMISSION_ENABLED")
+    admission_target_ms: float = Field(default=500.0, env="RUBIKA_ADMISSION_TARGET_MS")
+    admission_interval_ms: float = Field(default=2000.0, env="RUBIKA_ADMISSION_INTERVAL_MS")
     rate_limit_per_minute: int = Field(default=120, env="RUBIKA_RATE_LIMIT_PER_MINUTE")
+    ingress_keyed_limits: bool = Field(default=True, env="RUBIKA_INGRESS_KEYED_LIMITS")
+    ingress_chat_per_minute: float = Field(default=60.0, env="RUBIKA_INGRESS_CHAT_PER_MINUTE")
+    ingress_sender_per_minute: float = Field(default=30.0, env="RUBIKA_INGRESS_SENDER_PER_MINUTE")
+    ingress_burst: int = Field(default=10, env="RUBIKA_INGRESS_BURST")
     dedup_ttl_seconds: int = Field(default=120, env="RUBIKA_DEDUP_TTL_SECONDS")
     settings_cache_ttl_seconds: int = Field(default=90, env="RUBIKA_SETTINGS_CACHE_TTL_SECONDS")
     settings_cache_size: int = Field(default=1024, env="RUBIKA_SETTINGS_CACHE_SIZE")
@@ -32,6 +87,10 @@ class Settings(BaseSettings):
     incoming_updates_retention_hours: int = Field(default=48, env="RUBIKA_INCOMING_UPDATES_RETENTION_HOURS")
     messages_keep_per_chat: int = Field(default=10000, env="RUBIKA_MESSAGES_KEEP_PER_CHAT")
     register_webhook: bool = Field(default=True, env="RUBIKA_REGISTER_WEBHOOK")
+    polling_enabled: bool = Field(default=False, env="RUBIKA_POLLING_ENABLED")
+    polling_catch_up: bool = Field(default=False, env="RUBIKA_POLLING_CATCH_UP")
+    polling_max_batch: int = Field(default=100, env="RUBIKA_POLLING_MAX_BATCH")
+    polling_idle_seconds: float = Field(default=1.0, env="RUBIKA_POLLING_IDLE_SECONDS")
     panel_enabled: bool = Field(default=True, env="RUBIKA_PANEL_ENABLED")
 
     class Config:
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class AdmissionStats:
+    shed: int = 0
+    shedding_episodes: int = 0
+    last_sojourn_ms: float = 0.0
+    max_sojourn_ms: float = 0.0
+
+
+class CoDelAdmission:
+    """Sheds normal-priority jobs at enqueue once queue delay has stayed above target for an interval.
+
+    Sojourn time is observed when workers dequeue. As in CoDel, a burst that drains within one
+    interval is left alone; only a standing queue, where even the best delay over the interval is
+    above target, switches shedding on. It switches off on the first dequeue under target or when
+    the queue runs empty. High-priority jobs (admin commands, links) are never shed here.
+    """
+
+    def __init__(self, *, target_ms: float = 500.0, interval_ms: float = 2000.0, max_retry_after: int = 60) -> None:
+        self.target_s = target_ms / 1000
+        self.interval_s = interval_ms / 1000
+        self.max_retry_after = max_retry_after
+        self.shedding = False
+        self.stats = AdmissionStats()
+        self._first_above_at = 0.0
+        self._sojourn_s = 0.0
+
+    def observe(self, sojourn_s: float, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._sojourn_s = sojourn_s
+        self.stats.last_sojourn_ms = sojourn_s * 1000
+        self.stats.max_sojourn_ms = max(self.stats.max_sojourn_ms, self.stats.last_sojourn_ms)
+        if sojourn_s < self.target_s:
+            self.reset()
+            return
+        if not self._first_above_at:
+            self._first_above_at = now + self.interval_s
+        elif now >= self._first_above_at and not self.shedding:
+            self.shedding = True
+            self.stats.shedding_episodes += 1
+
+    def reset(self) -> None:
+        self._first_above_at = 0.0
+        self.shedding = False
+
+    def admit(self, priority: str) -> bool:
+        if not self.shedding or priority == "high":
+            return True
+        self.stats.shed += 1
+        return False
+
+    @property
+    def retry_after_seconds(self) -> int:
+        # the standing delay is roughly how long the backlog needs to drain back under target
+        return max(1, min(self.max_retry_after, math.ceil(self._sojourn_s)))
+
+    def stats_dict(self) -> dict[str, object]:
+        return {
+            "shedding": self.shedding,
+            "target_ms": self.target_s * 1000,
+            "interval_ms": self.interval_s * 1000,
+            "retry_after_seconds": self.retry_after_seconds if self.shedding else 0,
+            "shed": self.stats.shed,
+            "shedding_episodes": self.stats.shedding_episodes,
+            "last_sojourn_ms": self.stats.last_sojourn_ms,
+            "max_sojourn_ms": self.stats.max_sojourn_ms,
+        }
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+SendText = Callable[[str], Awaitable[dict[str, Any]]]
+SendPayload = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+@dataclass
+class CoalesceStats:
+    texts: int = 0
+    text_calls: int = 0
+    edits: int = 0
+    edit_calls: int = 0
+
+    @property
+    def calls_saved(self) -> int:
+        return self.texts - self.text_calls + self.edits - self.edit_calls
+
+
+@dataclass
+class _Batch:
+    send: Callable[[Any], Awaitable[dict[str, Any]]]
+    value: Any
+    length: int = 0
+    futures: list[asyncio.Future[dict[str, Any]]] = field(default_factory=list)
+
+
+class OutboundCoalescer:
+    """Holds sends for ``window_seconds``: texts to one chat are joined, edits of one message keep only the last."""
+
+    def __init__(self, window_seconds: float, *, max_text_length: int = 4096, separator: str = "\n") -> None:
+        self.window_seconds = window_seconds
+        self.max_text_length = max_text_length
+        self.separator = separator
+        self.stats = CoalesceStats()
+        self._batches: dict[Hashable, _Batch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def send_text(self, key: Hashable, text: str, send: SendText) -> dict[str, Any]:
+        self.stats.texts += 1
+        batch = self._batches.get(("text", key))
+        if batch is not None and batch.length + len(self.separator) + len(text) > self.max_text_length:
+            self._flush_now(("text", key))
+            batch = None
+        if len(text) >= self.max_text_length:
+            self.stats.text_calls += 1
+            return await send(text)
+        if batch is None:
+            batch = self._open(("text", key), send, [])
+            batch.length = len(text)
+        else:
+            batch.length += len(self.separator) + len(text)
+        batch.value.append(text)
+        return await self._join(batch)
+
+    async def edit(self, key: Hashable, payload: dict[str, Any], send: SendPayload) -> dict[str, Any]:
+        self.stats.edits += 1
+        batch = self._batches.get(("edit", key))
+        if batch is None:
+            batch = self._open(("edit", key), send, payload)
+        else:
+            batch.send = send
+            batch.value = payload
+        return await self._join(batch)
+
+    async def flush(self) -> None:
+        for key in list(self._batches):
+            self._flush_now(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _open(self, key: Hashable, send: Callable[[Any], Awaitable[dict[str, Any]]], value: Any) -> _Batch:
+        batch = _Batch(send=send, value=value)
+        self._batches[key] = batch
+        asyncio.get_running_loop().call_later(self.window_seconds, self._flush_now, key, batch)
+        return batch
+
+    async def _join(self, batch: _Batch) -> dict[str, Any]:
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        batch.futures.append(future)
+        return await future
+
+    def _flush_now(self, key: Hashable, expected: _Batch | None = None) -> None:
+        batch = self._batches.get(key)
+        if batch is None or (expected is not None and batch is not expected):
+            return
+        del self._batches[key]
+        task = asyncio.get_running_loop().create_task(self._deliver(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, key: Hashable, batch: _Batch) -> None:
+        if key[0] == "text":
+            self.stats.text_calls += 1
+            value = self.separator.join(batch.value)
+        else:
+            self.stats.edit_calls += 1
+            value = batch.value
+        try:
+            result = await batch.send(value)
+        except Exception as exc:  # noqa: BLE001
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future in batch.futures:
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.core.rate_limit import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+OUTBOUND_MODERATION = "moderation"
+OUTBOUND_INTERACTIVE = "interactive"
+OUTBOUND_BULK = "bulk"
+
+OUTBOUND_PRIORITIES = {
+    OUTBOUND_MODERATION: PRIORITY_HIGH,
+    OUTBOUND_INTERACTIVE: PRIORITY_NORMAL,
+    OUTBOUND_BULK: PRIORITY_LOW,
+}
+
+DEFAULT_MAX_PENDING = {
+    OUTBOUND_MODERATION: 2000,
+    OUTBOUND_INTERACTIVE: 1000,
+    OUTBOUND_BULK: 200,
+}
+
+# seconds a call may wait for capacity before it is dropped; moderation never goes stale
+DEFAULT_DEADLINES: dict[str, float | None] = {
+    OUTBOUND_MODERATION: None,
+    OUTBOUND_INTERACTIVE: 30.0,
+    OUTBOUND_BULK: 60.0,
+}
+
+
+@dataclass
+class OutboundClassStats:
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    expired: int = 0
+    pending: int = 0
+    max_pending: int = 0
+
+
+class OutboundScheduler:
+    """Admission in front of RubikaClient.api_call: maps a call class to a limiter priority,
+    bounds how many calls of each class may be pending and gives each class a deadline."""
+
+    def __init__(
+        self,
+        *,
+        max_pending: dict[str, int] | None = None,
+        deadlines: dict[str, float | None] | None = None,
+    ) -> None:
+        self.max_pending = {**DEFAULT_MAX_PENDING, **(max_pending or {})}
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self._stats = {name: OutboundClassStats() for name in OUTBOUND_PRIORITIES}
+
+    def _class_stats(self, outbound_class: str) -> OutboundClassStats:
+        if outbound_class not in self._stats:
+            raise ValueError(f"unknown outbound class: {outbound_class}")
+        return self._stats[outbound_class]
+
+    async def run(
+        self,
+        outbound_class: str,
+        method: str,
+        call: Callable[[int, float | None], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        stats = self._class_stats(outbound_class)
+        stats.submitted += 1
+        if stats.pending >= self.max_pending.get(outbound_class, 0):
+            stats.rejected += 1
+            return {
+                "ok": False,
+                "error": "outbound_queue_full",
+                "method": method,
+                "class": outbound_class,
+                "retryable": True,
+            }
+        timeout = self.deadlines.get(outbound_class)
+        deadline = time.monotonic() + timeout if timeout else None
+        stats.pending += 1
+        stats.max_pending = max(stats.max_pending, stats.pending)
+        try:
+            result = await call(OUTBOUND_PRIORITIES[outbound_class], deadline)
+        finally:
+            stats.pending -= 1
+        if result.get("error") == "deadline_exceeded":
+            stats.expired += 1
+        else:
+            stats.completed += 1
+        return result
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {
+                "pending": stats.pending,
+                "max_pending": stats.max_pending,
+                "limit": self.max_pending.get(name, 0),
+                "submitted": stats.submitted,
+                "completed": stats.completed,
+                "rejected": stats.rejected,
+                "expired": stats.expired,
+            }
+            for name, stats in self._stats.items()
+        }
@@ -4,15 +4,37 @@ import asyncio
 import contextvars
 import time
 from dataclasses import dataclass
-from typing import Any, Literal
+from typing import Any, Iterable, Literal, Protocol
 
+from app.core.admission import CoDelAdmission
+from app.core.spill import SpillLog
 from app.utils.dedup import Deduplicator
 from app.utils.stats import StatsCollector
 
-QueueDecision = Literal["enqueued", "duplicate", "dropped"]
+QueueDecision = Literal["enqueued", "duplicate", "dropped", "shed", "spilled"]
 JobPriority = Literal["high", "normal"]
 
 
+class QueueBackend(Protocol):
+    visibility_seconds: float
+
+    def put(self, jobs: list[Job], *, claimed: bool = False) -> list[int | None]: ...
+
+    def claim(self, limit: int) -> list[tuple[int, dict]]: ...
+
+    def ack(self, ids: Iterable[int]) -> None: ...
+
+    def extend(self, ids: Iterable[int]) -> None: ...
+
+    def release(self, ids: Iterable[int]) -> None: ...
+
+    def head_age(self) -> float | None: ...
+
+    def clear(self) -> int: ...
+
+    def counts(self) -> dict[str, int]: ...
+
+
 @dataclass
 class Job:
     job_id: str
@@ -25,6 +47,7 @@ class Job:
     raw_payload: dict[str, Any] | None = None
     dedup_key: str | None = None
     priority: JobPriority = "normal"
+    store_id: int | None = None
 
     @classmethod
     def build(
@@ -62,6 +85,13 @@ class JobQueue:
         deduplicator: Deduplicator,
         full_policy: str = "reject",
         stats: StatsCollector | None = None,
+        admission: CoDelAdmission | None = None,
+        spill: SpillLog | None = None,
+        backend: QueueBackend | None = None,
+        ack_batch: int = 32,
+        ack_interval_seconds: float = 0.05,
+        consumer: bool = True,
+        poll_seconds: float | None = None,
     ) -> None:
         self.high_queue: asyncio.Queue[Job | None] = asyncio.Queue()
         self.normal_queue: asyncio.Queue[Job | None] = asyncio.Queue()
@@ -72,6 +102,25 @@ class JobQueue:
         self.deduplicator = deduplicator
         self.full_policy = full_policy
         self.stats = stats
+        self.admission = admission
+        self.spill = spill
+        self.backend = backend
+        self.ack_batch = max(ack_batch, 1)
+        self.ack_interval_seconds = ack_interval_seconds
+        # consumer=False only writes to the backend: worker processes claim from it instead
+        self.consumer = consumer
+        # set when other processes write to the backend too, so it has to be polled for their jobs
+        self.poll_seconds = poll_seconds
+        self._acks: list[int] = []
+        self._in_flight: set[int] = set()
+        # assume a backlog until a claim comes back short: a restart may have left jobs behind
+        self._backlog = backend is not None
+        self._last_claim = 0.0
+        self._last_ack = time.monotonic()
+        self._last_extend = time.monotonic()
+        self._last_probe = 0.0
+        # jobs a previous run spilled are served before anything new arrives
+        self._refill_spill()
 
     @property
     def max_size(self) -> int:
@@ -87,25 +136,165 @@ class JobQueue:
     def size_by_priority(self) -> dict[str, int]:
         return {"high": self.high_queue.qsize(), "normal": self.normal_queue.qsize()}
 
-    async def enqueue(self, job: Job) -> QueueDecision:
+    def _probe_backlog(self) -> None:
+        # an ingest-only queue never dequeues, so it takes queue delay from the oldest job in the store
+        now = time.monotonic()
+        if self.consumer or self.admission is None or self.backend is None or now - self._last_probe < 0.25:
+            return
+        self._last_probe = now
+        age = self.backend.head_age()
+        if age is None:
+            self.admission.reset()
+        else:
+            self.admission.observe(age)
+
+    def is_duplicate(self, job: Job) -> bool:
+        """True when the job was already accepted, without accepting it; counted like a duplicate enqueue."""
+        if not self.deduplicator.contains(job.dedup_key or job.job_id):
+            return False
+        if self.stats:
+            self.stats.record_dedup()
+        return True
+
+    async def enqueue(self, job: Job, *, shed: bool = True) -> QueueDecision:
+        self._probe_backlog()
+        # before dedup, so a shed update that the sender retries is not taken for a duplicate
+        if shed and self.admission is not None and not self.admission.admit(job.priority):
+            return "shed"
         if self.deduplicator.seen(job.dedup_key or job.job_id):
             if self.stats:
                 self.stats.record_dedup()
             return "duplicate"
         async with self._lock:
-            if self._size >= self.max_size:
-                if self.full_policy == "drop_oldest":
-                    await self._drop_oldest()
-                else:
-                    if self.stats:
-                        self.stats.record_drop()
-                    return "dropped"
-            await self._put(job)
-            self._size += 1
+            if self.backend is not None:
+                return (await self._persist([job]))[0]
+            return await self._place(job)
+
+    async def enqueue_many(self, jobs: list[Job]) -> list[QueueDecision]:
+        self._probe_backlog()
+        decisions: list[QueueDecision] = []
+        fresh: list[tuple[int, Job]] = []
+        for idx, job in enumerate(jobs):
+            if self.admission is not None and not self.admission.admit(job.priority):
+                decisions.append("shed")
+            elif self.deduplicator.seen(job.dedup_key or job.job_id):
+                if self.stats:
+                    self.stats.record_dedup()
+                decisions.append("duplicate")
+            else:
+                decisions.append("enqueued")
+                fresh.append((idx, job))
+        if not fresh:
+            return decisions
+        async with self._lock:
+            if self.backend is not None:
+                for (idx, _), decision in zip(fresh, await self._persist([job for _, job in fresh])):
+                    decisions[idx] = decision
+            else:
+                for idx, job in fresh:
+                    decisions[idx] = await self._place(job)
+        return decisions
+
+    async def _persist(self, jobs: list[Job]) -> list[QueueDecision]:
+        # with room in memory and nothing older waiting in the store, store them already claimed
+        direct = self.consumer and not self._backlog and len(jobs) <= self.max_size - self._size
+        decisions: list[QueueDecision] = []
+        for job, store_id in zip(jobs, self.backend.put(jobs, claimed=direct)):
+            if store_id is None:
+                if self.stats:
+                    self.stats.record_dedup()
+                decisions.append("duplicate")
+                continue
+            decisions.append("enqueued")
+            if direct:
+                job.store_id = store_id
+                self._in_flight.add(store_id)
+                await self._put(job)
+                self._size += 1
+            else:
+                self._backlog = True
             if self.stats:
                 self.stats.record_enqueue(self._size)
+        if not direct and self.consumer:
+            await self._refill()
+        return decisions
+
+    async def _place(self, job: Job) -> QueueDecision:
+        spill = self.spill
+        if spill is not None and spill.pending and self._size < self.max_size:
+            # catch up from disk first, so pending means memory is really full
+            self._refill_spill()
+        # while anything is spilled, normal jobs queue up behind it on disk to keep their order
+        if spill is not None and (self._size >= self.max_size or (spill.pending and job.priority != "high")):
+            if spill.append(job):
+                return "spilled"
+        if self._size >= self.max_size:
+            if self.full_policy == "drop_oldest":
+                await self._drop_oldest()
+            else:
+                if self.stats:
+                    self.stats.record_drop()
+                return "dropped"
+        await self._put(job)
+        self._size += 1
+        if self.stats:
+            self.stats.record_enqueue(self._size)
         return "enqueued"
 
+    async def _refill(self) -> None:
+        if self.backend is not None:
+            await self._claim()
+            return
+        self._refill_spill()
+
+    def _refill_spill(self) -> None:
+        while self.spill is not None and self.spill.pending and self._size < self.max_size:
+            fields = self.spill.pop()
+            if fields is None:
+                return
+            job = Job(**fields)
+            # the queues are unbounded, so this never has to wait
+            (self.high_queue if job.priority == "high" else self.normal_queue).put_nowait(job)
+            self._size += 1
+
+    async def _claim(self) -> None:
+        now = time.monotonic()
+        free = self.max_size - self._size
+        # claim in batches; a quiet period re-checks for claims that other processes let expire
+        batch = max(1, min(64, self.max_size // 4))
+        stale = now - self._last_claim >= self._recheck_seconds
+        if free > 0 and (stale or (self._backlog and (free >= batch or self._size == 0))):
+            rows = self.backend.claim(free)
+            self._last_claim = now
+            self._backlog = len(rows) == free
+            for store_id, fields in rows:
+                job = Job(**{**fields, "store_id": store_id})
+                self._in_flight.add(store_id)
+                await self._put(job)
+                self._size += 1
+        if self._in_flight and now - self._last_extend >= self.backend.visibility_seconds / 3:
+            self.backend.extend(self._in_flight)
+            self._last_extend = now
+
+    @property
+    def _recheck_seconds(self) -> float:
+        return self.poll_seconds if self.poll_seconds is not None else self.backend.visibility_seconds
+
+    def flush_acks(self) -> None:
+        if self._acks and self.backend is not None:
+            self.backend.ack(self._acks)
+            self._acks = []
+        self._last_ack = time.monotonic()
+
+    def close(self) -> None:
+        self.flush_acks()
+        if self._in_flight and self.backend is not None:
+            # claimed but never started: hand them straight back instead of waiting out the visibility timeout
+            self.backend.release(self._in_flight)
+            self._in_flight.clear()
+        if self.spill is not None:
+            self.spill.close()
+
     async def _drop_oldest(self) -> None:
         try:
             if not self.normal_queue.empty():
@@ -121,34 +310,56 @@ class JobQueue:
             self.stats.record_drop()
 
     async def get(self) -> Job | None:
-        if not self.high_queue.empty():
-            job = await self.high_queue.get()
-            self._last_queue.set("high")
-        elif not self.normal_queue.empty():
-            job = await self.normal_queue.get()
-            self._last_queue.set("normal")
-        else:
+        while True:
+            if self.consumer and self.high_queue.empty() and self.normal_queue.empty():
+                await self._refill()
+            if not self.high_queue.empty():
+                job = await self.high_queue.get()
+                self._last_queue.set("high")
+                break
+            if not self.normal_queue.empty():
+                job = await self.normal_queue.get()
+                self._last_queue.set("normal")
+                break
+            if self.admission is not None:
+                self.admission.reset()
+            # going idle: do not leave acks waiting for the next job
+            self.flush_acks()
             high_task = asyncio.create_task(self.high_queue.get())
             normal_task = asyncio.create_task(self.normal_queue.get())
             done, pending = await asyncio.wait(
                 {high_task, normal_task},
+                timeout=self._recheck_seconds if self.backend is not None and self.consumer else None,
                 return_when=asyncio.FIRST_COMPLETED,
             )
             for task in pending:
                 task.cancel()
+            if not done:
+                # idle on a durable store: look again for new jobs or claims another process let expire
+                continue
             winner = next(iter(done))
             job = winner.result()
             if winner is high_task:
                 self._last_queue.set("high")
             else:
                 self._last_queue.set("normal")
+            break
         self._size = max(0, self._size - 1)
+        if job is not None and self.admission is not None:
+            self.admission.observe(time.time() - job.received_at)
+        # refilled before the caller's task_done, so join() cannot return while jobs wait on disk
+        await self._refill()
         return job
 
     async def put_raw(self, job: Job | None) -> None:
         await self.high_queue.put(job)
 
     def task_done(self, job: Job | None = None) -> None:
+        if job is not None and job.store_id is not None:
+            self._in_flight.discard(job.store_id)
+            self._acks.append(job.store_id)
+            if len(self._acks) >= self.ack_batch or time.monotonic() - self._last_ack >= self.ack_interval_seconds:
+                self.flush_acks()
         if job is None:
             queue_name = self._last_queue.get()
             if queue_name == "high":
@@ -188,4 +399,12 @@ class JobQueue:
             except asyncio.QueueEmpty:
                 break
         self._size = 0
-        return {"high": drained_high, "normal": drained_normal}
+        drained = {"high": drained_high, "normal": drained_normal}
+        if self.spill is not None:
+            drained["spilled"] = self.spill.clear()
+        if self.backend is not None:
+            self._in_flight.clear()
+            self._acks = []
+            self._backlog = False
+            drained["stored"] = self.backend.clear()
+        return drained
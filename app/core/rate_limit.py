@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Deque
+
+if TYPE_CHECKING:
+    from app.utils.shared_state import SharedStateTable, Values
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# how far into the LRU order a full chat-bucket table looks for one it can drop
+EVICT_SCAN = 64
+
+
+async def _wait(future: asyncio.Future[None], deadline: float | None) -> None:
+    if deadline is None:
+        await future
+    else:
+        await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+
+
+@dataclass
+class LimiterStats:
+    acquired: int = 0
+    waited: int = 0
+    cancelled: int = 0
+    total_wait_s: float = 0.0
+    max_wait_s: float = 0.0
+
+    def record(self, wait_s: float) -> None:
+        self.acquired += 1
+        if wait_s > 0:
+            self.waited += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_s / self.acquired * 1000 if self.acquired else 0.0
+
+
+class GcraBucket:
+    def __init__(self, rate_per_second: float, burst: int, key: str | None = None) -> None:
+        self.rate_per_second = max(rate_per_second, 0.1)
+        self.capacity = max(burst, 1)
+        self.interval = 1.0 / self.rate_per_second
+        self.tolerance = (self.capacity - 1) * self.interval
+        # a new bucket starts full; a TAT taken at creation would block a burst-1 bucket's first call
+        self.tat = 0.0
+        # where the TAT lives when it is kept in a SharedStateTable
+        self.key = key
+
+    def next_available(self, now: float) -> float:
+        return max(now, self.tat - self.tolerance)
+
+    def conforms(self, now: float) -> bool:
+        return self.tat - self.tolerance <= now
+
+    def consume(self, now: float) -> None:
+        self.tat = max(self.tat, now) + self.interval
+
+    def refund(self) -> None:
+        self.tat -= self.interval
+
+    def set_rate(self, rate_per_second: float) -> None:
+        self.rate_per_second = max(rate_per_second, 0.1)
+        self.interval = 1.0 / self.rate_per_second
+        self.tolerance = (self.capacity - 1) * self.interval
+
+    def defer(self, until: float) -> None:
+        self.tat = max(self.tat, until + self.tolerance)
+
+    def is_full(self, now: float) -> bool:
+        return self.tat <= now
+
+
+def gcra_charge(
+    tats: list[float], buckets: list[GcraBucket], now: float
+) -> tuple[list[float], int | None]:
+    """Charge one request to every bucket or to none, given their TATs (0 for a new bucket).
+
+    Returns the new TATs and the index of the first bucket that does not conform, or None when charged.
+    """
+    for idx, (tat, bucket) in enumerate(zip(tats, buckets)):
+        if tat - bucket.tolerance > now:
+            return tats, idx
+    return [max(tat, now) + bucket.interval for tat, bucket in zip(tats, buckets)], None
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future[None]
+    buckets: list[GcraBucket]
+    has_global: bool
+
+
+@dataclass
+class HierarchyStats(LimiterStats):
+    blocked_by: dict[str, int] = field(default_factory=lambda: {"global": 0, "method": 0, "chat": 0})
+    chat_buckets_evicted: int = 0
+
+
+class HierarchicalRateLimiter:
+    """Bot-wide, per-method and per-chat GCRA buckets that must all conform before a call proceeds.
+
+    Tokens are taken from every bucket at the same instant, so a request never holds one level's
+    capacity while waiting on another. Waiters are released in priority, then FIFO, order; those blocked
+    only by their own chat or method are skipped, so one throttled chat does not stall the rest.
+
+    With a shared table every bucket's TAT is read and charged there, so all processes on the host
+    draw from the same allowance; local TATs are a cache used only to time the next wakeup.
+    """
+
+    def __init__(
+        self,
+        *,
+        method_rate_per_second: float = 20,
+        method_burst: int = 5,
+        method_rates: dict[str, float] | None = None,
+        global_rate_per_second: float | None = None,
+        global_burst: int = 10,
+        chat_rate_per_second: float | None = None,
+        chat_burst: int = 5,
+        chat_idle_seconds: float = 60.0,
+        max_chat_buckets: int = 10_000,
+        shared: SharedStateTable | None = None,
+    ) -> None:
+        self.method_rate_per_second = method_rate_per_second
+        self.method_burst = method_burst
+        self.method_rates = dict(method_rates or {})
+        self.chat_rate_per_second = chat_rate_per_second
+        self.chat_burst = chat_burst
+        self.chat_idle_seconds = chat_idle_seconds
+        self.max_chat_buckets = max(1, max_chat_buckets)
+        self.global_bucket = (
+            GcraBucket(global_rate_per_second, global_burst, key="api:global") if global_rate_per_second else None
+        )
+        self.shared = shared
+        self.stats = HierarchyStats()
+        self._method_buckets: dict[str, GcraBucket] = {}
+        self._method_stats: dict[str, LimiterStats] = {}
+        self._chat_buckets: OrderedDict[str, GcraBucket] = OrderedDict()
+        self._waiters: dict[int, Deque[_Waiter]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_at = 0.0
+
+    def _method_bucket(self, method: str) -> GcraBucket:
+        bucket = self._method_buckets.get(method)
+        if bucket is None:
+            rate = self.method_rates.get(method, self.method_rate_per_second)
+            bucket = GcraBucket(rate, self.method_burst, key=f"api:method:{method}")
+            self._method_buckets[method] = bucket
+        return bucket
+
+    def _chat_bucket(self, chat_id: str, now: float) -> GcraBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            self.evict_idle(now)
+            bucket = GcraBucket(self.chat_rate_per_second or 1.0, self.chat_burst, key=f"api:chat:{chat_id}")
+            self._chat_buckets[chat_id] = bucket
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def evict_idle(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        # dropping a bucket with debt or waiters would hand its chat a fresh burst
+        busy = {id(bucket) for queue in self._waiters.values() for waiter in queue for bucket in waiter.buckets}
+        evicted = 0
+        while self._chat_buckets:
+            chat_id, bucket = next(iter(self._chat_buckets.items()))
+            if id(bucket) in busy or not bucket.is_full(now - self.chat_idle_seconds):
+                break
+            del self._chat_buckets[chat_id]
+            evicted += 1
+        if len(self._chat_buckets) >= self.max_chat_buckets:
+            # over capacity: make room with a bucket that has refilled, as a new one would be just the same;
+            # if every candidate is still active, let the table grow rather than reset one
+            for chat_id, bucket in itertools.islice(self._chat_buckets.items(), EVICT_SCAN):
+                if id(bucket) not in busy and bucket.is_full(now):
+                    del self._chat_buckets[chat_id]
+                    evicted += 1
+                    break
+        self.stats.chat_buckets_evicted += evicted
+        return evicted
+
+    @property
+    def methods(self) -> dict[str, LimiterStats]:
+        return dict(self._method_stats)
+
+    @property
+    def chat_bucket_count(self) -> int:
+        return len(self._chat_buckets)
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def _buckets(self, method: str, chat_id: str | None, now: float) -> list[GcraBucket]:
+        buckets = [self._method_bucket(method)]
+        if chat_id and self.chat_rate_per_second:
+            buckets.append(self._chat_bucket(chat_id, now))
+        if self.global_bucket is not None:
+            buckets.append(self.global_bucket)
+        return buckets
+
+    def _record_block(self, buckets: list[GcraBucket], now: float) -> None:
+        for bucket in buckets:
+            if bucket.conforms(now):
+                continue
+            if bucket is self.global_bucket:
+                self.stats.blocked_by["global"] += 1
+            elif bucket is buckets[0]:
+                self.stats.blocked_by["method"] += 1
+            else:
+                self.stats.blocked_by["chat"] += 1
+            return
+
+    def set_method_rate(self, method: str, rate_per_second: float) -> None:
+        self._method_bucket(method).set_rate(rate_per_second)
+
+    def defer_method(self, method: str, until: float) -> None:
+        bucket = self._method_bucket(method)
+        bucket.defer(until)
+        if self.shared is not None:
+            self.shared.update(bucket.key, lambda values: ((max(values[0], bucket.tat), 0.0, 0.0), None))
+
+    def _take(self, buckets: list[GcraBucket], now: float) -> bool:
+        """Charge every bucket if all conform, else none."""
+        if self.shared is None:
+            if not all(bucket.conforms(now) for bucket in buckets):
+                return False
+            for bucket in buckets:
+                bucket.consume(now)
+            return True
+
+        def _charge(values: list[Values]) -> tuple[list[Values], bool]:
+            tats, blocked = gcra_charge([value[0] for value in values], buckets, now)
+            for bucket, tat in zip(buckets, tats):
+                bucket.tat = tat
+            return [(tat, 0.0, 0.0) for tat in tats], blocked is None
+
+        return self.shared.update_many([bucket.key for bucket in buckets], _charge)
+
+    def _refund(self, buckets: list[GcraBucket]) -> None:
+        for bucket in buckets:
+            bucket.refund()
+        if self.shared is not None:
+            self.shared.update_many(
+                [bucket.key for bucket in buckets],
+                lambda values: (
+                    [(value[0] - bucket.interval, 0.0, 0.0) for value, bucket in zip(values, buckets)],
+                    None,
+                ),
+            )
+
+    def try_acquire(self, method: str, chat_id: str | None = None) -> bool:
+        """Take a slot only if nobody is queued and every bucket conforms now; never waits."""
+        now = time.monotonic()
+        if self.waiting or not self._take(self._buckets(method, chat_id, now), now):
+            return False
+        self.stats.record(0.0)
+        self.method_stats(method).record(0.0)
+        return True
+
+    def method_stats(self, method: str) -> LimiterStats:
+        stats = self._method_stats.get(method)
+        if stats is None:
+            stats = LimiterStats()
+            self._method_stats[method] = stats
+        return stats
+
+    async def acquire(
+        self,
+        method: str,
+        chat_id: str | None = None,
+        priority: int = PRIORITY_NORMAL,
+        deadline: float | None = None,
+    ) -> float:
+        now = time.monotonic()
+        buckets = self._buckets(method, chat_id, now)
+        stats = self.method_stats(method)
+        if not self._waiters.get(priority) and not self._has_waiters_before(priority):
+            if self._take(buckets, now):
+                self.stats.record(0.0)
+                stats.record(0.0)
+                return 0.0
+        self._record_block(buckets, now)
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), buckets, self.global_bucket is not None)
+        self._waiters.setdefault(priority, deque()).append(waiter)
+        self._arm(loop, max(bucket.next_available(now) for bucket in buckets))
+        try:
+            await _wait(waiter.future, deadline)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            queue = self._waiters.get(priority)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                self._refund(buckets)
+            self.stats.cancelled += 1
+            stats.cancelled += 1
+            raise
+        wait_s = time.monotonic() - now
+        self.stats.record(wait_s)
+        stats.record(wait_s)
+        return wait_s
+
+    def _has_waiters_before(self, priority: int) -> bool:
+        return any(queue for level, queue in self._waiters.items() if level < priority)
+
+    def _next_wakeup(self, now: float) -> float | None:
+        wakeup: float | None = None
+        for queue in self._waiters.values():
+            for waiter in queue:
+                ready_at = max(bucket.next_available(now) for bucket in waiter.buckets)
+                wakeup = ready_at if wakeup is None else min(wakeup, ready_at)
+        return wakeup
+
+    def _arm(self, loop: asyncio.AbstractEventLoop, at: float) -> None:
+        if self._timer is not None:
+            if self._timer_at <= at:
+                return
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = loop.call_later(max(0.0, at - time.monotonic()), self._release, loop)
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._timer = None
+        now = time.monotonic()
+        global_blocked = False
+        for priority in sorted(self._waiters):
+            queue = self._waiters[priority]
+            remaining: Deque[_Waiter] = deque()
+            while queue:
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    continue
+                if global_blocked and waiter.has_global:
+                    remaining.append(waiter)
+                    continue
+                if self._take(waiter.buckets, now):
+                    waiter.future.set_result(None)
+                    continue
+                if waiter.has_global and not waiter.buckets[-1].conforms(now):
+                    global_blocked = True
+                remaining.append(waiter)
+            self._waiters[priority] = remaining
+        wakeup = self._next_wakeup(time.monotonic())
+        if wakeup is not None:
+            self._arm(loop, wakeup)
+
+
+class AimdController:
+    """Additive-increase/multiplicative-decrease control of one method's rate and in-flight cap."""
+
+    def __init__(
+        self,
+        ceiling_per_second: float,
+        *,
+        floor_per_second: float = 1.0,
+        max_concurrency: int = 8,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 1.0,
+    ) -> None:
+        self.ceiling = max(ceiling_per_second, 0.1)
+        self.floor = min(max(floor_per_second, 0.1), self.ceiling)
+        self.rate = self.ceiling
+        self.max_concurrency = max(max_concurrency, 1)
+        self.concurrency_limit = float(self.max_concurrency)
+        self.decrease_factor = min(max(decrease_factor, 0.1), 0.9)
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self.decreases = 0
+        self.last_decrease_at: float | None = None
+        self._waiters: dict[int, Deque[asyncio.Future[None]]] = {}
+
+    @property
+    def state(self) -> str:
+        return "steady" if self.rate >= self.ceiling else "throttled"
+
+    def on_success(self) -> None:
+        # roughly one step per second at the current rate, like TCP's one segment per RTT
+        self.rate = min(self.ceiling, self.rate + 1.0 / self.rate)
+        self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1.0 / self.concurrency_limit)
+        self._wake()
+
+    def on_throttle(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.last_decrease_at is not None and now - self.last_decrease_at < self.cooldown_seconds:
+            return False
+        self.last_decrease_at = now
+        self.decreases += 1
+        self.rate = max(self.floor, self.rate * self.decrease_factor)
+        self.concurrency_limit = max(1.0, self.concurrency_limit * self.decrease_factor)
+        return True
+
+    async def enter(self, priority: int = PRIORITY_NORMAL, deadline: float | None = None) -> None:
+        ahead = any(queue for level, queue in self._waiters.items() if level <= priority)
+        if not ahead and self.in_flight < int(self.concurrency_limit):
+            self.in_flight += 1
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue = self._waiters.setdefault(priority, deque())
+        queue.append(future)
+        try:
+            await _wait(future, deadline)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if future in queue:
+                queue.remove(future)
+            elif future.done() and not future.cancelled():
+                self.leave()
+            raise
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for priority in sorted(self._waiters):
+            queue = self._waiters[priority]
+            while queue and self.in_flight < int(self.concurrency_limit):
+                future = queue.popleft()
+                if future.done():
+                    continue
+                self.in_flight += 1
+                future.set_result(None)
+
+
+class RetryBudget:
+    """Bot-wide retry allowance: each first attempt deposits ``ratio`` of a retry, plus a small floor."""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 2.0, max_balance: float | None = None) -> None:
+        self.ratio = max(ratio, 0.0)
+        self.min_per_second = max(min_per_second, 0.0)
+        self.max_balance = max_balance if max_balance is not None else max(10.0, self.min_per_second * 10)
+        self.balance = self.max_balance
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.balance = min(self.max_balance, self.balance + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def deposit(self) -> None:
+        self.requests += 1
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill(time.monotonic())
+        if self.balance < 1.0:
+            self.exhausted += 1
+            return False
+        self.balance -= 1.0
+        self.retries += 1
+        return True
@@ -1,37 +1,80 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import random
 import time
-from collections import defaultdict
-from typing import Any
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Callable
 
+import httpcore
 import httpx
 
-LOGGER = logging.getLogger(__name__)
+from app.core.coalesce import OutboundCoalescer
+from app.core.outbound import (
+    OUTBOUND_BULK,
+    OUTBOUND_INTERACTIVE,
+    OUTBOUND_MODERATION,
+    OutboundScheduler,
+)
+from app.core.rate_limit import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AimdController,
+    HierarchicalRateLimiter,
+    LimiterStats,
+    RetryBudget,
+)
+from app.utils.cache import LruTtlCache
+from app.utils.telemetry import ApiTelemetry
+
+if TYPE_CHECKING:
+    from app.utils.shared_state import SharedStateTable
 
+LOGGER = logging.getLogger(__name__)
 
-class ApiRateLimiter:
-    def __init__(self, rate_per_second: float, burst: int) -> None:
-        self.rate_per_second = max(rate_per_second, 0.1)
-        self.capacity = max(burst, 1)
-        self._tokens = float(self.capacity)
-        self._last_refill = time.monotonic()
-        self._lock = asyncio.Lock()
-
-    async def acquire(self) -> None:
-        async with self._lock:
-            now = time.monotonic()
-            elapsed = now - self._last_refill
-            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
-            self._last_refill = now
-            if self._tokens < 1.0:
-                wait_for = (1.0 - self._tokens) / self.rate_per_second
-                await asyncio.sleep(max(wait_for, 0))
-                self._tokens = 0.0
-                self._last_refill = time.monotonic()
-            self._tokens -= 1.0
+H2_AVAILABLE = find_spec("h2") is not None
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+__all__ = [
+    "OUTBOUND_BULK",
+    "OUTBOUND_INTERACTIVE",
+    "OUTBOUND_MODERATION",
+    "PRIORITY_HIGH",
+    "PRIORITY_LOW",
+    "PRIORITY_NORMAL",
+    "HierarchicalRateLimiter",
+    "LimiterStats",
+    "RubikaClient",
+]
+
+THROTTLE_STATUSES = frozenset({408, 429})
+# failures produced by our own scheduler, not by the API
+LOCAL_ERRORS = frozenset({"outbound_queue_full", "deadline_exceeded"})
+
+# seconds; getFile download links expire, bot and chat metadata rarely change
+DEFAULT_READ_CACHE_TTLS = {"getMe": 3600, "getChat": 300, "getFile": 60}
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
 
 
 class RubikaClient:
@@ -44,46 +87,350 @@ class RubikaClient:
         retry_attempts: int = 3,
         retry_backoff: float = 0.5,
         rate_limit_per_second: int = 20,
+        method_burst: int = 5,
+        method_rate_limits: dict[str, float] | None = None,
+        global_rate_limit_per_second: float | None = None,
+        global_burst: int = 10,
+        chat_rate_limit_per_second: float | None = None,
+        chat_burst: int = 5,
+        chat_idle_seconds: float = 60.0,
+        max_chat_buckets: int = 10_000,
+        adaptive: bool = True,
+        adaptive_min_rate_per_second: float = 1.0,
+        max_concurrency_per_method: int = 8,
+        retry_budget_ratio: float = 0.2,
+        retry_budget_min_per_second: float = 2.0,
+        retry_after_max_seconds: float = 60.0,
+        outbound_max_pending: dict[str, int] | None = None,
+        outbound_deadlines: dict[str, float | None] | None = None,
+        coalesce_window_seconds: float = 0.0,
+        max_text_length: int = 4096,
+        read_cache_size: int = 4096,
+        read_cache_ttls: dict[str, int] | None = None,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 32,
+        keepalive_expiry_seconds: float = 30.0,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+        shared_state: SharedStateTable | None = None,
     ) -> None:
         self.token = token
         self.base_url = base_url or "https://botapi.rubika.ir/v3"
         self.timeout_seconds = timeout_seconds
         self.retry_attempts = retry_attempts
         self.retry_backoff = retry_backoff
-        self._client = httpx.AsyncClient(timeout=timeout_seconds)
-        self._rate_limiters: dict[str, ApiRateLimiter] = defaultdict(
-            lambda: ApiRateLimiter(rate_per_second=max(rate_limit_per_second, 1), burst=5)
+        self.rate_limit_per_second = max(rate_limit_per_second, 1)
+        self.method_rate_limits = dict(method_rate_limits or {})
+        self.adaptive = adaptive
+        self.adaptive_min_rate_per_second = adaptive_min_rate_per_second
+        self.max_concurrency_per_method = max_concurrency_per_method
+        self.retry_after_max_seconds = retry_after_max_seconds
+        self.retry_budget = RetryBudget(retry_budget_ratio, retry_budget_min_per_second)
+        self._controllers: dict[str, AimdController] = {}
+        self.telemetry = ApiTelemetry()
+        self.undelivered_sink: Callable[[str, dict[str, Any], dict[str, Any]], None] | None = None
+        self.delivered_sink: Callable[[str, dict[str, Any], dict[str, Any]], None] | None = None
+        self.scheduler = OutboundScheduler(max_pending=outbound_max_pending, deadlines=outbound_deadlines)
+        self.coalescer = (
+            OutboundCoalescer(coalesce_window_seconds, max_text_length=max_text_length)
+            if coalesce_window_seconds > 0
+            else None
+        )
+        self._read_caches: dict[str, LruTtlCache[tuple, dict[str, Any]]] = {
+            method: LruTtlCache(read_cache_size, ttl)
+            for method, ttl in {**DEFAULT_READ_CACHE_TTLS, **(read_cache_ttls or {})}.items()
+            if ttl > 0
+        }
+        self._reads_in_flight: dict[tuple, asyncio.Future[dict[str, Any]]] = {}
+        self._reads_coalesced: dict[str, int] = {}
+        if http2 and not H2_AVAILABLE:
+            LOGGER.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._client = httpx.AsyncClient(
+            timeout=timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_seconds,
+            ),
+            http2=http2,
+            transport=transport,
         )
+        self.rate_limiter = HierarchicalRateLimiter(
+            method_rate_per_second=self.rate_limit_per_second,
+            method_burst=method_burst,
+            method_rates=self.method_rate_limits,
+            global_rate_per_second=global_rate_limit_per_second,
+            global_burst=global_burst,
+            chat_rate_per_second=chat_rate_limit_per_second,
+            chat_burst=chat_burst,
+            chat_idle_seconds=chat_idle_seconds,
+            max_chat_buckets=max_chat_buckets,
+            shared=shared_state,
+        )
+
+    def _controller(self, method: str) -> AimdController:
+        controller = self._controllers.get(method)
+        if controller is None:
+            controller = AimdController(
+                self.method_rate_limits.get(method, self.rate_limit_per_second),
+                floor_per_second=self.adaptive_min_rate_per_second,
+                max_concurrency=self.max_concurrency_per_method,
+            )
+            self._controllers[method] = controller
+        return controller
+
+    def _record_outcome(self, method: str, throttled: bool) -> None:
+        if not self.adaptive:
+            return
+        controller = self._controller(method)
+        if not throttled:
+            before = controller.rate
+            controller.on_success()
+            if controller.rate != before:
+                self.rate_limiter.set_method_rate(method, controller.rate)
+        elif controller.on_throttle():
+            LOGGER.warning("Throttling %s to %.2f req/s", method, controller.rate)
+            self.rate_limiter.set_method_rate(method, controller.rate)
+
+    def adaptive_stats(self) -> dict[str, Any]:
+        return {
+            method: {
+                "state": controller.state,
+                "rate_per_second": controller.rate,
+                "ceiling_per_second": controller.ceiling,
+                "concurrency_limit": int(controller.concurrency_limit),
+                "in_flight": controller.in_flight,
+                "decreases": controller.decreases,
+            }
+            for method, controller in self._controllers.items()
+        }
+
+    def retry_budget_stats(self) -> dict[str, Any]:
+        budget = self.retry_budget
+        return {
+            "balance": budget.balance,
+            "requests": budget.requests,
+            "retries": budget.retries,
+            "exhausted": budget.exhausted,
+        }
+
+    def coalesce_stats(self) -> dict[str, Any]:
+        if self.coalescer is None:
+            return {"enabled": False}
+        stats = self.coalescer.stats
+        return {
+            "enabled": True,
+            "texts": stats.texts,
+            "text_calls": stats.text_calls,
+            "edits": stats.edits,
+            "edit_calls": stats.edit_calls,
+            "calls_saved": stats.calls_saved,
+        }
+
+    def read_cache_stats(self) -> dict[str, Any]:
+        return {
+            method: {
+                "size": len(cache),
+                "ttl_seconds": cache.ttl_seconds,
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "coalesced": self._reads_coalesced.get(method, 0),
+                "hit_rate": cache.hit_rate,
+            }
+            for method, cache in self._read_caches.items()
+        }
+
+    def invalidate_read(self, method: str, payload: dict[str, Any]) -> None:
+        cache = self._read_caches.get(method)
+        if cache is not None:
+            cache.invalidate(tuple(sorted(payload.items())))
+
+    async def _cached_read(self, method: str, payload: dict[str, Any]) -> dict[str, Any]:
+        cache = self._read_caches.get(method)
+        if cache is None:
+            return await self.request(method, payload)
+        key = tuple(sorted(payload.items()))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        in_flight = self._reads_in_flight.get((method, key))
+        if in_flight is not None:
+            self._reads_coalesced[method] = self._reads_coalesced.get(method, 0) + 1
+            return await asyncio.shield(in_flight)
+        # the fetch runs as its own task so a cancelled first caller does not fail the others
+        task = asyncio.ensure_future(self.request(method, payload))
+        self._reads_in_flight[(method, key)] = task
+
+        def _done(done: asyncio.Future[dict[str, Any]]) -> None:
+            self._reads_in_flight.pop((method, key), None)
+            if done.cancelled() or done.exception() is not None:
+                return
+            result = done.result()
+            if result.get("ok", True) and "error" not in result:
+                cache.set(key, result)
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def pool_stats(self) -> dict[str, Any]:
+        # the transport's pool and its request list are private; their layout is only known for httpcore 1.x
+        if not httpcore.__version__.startswith("1."):
+            return {"available": False}
+        pool = getattr(self._client._transport, "_pool", None)
+        if pool is None:
+            return {"available": False}
+        try:
+            connections = list(pool.connections)
+            # same counts httpcore's pool repr reports
+            requests = list(pool._requests)
+            queued = sum(1 for request in requests if request.is_queued())
+            idle = sum(1 for connection in connections if connection.is_idle())
+        except AttributeError:
+            return {"available": False}
+        return {
+            "available": True,
+            "http2": self.http2,
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "requests_active": len(requests) - queued,
+            "waiting": queued,
+        }
+
+    async def prewarm(self, connections: int = 4) -> int:
+        async def _open() -> bool:
+            try:
+                await self._client.head(self.base_url, timeout=self.timeout_seconds)
+            except httpx.HTTPError:
+                return False
+            return True
+
+        results = await asyncio.gather(*[_open() for _ in range(max(connections, 0))])
+        return sum(results)
+
+    def rate_limiter_stats(self) -> dict[str, Any]:
+        limiter = self.rate_limiter
+        return {
+            "waiting": limiter.waiting,
+            "blocked_by": dict(limiter.stats.blocked_by),
+            "chat_buckets": limiter.chat_bucket_count,
+            "chat_buckets_evicted": limiter.stats.chat_buckets_evicted,
+            "avg_wait_ms": limiter.stats.avg_wait_ms,
+            "max_wait_ms": limiter.stats.max_wait_s * 1000,
+            "retry_budget": self.retry_budget_stats(),
+            "adaptive": self.adaptive_stats(),
+            "outbound": self.scheduler.stats(),
+            "coalesce": self.coalesce_stats(),
+            "read_cache": self.read_cache_stats(),
+            "pool": self.pool_stats(),
+            "telemetry": self.telemetry.snapshot(),
+            "methods": {
+                method: {
+                    "acquired": stats.acquired,
+                    "waited": stats.waited,
+                    "cancelled": stats.cancelled,
+                    "avg_wait_ms": stats.avg_wait_ms,
+                    "max_wait_ms": stats.max_wait_s * 1000,
+                }
+                for method, stats in limiter.methods.items()
+            },
+        }
+
+    async def api_call(
+        self,
+        method: str,
+        payload: dict[str, Any],
+        *,
+        outbound_class: str = OUTBOUND_INTERACTIVE,
+    ) -> dict[str, Any]:
+        async def _call(priority: int, deadline: float | None) -> dict[str, Any]:
+            try:
+                return await self._send(method, payload, priority, deadline)
+            except asyncio.TimeoutError:
+                LOGGER.warning("Dropping stale %s call to %s", outbound_class, method)
+                return {"ok": False, "error": "deadline_exceeded", "method": method, "retryable": True}
+
+        result = await self.scheduler.run(outbound_class, method, _call)
+        if result.get("retryable"):
+            # only moderation the API failed to carry out; bulk work and calls shed here were dropped on purpose
+            undelivered = outbound_class == OUTBOUND_MODERATION and result.get("error") not in LOCAL_ERRORS
+            sink = self.undelivered_sink if undelivered else None
+        else:
+            sink = self.delivered_sink if result.get("ok", True) else None
+        if sink is not None:
+            try:
+                sink(method, payload, result)
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Failed to record the outcome of %s", method)
+        return result
 
-    async def api_call(self, method: str, payload: dict[str, Any]) -> dict[str, Any]:
+    async def _send(
+        self,
+        method: str,
+        payload: dict[str, Any],
+        priority: int,
+        deadline: float | None,
+    ) -> dict[str, Any]:
         url = f"{self.base_url}/{self.token}/{method}"
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+        controller = self._controller(method) if self.adaptive else None
+        self.retry_budget.deposit()
+        self.telemetry.record_call(method)
         attempt = 0
         while True:
             attempt += 1
-            await self._rate_limiters[method].acquire()
+            if attempt > 1:
+                self.telemetry.record_retry(method)
+            queued_at = time.monotonic()
+            await self.rate_limiter.acquire(method, payload.get("chat_id"), priority, deadline)
+            if controller is not None:
+                await controller.enter(priority, deadline)
             start = time.monotonic()
+            self.telemetry.record_limiter_wait(method, (start - queued_at) * 1000)
             try:
-                response = await self._client.post(url, json=payload, timeout=self.timeout_seconds)
+                response = await self._client.post(url, content=body, headers=JSON_HEADERS, timeout=self.timeout_seconds)
             except (httpx.TimeoutException, httpx.TransportError) as exc:
-                if attempt <= self.retry_attempts:
-                    await self._sleep_before_retry(attempt, method, error=str(exc))
-                    continue
-                LOGGER.error("Rubika API transport error: %s", exc)
-                return {"ok": False, "error": str(exc), "method": method}
+                transport_error: Exception | None = exc
+            else:
+                transport_error = None
+            finally:
+                if controller is not None:
+                    controller.leave()
             elapsed = (time.monotonic() - start) * 1000
+            if transport_error is not None:
+                self.telemetry.record_transport_error(method, transport_error, elapsed)
+                self._record_outcome(method, throttled=isinstance(transport_error, httpx.TimeoutException))
+                if attempt <= self.retry_attempts and self.retry_budget.try_withdraw():
+                    await self._sleep_before_retry(attempt, method, error=str(transport_error))
+                    continue
+                LOGGER.error("Rubika API transport error: %s", transport_error)
+                return {"ok": False, "error": str(transport_error), "method": method, "retryable": True}
+            self.telemetry.record_response(method, response.status_code, elapsed)
             LOGGER.debug("Rubika API %s attempt %s in %.2fms", method, attempt, elapsed)
-            if response.status_code in {408, 429} or response.status_code >= 500:
-                if attempt <= self.retry_attempts:
-                    await self._sleep_before_retry(
-                        attempt,
-                        method,
-                        error=f"status {response.status_code}",
-                    )
+            throttled = response.status_code in THROTTLE_STATUSES or response.status_code >= 500
+            self._record_outcome(method, throttled)
+            if throttled and attempt <= self.retry_attempts:
+                hint = retry_after_seconds(response)
+                if hint is not None and hint > self.retry_after_max_seconds:
+                    LOGGER.warning("Not retrying %s: Retry-After %.0fs exceeds limit", method, hint)
+                elif not self.retry_budget.try_withdraw():
+                    LOGGER.warning("Retry budget exhausted, not retrying %s", method)
+                elif hint is not None:
+                    # pause the whole method, not just this caller; the next acquire waits it out
+                    self.rate_limiter.defer_method(method, time.monotonic() + hint)
+                    LOGGER.warning("Retrying %s after Retry-After %.2fs. attempt=%s", method, hint, attempt)
+                    continue
+                else:
+                    await self._sleep_before_retry(attempt, method, error=f"status {response.status_code}")
                     continue
             try:
                 data = response.json()
             except ValueError:
                 data = {"ok": False, "error": "invalid_json"}
+            if throttled and isinstance(data, dict):
+                data = {**data, "ok": False, "retryable": True, "status_code": response.status_code}
             if not data.get("ok", True):
                 LOGGER.warning("Rubika API error for %s: %s", method, data)
             return data
@@ -95,11 +442,17 @@ class RubikaClient:
         LOGGER.warning("Retrying %s after error (%s). attempt=%s sleep=%.2fs", method, error, attempt, sleep_for)
         await asyncio.sleep(sleep_for)
 
-    async def request(self, method: str, payload: dict[str, Any]) -> dict[str, Any]:
-        return await self.api_call(method, payload)
+    async def request(
+        self,
+        method: str,
+        payload: dict[str, Any],
+        *,
+        outbound_class: str = OUTBOUND_INTERACTIVE,
+    ) -> dict[str, Any]:
+        return await self.api_call(method, payload, outbound_class=outbound_class)
 
     async def get_me(self) -> dict[str, Any]:
-        return await self.request("getMe", {})
+        return await self._cached_read("getMe", {})
 
     async def send_message(
         self,
@@ -108,13 +461,22 @@ class RubikaClient:
         *,
         inline_keypad: dict | None = None,
         keypad: dict | None = None,
+        outbound_class: str = OUTBOUND_INTERACTIVE,
+        coalesce: bool = True,
     ) -> dict[str, Any]:
         payload: dict[str, Any] = {"chat_id": chat_id, "text": text}
         if inline_keypad:
             payload["inline_keypad"] = inline_keypad
         if keypad:
             payload["keypad"] = keypad
-        return await self.request("sendMessage", payload)
+        # callers that edit the message later pass coalesce=False: merged texts share one message_id
+        if coalesce and self.coalescer is not None and len(payload) == 2:
+
+            async def _send(merged: str) -> dict[str, Any]:
+                return await self.request("sendMessage", {"chat_id": chat_id, "text": merged}, outbound_class=outbound_class)
+
+            return await self.coalescer.send_text((chat_id, outbound_class), text, _send)
+        return await self.request("sendMessage", payload, outbound_class=outbound_class)
 
     async def send_poll(self, chat_id: str, question: str, options: list[str]) -> dict[str, Any]:
         return await self.request("sendPoll", {"chat_id": chat_id, "question": question, "options": options})
@@ -129,9 +491,9 @@ class RubikaClient:
         )
 
     async def get_chat(self, chat_id: str) -> dict[str, Any]:
-        return await self.request("getChat", {"chat_id": chat_id})
+        return await self._cached_read("getChat", {"chat_id": chat_id})
 
-    async def get_updates(self, offset: int | None = None, limit: int | None = None) -> dict[str, Any]:
+    async def get_updates(self, offset: int | str | None = None, limit: int | None = None) -> dict[str, Any]:
         payload: dict[str, Any] = {}
         if offset is not None:
             payload["offset"] = offset
@@ -145,11 +507,20 @@ class RubikaClient:
             {"chat_id": chat_id, "from_chat_id": from_chat_id, "message_id": message_id},
         )
 
+    async def _edit(self, method: str, payload: dict[str, Any]) -> dict[str, Any]:
+        if self.coalescer is None:
+            return await self.request(method, payload)
+
+        async def _send(latest: dict[str, Any]) -> dict[str, Any]:
+            return await self.request(method, latest)
+
+        return await self.coalescer.edit((method, payload["chat_id"], payload["message_id"]), payload, _send)
+
     async def edit_message_text(self, chat_id: str, message_id: str, text: str) -> dict[str, Any]:
-        return await self.request("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": text})
+        return await self._edit("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": text})
 
     async def edit_inline_keypad(self, chat_id: str, message_id: str, inline_keypad: dict) -> dict[str, Any]:
-        return await self.request(
+        return await self._edit(
             "editInlineKeypad",
             {"chat_id": chat_id, "message_id": message_id, "inline_keypad": inline_keypad},
         )
@@ -162,11 +533,21 @@ class RubikaClient:
             payload["remove_keypad"] = True
         return await self.request("editChatKeypad", payload)
 
-    async def delete_message(self, chat_id: str, message_id: str) -> dict[str, Any]:
-        return await self.request("deleteMessage", {"chat_id": chat_id, "message_id": message_id})
+    async def delete_message(
+        self,
+        chat_id: str,
+        message_id: str,
+        *,
+        outbound_class: str = OUTBOUND_MODERATION,
+    ) -> dict[str, Any]:
+        return await self.request(
+            "deleteMessage",
+            {"chat_id": chat_id, "message_id": message_id},
+            outbound_class=outbound_class,
+        )
 
     async def get_file(self, file_id: str) -> dict[str, Any]:
-        return await self.request("getFile", {"file_id": file_id})
+        return await self._cached_read("getFile", {"file_id": file_id})
 
     async def request_send_file(self, file_id: str) -> dict[str, Any]:
         return await self.request("requestSendFile", {"file_id": file_id})
@@ -178,10 +559,18 @@ class RubikaClient:
         return await self.request("sendFile", payload)
 
     async def ban_chat_member(self, chat_id: str, user_id: str) -> dict[str, Any]:
-        return await self.request("banChatMember", {"chat_id": chat_id, "user_id": user_id})
+        return await self.request(
+            "banChatMember",
+            {"chat_id": chat_id, "user_id": user_id},
+            outbound_class=OUTBOUND_MODERATION,
+        )
 
     async def unban_chat_member(self, chat_id: str, user_id: str) -> dict[str, Any]:
-        return await self.request("unbanChatMember", {"chat_id": chat_id, "user_id": user_id})
+        return await self.request(
+            "unbanChatMember",
+            {"chat_id": chat_id, "user_id": user_id},
+            outbound_class=OUTBOUND_MODERATION,
+        )
 
     async def set_commands(self, commands: list[dict[str, str]]) -> dict[str, Any]:
         return await self.request("setCommands", {"commands": commands})
@@ -193,4 +582,6 @@ class RubikaClient:
         return await self.request("updateBotEndpoints", {"urls": urls})
 
     async def close(self) -> None:
+        if self.coalescer is not None:
+            await self.coalescer.flush()
         await self._client.aclose()
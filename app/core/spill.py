@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import asdict
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Deque
+
+from app.utils.fastjson import loads
+
+if TYPE_CHECKING:
+    from app.core.queue import Job
+
+LOGGER = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".ndjson"
+
+
+class SpillLog:
+    """Overflow tier for JobQueue: jobs that do not fit in memory are appended to NDJSON segment files
+    and read back in order as room frees up. Fully read segments are deleted.
+
+    Delivery is at least once: the read position is only kept in memory, so after a restart the
+    oldest remaining segment is replayed from its start."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = max(segment_bytes, 1)
+        self.max_bytes = max_bytes
+        self.spilled = 0
+        self.refilled = 0
+        self.rejected = 0
+        self._segments: Deque[Path] = deque(sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")))
+        self._next_seq = int(self._segments[-1].stem) + 1 if self._segments else 0
+        self._bytes = sum(path.stat().st_size for path in self._segments)
+        self.pending = 0
+        for path in self._segments:
+            with path.open("rb") as handle:
+                self.pending += sum(1 for line in handle if line.strip())
+        self._writer: IO[bytes] | None = None
+        self._writer_bytes = 0
+        self._reader: IO[bytes] | None = None
+        self._reader_bytes = 0
+        # per-second counts of [second, spilled, refilled] for the last minute
+        self._window: Deque[list[int]] = deque(maxlen=60)
+        if self.pending:
+            LOGGER.warning("Found %s spilled jobs in %s from a previous run", self.pending, self.directory)
+
+    def _tick(self, spilled: int, refilled: int) -> None:
+        second = int(time.monotonic())
+        if not self._window or self._window[-1][0] != second:
+            self._window.append([second, 0, 0])
+        self._window[-1][1] += spilled
+        self._window[-1][2] += refilled
+
+    def _open_segment(self) -> IO[bytes]:
+        path = self.directory / f"{self._next_seq:08d}{SEGMENT_SUFFIX}"
+        self._next_seq += 1
+        self._segments.append(path)
+        self._writer_bytes = 0
+        return path.open("ab")
+
+    def append(self, job: Job) -> bool:
+        line = (json.dumps(asdict(job), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._bytes + len(line) > self.max_bytes:
+            self.rejected += 1
+            return False
+        if self._writer is None or self._writer_bytes >= self.segment_bytes:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = self._open_segment()
+        self._writer.write(line)
+        # flushed, not fsynced: the reader shares the file and a crash of the host is out of scope
+        self._writer.flush()
+        self._writer_bytes += len(line)
+        self._bytes += len(line)
+        self.pending += 1
+        self.spilled += 1
+        self._tick(1, 0)
+        return True
+
+    def pop(self) -> dict | None:
+        while self.pending:
+            if self._reader is None:
+                self._reader = self._segments[0].open("rb")
+                self._reader_bytes = 0
+            line = self._reader.readline()
+            if line.strip():
+                self._reader_bytes += len(line)
+                self.pending -= 1
+                self.refilled += 1
+                self._tick(0, 1)
+                return loads(line)
+            if len(self._segments) == 1:
+                # caught up with the segment still being written
+                return None
+            self._drop_head()
+        return None
+
+    def _drop_head(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        path = self._segments.popleft()
+        self._bytes -= path.stat().st_size
+        path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        cleared = self.pending
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        while self._segments:
+            self._drop_head()
+        self._bytes = 0
+        self.pending = 0
+        return cleared
+
+    def close(self) -> None:
+        for handle in (self._reader, self._writer):
+            if handle is not None:
+                handle.close()
+        self._reader = None
+        self._writer = None
+
+    def stats(self) -> dict[str, float]:
+        now = int(time.monotonic())
+        recent = [entry for entry in self._window if now - entry[0] < 60]
+        span = max(1, min(60, now - recent[0][0] + 1)) if recent else 1
+        return {
+            "pending": self.pending,
+            "segments": len(self._segments),
+            "bytes": self._bytes,
+            "spilled": self.spilled,
+            "refilled": self.refilled,
+            "rejected": self.rejected,
+            "spill_per_s": sum(entry[1] for entry in recent) / span,
+            "refill_per_s": sum(entry[2] for entry in recent) / span,
+        }
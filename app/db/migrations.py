@@ -6,7 +6,7 @@ from pathlib import Path
 
 LOGGER = logging.getLogger(__name__)
 
-SCHEMA_VERSION = 4
+SCHEMA_VERSION = 6
 
 
 INITIAL_SCHEMA = [
@@ -99,6 +99,42 @@ INITIAL_SCHEMA = [
     CREATE INDEX IF NOT EXISTS idx_incoming_updates_received
         ON incoming_updates (received_at);
     """,
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        method TEXT NOT NULL,
+        chat_id TEXT NOT NULL,
+        target TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT,
+        UNIQUE (method, chat_id, target)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON outbox (next_attempt_at, id);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS job_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dedup_key TEXT NOT NULL UNIQUE,
+        priority INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        state TEXT NOT NULL,
+        owner TEXT,
+        visible_at REAL NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        enqueued_at REAL NOT NULL,
+        acked_at REAL
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_job_queue_ready
+        ON job_queue (state, priority, id);
+    """,
 ]
 
 
@@ -139,6 +175,46 @@ MIGRATIONS = {
             ON incoming_updates (received_at);
         """,
     ],
+    5: [
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            method TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            target TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            UNIQUE (method, chat_id, target)
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_due
+            ON outbox (next_attempt_at, id);
+        """,
+    ],
+    6: [
+        """
+        CREATE TABLE IF NOT EXISTS job_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dedup_key TEXT NOT NULL UNIQUE,
+            priority INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            state TEXT NOT NULL,
+            owner TEXT,
+            visible_at REAL NOT NULL,
+            attempts INTEGER DEFAULT 0,
+            enqueued_at REAL NOT NULL,
+            acked_at REAL
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_job_queue_ready
+            ON job_queue (state, priority, id);
+        """,
+    ],
 }
 
 
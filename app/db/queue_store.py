@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Iterable
+
+from app.db.repository import DEFAULT_PRAGMAS
+
+if TYPE_CHECKING:
+    from app.core.queue import Job
+
+LOGGER = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1}
+
+CLAIM_SQL = """
+UPDATE job_queue SET state = 'claimed', owner = ?, visible_at = ?, attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM job_queue
+    WHERE state = 'pending' OR (state = 'claimed' AND visible_at <= ? AND owner != ?)
+    ORDER BY priority, id
+    LIMIT ?
+)
+RETURNING id, payload;
+"""
+
+# a claim that expired this often without an ack keeps killing its consumer: park it instead
+DEAD_SQL = """
+UPDATE job_queue SET state = 'dead', owner = NULL, acked_at = ?
+WHERE state = 'claimed' AND visible_at <= ? AND owner != ? AND attempts >= ?;
+"""
+
+
+class SqliteQueueStore:
+    """Durable backend for JobQueue in the bot database (WAL).
+
+    Rows are unique per dedup key, so a job is stored once however often it is offered. Claims
+    take a batch at a time and hide it for visibility_seconds; a claim that is never acked (the
+    process died) becomes visible to the next claimer. Rows claimed by this process are never
+    taken back by it, and extend() keeps long-running ones hidden from other processes. A row
+    whose claim has expired max_attempts times is moved to the 'dead' state and kept for
+    inspection instead of being handed out again. Acked rows stay as tombstones for
+    dedup_ttl_seconds so a late redelivery is still recognised.
+
+    Several processes may share one store (see app.worker_main): the unique dedup key then
+    deduplicates across all of them, and each claim hands a row to exactly one consumer.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        visibility_seconds: float = 60.0,
+        dedup_ttl_seconds: float = 3600.0,
+        max_attempts: int = 5,
+        pragmas: dict[str, str] | None = None,
+    ) -> None:
+        self.db_path = db_path
+        self.visibility_seconds = visibility_seconds
+        self.dedup_ttl_seconds = dedup_ttl_seconds
+        self.max_attempts = max(max_attempts, 1)
+        # one per process run, so claims left behind by a previous run are recoverable
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._conn = sqlite3.connect(db_path)
+        for name, value in {**DEFAULT_PRAGMAS, **(pragmas or {})}.items():
+            self._conn.execute(f"PRAGMA {name}={value};")
+
+    def put(self, jobs: list[Job], *, claimed: bool = False) -> list[int | None]:
+        """Store jobs; returns the row id of each, or None when its dedup key is already stored."""
+        now = time.time()
+        if claimed:
+            state, owner, visible_at = "claimed", self.owner, now + self.visibility_seconds
+        else:
+            state, owner, visible_at = "pending", None, 0.0
+        ids: list[int | None] = []
+        with self._conn:
+            for job in jobs:
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO job_queue (dedup_key, priority, payload, state, owner, visible_at, enqueued_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(dedup_key) DO NOTHING;
+                    """,
+                    (
+                        job.dedup_key or job.job_id,
+                        PRIORITIES.get(job.priority, 1),
+                        json.dumps(asdict(job), ensure_ascii=False, separators=(",", ":")),
+                        state,
+                        owner,
+                        visible_at,
+                        now,
+                    ),
+                )
+                ids.append(cursor.lastrowid if cursor.rowcount > 0 else None)
+        return ids
+
+    def claim(self, limit: int) -> list[tuple[int, dict]]:
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._conn:
+            dead = self._conn.execute(DEAD_SQL, (now, now, self.owner, self.max_attempts)).rowcount
+            rows = self._conn.execute(
+                CLAIM_SQL, (self.owner, now + self.visibility_seconds, now, self.owner, limit)
+            ).fetchall()
+        if dead:
+            LOGGER.warning("Moved %s job(s) to the dead state after %s failed claims", dead, self.max_attempts)
+        # RETURNING does not follow the subquery order
+        return [(row_id, json.loads(payload)) for row_id, payload in sorted(rows)]
+
+    def ack(self, ids: Iterable[int]) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE job_queue SET state = 'done', acked_at = ?, payload = '' WHERE id = ?;",
+                [(now, row_id) for row_id in ids],
+            )
+
+    def extend(self, ids: Iterable[int]) -> None:
+        visible_at = time.time() + self.visibility_seconds
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE job_queue SET visible_at = ? WHERE id = ? AND state = 'claimed';",
+                [(visible_at, row_id) for row_id in ids],
+            )
+
+    def release(self, ids: Iterable[int]) -> None:
+        with self._conn:
+            # never started, so the claim does not count as an attempt
+            self._conn.executemany(
+                "UPDATE job_queue SET state = 'pending', owner = NULL, visible_at = 0, attempts = attempts - 1 "
+                "WHERE id = ? AND state = 'claimed' AND owner = ?;",
+                [(row_id, self.owner) for row_id in ids],
+            )
+
+    def head_age(self) -> float | None:
+        """Seconds the next job to be claimed has waited, or None when nothing is pending."""
+        row = self._conn.execute(
+            "SELECT enqueued_at FROM job_queue WHERE state = 'pending' ORDER BY priority, id LIMIT 1;"
+        ).fetchone()
+        return time.time() - row[0] if row else None
+
+    def purge(self) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM job_queue WHERE state = 'done' AND acked_at < ?;",
+                (time.time() - self.dedup_ttl_seconds,),
+            )
+        return cursor.rowcount
+
+    def clear(self) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE job_queue SET state = 'done', acked_at = ?, payload = '' WHERE state != 'done';",
+                (time.time(),),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        rows = self._conn.execute("SELECT state, COUNT(1) FROM job_queue GROUP BY state;").fetchall()
+        counts = {"pending": 0, "claimed": 0, "done": 0, "dead": 0}
+        counts.update({state: total for state, total in rows})
+        return counts
+
+    def close(self) -> None:
+        self._conn.close()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import sqlite3
 import time
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from app.utils.cache import LruTtlCache
 
@@ -20,10 +20,30 @@ class GroupSettings:
     flood_limit: int
 
 
+DEFAULT_PRAGMAS: dict[str, str] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": "-20000",
+    "busy_timeout": "3000",
+    "wal_autocheckpoint": "1000",
+    "journal_size_limit": str(64 * 1024 * 1024),
+    "foreign_keys": "ON",
+}
+
+
 class Repository:
-    def __init__(self, db_path: str, *, cache_size: int = 1024, cache_ttl_seconds: int = 90) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        cache_size: int = 1024,
+        cache_ttl_seconds: int = 90,
+        pragmas: dict[str, str] | None = None,
+    ) -> None:
         self.db_path = db_path
         self._group_cache = LruTtlCache[str, GroupSettings](cache_size, cache_ttl_seconds)
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
 
     def _connect(self) -> sqlite3.Connection:
         conn = sqlite3.connect(self.db_path)
@@ -32,12 +52,8 @@ class Repository:
         return conn
 
     def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA synchronous=NORMAL;")
-        conn.execute("PRAGMA temp_store=MEMORY;")
-        conn.execute("PRAGMA cache_size=-20000;")
-        conn.execute("PRAGMA busy_timeout=3000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value};")
 
     def upsert_group(self, chat_id: str, title: str | None) -> GroupSettings:
         with self._connect() as conn:
@@ -178,6 +194,15 @@ class Repository:
             )
             conn.commit()
 
+    def delete_messages(self, chat_id: str, message_ids: Iterable[str]) -> int:
+        rows = [(chat_id, message_id) for message_id in message_ids]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            cursor = conn.executemany("DELETE FROM messages WHERE chat_id = ? AND message_id = ?;", rows)
+            conn.commit()
+            return cursor.rowcount
+
     def save_incoming_update(
         self,
         job_id: str,
@@ -201,6 +226,52 @@ class Repository:
             )
             conn.commit()
 
+    def bulk_save_incoming_updates(
+        self,
+        rows: Iterable[
+            tuple[str, float, str | None, str | None, str | None, str | None, str | None, str | None]
+        ],
+    ) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO incoming_updates (
+                    job_id, received_at, chat_id, message_id, sender_id, update_type, text, raw_payload
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                list(rows),
+            )
+            conn.commit()
+
+    def iter_incoming_updates(
+        self,
+        *,
+        since: float = 0.0,
+        until: float | None = None,
+        batch_size: int = 500,
+    ) -> Iterator[sqlite3.Row]:
+        last_received = since
+        last_id = -1
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT id, job_id, received_at, raw_payload FROM incoming_updates
+                    WHERE raw_payload IS NOT NULL
+                    AND (received_at > ? OR (received_at = ? AND id > ?))
+                    AND (? IS NULL OR received_at <= ?)
+                    ORDER BY received_at, id
+                    LIMIT ?;
+                    """,
+                    (last_received, last_received, last_id, until, until, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_received = rows[-1]["received_at"]
+            last_id = rows[-1]["id"]
+
     def cleanup_incoming_updates(self, max_age_seconds: int) -> int:
         cutoff = time.time() - max_age_seconds
         with self._connect() as conn:
@@ -228,6 +299,68 @@ class Repository:
             conn.commit()
         return total_deleted
 
+    def enqueue_outbox(self, method: str, chat_id: str, target: str, payload: str, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO outbox (method, chat_id, target, payload, created_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(method, chat_id, target) DO NOTHING;
+                """,
+                (method, chat_id, target, payload, now, now),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def claim_due_outbox(self, limit: int, lease_seconds: float, now: float | None = None) -> list[sqlite3.Row]:
+        """Take up to limit due entries, hidden from other replayers for lease_seconds.
+
+        Entries that are neither deleted nor deferred by then (the replayer died) fall due again.
+        """
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                UPDATE outbox SET next_attempt_at = ?
+                WHERE id IN (SELECT id FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?)
+                RETURNING id, method, chat_id, target, payload, created_at, attempts;
+                """,
+                (now + lease_seconds, now, limit),
+            ).fetchall()
+            conn.commit()
+        # RETURNING does not follow the subquery order
+        return sorted(rows, key=lambda row: row["id"])
+
+    def delete_outbox_target(self, method: str, chat_id: str, target: str) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM outbox WHERE method = ? AND chat_id = ? AND target = ?;",
+                (method, chat_id, target),
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def delete_outbox(self, ids: Iterable[int]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?;", [(item,) for item in ids])
+            conn.commit()
+
+    def defer_outbox(self, ids: Iterable[int], next_attempt_at: float, error: str | None) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?;",
+                [(next_attempt_at, error, item) for item in ids],
+            )
+            conn.commit()
+
+    def expire_outbox(self, max_age_seconds: float, now: float | None = None) -> int:
+        cutoff = (time.time() if now is None else now) - max_age_seconds
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM outbox WHERE created_at < ?;", (cutoff,))
+            conn.commit()
+            return cursor.rowcount
+
     def count_records(self, table: str) -> int:
         with self._connect() as conn:
             row = conn.execute(f"SELECT COUNT(1) AS total FROM {table};").fetchone()
@@ -251,6 +384,11 @@ class Repository:
             )
             conn.commit()
 
+    def delete_setting(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM settings WHERE key = ?;", (key,))
+            conn.commit()
+
     def get_setting(self, key: str) -> str | None:
         with self._connect() as conn:
             row = conn.execute("SELECT value FROM settings WHERE key = ?;", (key,)).fetchone()
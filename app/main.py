@@ -3,158 +3,153 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import logging
-from pathlib import Path
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
+from app.core.admission import CoDelAdmission
 from app.core.queue import JobQueue
+from app.core.rubika_client import RubikaClient
+from app.core.spill import SpillLog
 from app.core.worker import WorkerPool
-from app.db import Repository, ensure_schema
+from app.db import Repository
+from app.db.queue_store import SqliteQueueStore
 from app.logging_config import setup_logging
-from app.core.rubika_client import RubikaClient
-from app.services.handlers import (
-    about_handler,
-    admins_handler,
-    antilink_handler,
-    ban_handler,
-    calc_handler,
-    coin_handler,
-    delete_handler,
-    echo_handler,
-    filter_handler,
-    help_handler,
-    id_handler,
-    joke_handler,
-    models_handler,
-    ping_handler,
-    roll_handler,
-    settings_handler,
-    setcmd_handler,
-    stats_handler,
-    time_handler,
-    unban_handler,
-    uptime_handler,
+from app.services.bootstrap import (
+    build_client,
+    build_context,
+    build_repository,
+    build_shared_state,
+    resolve_db_path,
 )
-from app.services.plugins.anti_flood import AntiFloodPlugin
-from app.services.plugins.anti_link import AntiLinkPlugin
-from app.services.plugins.commands import Command, CommandRegistry, CommandsPlugin
-from app.services.plugins.filters import FilterWordsPlugin
-from app.services.plugins.incoming_snapshot import IncomingSnapshotPlugin
-from app.services.plugins.logging import MessageLoggingPlugin
-from app.services.plugins.panel import PanelPlugin
-from app.services.plugins.registry import PluginRegistry
+from app.services.outbox import Outbox
+from app.services.poller import UpdatePoller
+from app.services.pipeline import build_command_registry, build_plugin_registry
 from app.utils.dedup import Deduplicator
-from app.utils.rate_limiter import RateLimiter
+from app.utils.rate_limiter import KeyedRateLimiter, RateLimiter
 from app.utils.stats import StatsCollector
 from app.webhook.router import build_router
-from app import __version__
 
 setup_logging(settings.log_level, settings.log_file)
 LOGGER = logging.getLogger(__name__)
 
 app = FastAPI(title="Rubika Bot API v3")
+# one table for every process on the host (uvicorn --workers, app.worker_main), when configured
+shared_state = build_shared_state(settings)
 
 
-async def _run_db_janitor(repo: Repository) -> None:
+async def _run_db_janitor(repo: Repository, queue_store: SqliteQueueStore | None = None) -> None:
     interval_seconds = 600
     while True:
         try:
             if settings.incoming_updates_enabled:
                 repo.cleanup_incoming_updates(settings.incoming_updates_retention_hours * 3600)
             repo.trim_messages_per_chat(settings.messages_keep_per_chat)
+            if queue_store is not None:
+                queue_store.purge()
         except Exception:  # noqa: BLE001
             LOGGER.exception("Database janitor failed")
         await asyncio.sleep(interval_seconds)
 
 
-def _resolve_db_path(url: str) -> str:
-    if url.startswith("sqlite:///"):
-        return url.replace("sqlite:///", "", 1)
-    return url
+async def _prewarm(client: RubikaClient, connections: int) -> None:
+    warmed = await client.prewarm(connections)
+    LOGGER.info("Pre-warmed %s/%s API connections", warmed, connections)
 
 
 @app.on_event("startup")
 async def startup() -> None:
-    db_path = _resolve_db_path(settings.database_url)
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    ensure_schema(db_path)
-    repo = Repository(
-        db_path,
-        cache_size=settings.settings_cache_size,
-        cache_ttl_seconds=settings.settings_cache_ttl_seconds,
-    )
-    client = RubikaClient(
-        settings.bot_token,
-        settings.api_base_url,
-        timeout_seconds=settings.api_timeout_seconds,
-        retry_attempts=settings.api_retry_attempts,
-        retry_backoff=settings.api_retry_backoff,
-        rate_limit_per_second=settings.api_rate_limit_per_second,
+    # "ingest" only accepts updates into the shared store; app.worker_main processes consume it
+    ingest_only = settings.process_role == "ingest"
+    db_path = resolve_db_path(settings.database_url)
+    repo = build_repository(settings)
+    client = build_client(settings, shared_state=shared_state)
+    # in the background: an unreachable API must not hold up startup for the connect timeout
+    app.state.prewarm_task = (
+        asyncio.create_task(_prewarm(client, settings.api_prewarm_connections))
+        if settings.api_prewarm_connections > 0
+        else None
     )
+    outbox = None
+    if settings.outbox_enabled:
+        outbox = Outbox(
+            repo,
+            max_age_seconds=settings.outbox_max_age_seconds,
+            batch_size=settings.outbox_batch_size,
+            rate_per_second=settings.outbox_rate_per_second,
+        )
+        outbox.attach(client)
     stats = StatsCollector()
-    command_registry = CommandRegistry()
-    command_registry.register(Command("help", "نمایش راهنما", help_handler))
-    command_registry.register(Command("setcmd", "ثبت دستورات", setcmd_handler, admin_only=True))
-    command_registry.register(Command("ping", "تست سرعت", ping_handler))
-    command_registry.register(Command("uptime", "نمایش مدت زمان اجرا", uptime_handler))
-    command_registry.register(Command("stats", "آمار پردازش", stats_handler))
-    command_registry.register(Command("echo", "تکرار متن", echo_handler))
-    command_registry.register(Command("id", "نمایش شناسه‌ها", id_handler))
-    command_registry.register(Command("time", "زمان سرور", time_handler))
-    command_registry.register(Command("calc", "محاسبه ساده", calc_handler))
-    command_registry.register(Command("coin", "شیر یا خط", coin_handler))
-    command_registry.register(Command("roll", "تاس", roll_handler))
-    command_registry.register(Command("joke", "جوک کوتاه", joke_handler))
-    command_registry.register(Command("models", "مدل ها", models_handler))
-    command_registry.register(Command("about", "نسخه بات", about_handler))
-    command_registry.register(Command("settings", "تنظیمات گروه", settings_handler, admin_only=True))
-    command_registry.register(Command("admins", "تعداد ادمین‌ها", admins_handler, admin_only=True))
-    command_registry.register(Command("antilink", "تنظیم ضد لینک", antilink_handler, admin_only=True))
-    command_registry.register(Command("filter", "مدیریت فیلتر", filter_handler, admin_only=True))
-    command_registry.register(Command("del", "حذف انبوه", delete_handler, admin_only=True))
-    command_registry.register(Command("ban", "بن کاربر", ban_handler, admin_only=True))
-    command_registry.register(Command("unban", "رفع بن", unban_handler, admin_only=True))
-
-    registry = PluginRegistry(
-        [
-            IncomingSnapshotPlugin(),
-            MessageLoggingPlugin(),
-            AntiLinkPlugin(),
-            AntiFloodPlugin(),
-            FilterWordsPlugin(),
-            CommandsPlugin(command_registry),
-            PanelPlugin(),
-        ]
-    )
-    deduplicator = Deduplicator(settings.dedup_ttl_seconds)
+    command_registry = build_command_registry()
+    registry = build_plugin_registry(command_registry)
+    deduplicator = Deduplicator(settings.dedup_ttl_seconds, shared=shared_state)
     queue = JobQueue(
         max_size=settings.queue_max_size,
         deduplicator=deduplicator,
         full_policy=settings.queue_full_policy,
         stats=stats,
+        admission=(
+            CoDelAdmission(target_ms=settings.admission_target_ms, interval_ms=settings.admission_interval_ms)
+            if settings.admission_enabled
+            else None
+        ),
+        spill=(
+            SpillLog(
+                settings.queue_spill_dir,
+                segment_bytes=settings.queue_spill_segment_bytes,
+                max_bytes=settings.queue_spill_max_bytes,
+            )
+            if settings.queue_full_policy == "spill"
+            else None
+        ),
+        backend=(
+            SqliteQueueStore(
+                db_path,
+                visibility_seconds=settings.queue_visibility_seconds,
+                dedup_ttl_seconds=settings.dedup_ttl_seconds,
+                max_attempts=settings.queue_max_attempts,
+            )
+            if settings.queue_backend == "sqlite" or ingest_only
+            else None
+        ),
+        consumer=not ingest_only,
+        poll_seconds=settings.queue_poll_ms / 1000,
     )
 
     async def _process_job(job) -> None:
         await registry.dispatch(job.raw_payload or {}, {**app.state.context, "job": job})
 
-    worker = WorkerPool(queue, _process_job, concurrency=settings.worker_concurrency, stats=stats)
-    await worker.start()
-    app.state.context = {
-        "repo": repo,
-        "client": client,
-        "command_registry": command_registry,
-        "report_anti_actions": True,
-        "stats": stats,
-        "version": __version__,
-        "owner_id": settings.owner_id,
-        "settings": settings,
-    }
+    worker = None
+    if not ingest_only:
+        worker = WorkerPool(queue, _process_job, concurrency=settings.worker_concurrency, stats=stats)
+        await worker.start()
+    app.state.context = build_context(settings, repo, client, command_registry, stats, shared_state)
     app.state.queue = queue
     app.state.worker = worker
-    app.state.janitor_task = asyncio.create_task(_run_db_janitor(repo))
+    app.state.janitor_task = asyncio.create_task(_run_db_janitor(repo, queue.backend))
+    app.state.outbox = outbox
+    # with worker processes, the first of them replays the outbox; this process only records into it
+    app.state.outbox_task = (
+        asyncio.create_task(outbox.run(client, settings.outbox_interval_seconds))
+        if outbox is not None and not ingest_only
+        else None
+    )
+    app.state.poller = None
+    app.state.poller_task = None
+    if settings.polling_enabled or settings.polling_catch_up:
+        poller = UpdatePoller(
+            client,
+            repo,
+            queue,
+            max_batch=settings.polling_max_batch,
+            idle_seconds=settings.polling_idle_seconds,
+        )
+        app.state.poller = poller
+        # catch-up alone drains what arrived while we were down, then leaves the rest to the webhook
+        app.state.poller_task = asyncio.create_task(poller.run(stop_when_idle=not settings.polling_enabled))
 
-    if settings.register_webhook and settings.webhook_base_url:
+    if settings.register_webhook and settings.webhook_base_url and not settings.polling_enabled:
         webhook_base = settings.webhook_base_url.rstrip("/")
         await client.update_bot_endpoints(
             [
@@ -167,20 +162,40 @@ async def startup() -> None:
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
-    worker = app.state.worker
-    await worker.stop()
-    janitor_task = app.state.janitor_task
-    janitor_task.cancel()
-    with contextlib.suppress(asyncio.CancelledError):
-        await janitor_task
+    # stop pulling updates before the workers that consume them
+    for task in (app.state.prewarm_task, app.state.poller_task, app.state.janitor_task, app.state.outbox_task):
+        if task is None:
+            continue
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    if app.state.worker is not None:
+        await app.state.worker.stop()
+    # purges started by /del run outside the workers; what they leave is kept for /del resume
+    await app.state.context["bulk_delete"].close()
+    app.state.queue.close()
+    if app.state.queue.backend is not None:
+        app.state.queue.backend.close()
     await app.state.context["client"].close()
 
 
-rate_limiter = RateLimiter(settings.rate_limit_per_minute)
+rate_limiter = RateLimiter(settings.rate_limit_per_minute, shared=shared_state)
+ingress_limiter = (
+    KeyedRateLimiter(
+        chat_per_minute=settings.ingress_chat_per_minute,
+        sender_per_minute=settings.ingress_sender_per_minute,
+        global_per_minute=settings.rate_limit_per_minute,
+        burst=settings.ingress_burst,
+        shared=shared_state,
+    )
+    if settings.ingress_keyed_limits
+    else None
+)
 app.include_router(
     build_router(
         settings=settings,
         rate_limiter=rate_limiter,
+        ingress_limiter=ingress_limiter,
     )
 )
 
@@ -215,8 +230,14 @@ async def health_queue() -> dict[str, object]:
                 "last_error": status.last_error,
                 "last_error_at": status.last_error_at,
             }
-            for status in worker.statuses()
+            for status in (worker.statuses() if worker is not None else [])
         ],
+        "polling": app.state.poller.stats_dict() if app.state.poller is not None else None,
+        "ingress": ingress_limiter.stats() if ingress_limiter is not None else None,
+        "admission": queue.admission.stats_dict() if queue.admission is not None else None,
+        "spill": queue.spill.stats() if queue.spill is not None else None,
+        "store": queue.backend.counts() if queue.backend is not None else None,
+        "shared_state": shared_state.stats() if shared_state is not None else None,
         "stats": {
             "total_updates": stats.total_updates,
             "total_errors": stats.total_errors,
@@ -226,6 +247,20 @@ async def health_queue() -> dict[str, object]:
     }
 
 
+@app.get("/health/api")
+async def health_api() -> dict[str, object]:
+    stats = app.state.context["client"].rate_limiter_stats()
+    stats["moderation"] = app.state.context["moderation"].stats()
+    if app.state.outbox is not None:
+        stats["outbox"] = app.state.outbox.stats_dict()
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    return app.state.context["client"].telemetry.render_prometheus()
+
+
 @app.post("/health/queue/drain")
 async def drain_queue() -> dict[str, object]:
     queue = app.state.queue
@@ -1,5 +1,5 @@
 from __future__ import annotations
 
-from app.core.rubika_client import ApiRateLimiter, RubikaClient
+from app.core.rubika_client import HierarchicalRateLimiter, RubikaClient
 
-__all__ = ["ApiRateLimiter", "RubikaClient"]
+__all__ = ["HierarchicalRateLimiter", "RubikaClient"]
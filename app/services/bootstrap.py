@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Any
+
+from app import __version__
+from app.config import Settings
+from app.core import rubika_client
+from app.core.rubika_client import RubikaClient
+from app.db import Repository, ensure_schema
+from app.services.bulk_delete import BulkDeleteEngine
+from app.services.moderation import ModerationExecutor
+from app.services.plugins.commands import CommandRegistry
+from app.utils.shared_state import SharedStateTable
+from app.utils.stats import StatsCollector
+
+
+def resolve_db_path(url: str) -> str:
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "", 1)
+    return url
+
+
+def build_repository(settings: Settings) -> Repository:
+    db_path = resolve_db_path(settings.database_url)
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    ensure_schema(db_path)
+    return Repository(
+        db_path,
+        cache_size=settings.settings_cache_size,
+        cache_ttl_seconds=settings.settings_cache_ttl_seconds,
+        pragmas={
+            "busy_timeout": str(settings.db_busy_timeout_ms),
+            "synchronous": settings.db_synchronous,
+            "cache_size": str(-settings.db_cache_size_kb),
+            "wal_autocheckpoint": str(settings.db_wal_autocheckpoint),
+            "journal_size_limit": str(settings.db_journal_size_limit),
+        },
+    )
+
+
+def build_shared_state(settings: Settings) -> SharedStateTable | None:
+    if not settings.shared_state_path:
+        return None
+    return SharedStateTable(settings.shared_state_path, slots=settings.shared_state_slots)
+
+
+def build_client(
+    settings: Settings,
+    *,
+    rate_share: float = 1.0,
+    shared_state: SharedStateTable | None = None,
+) -> RubikaClient:
+    """rate_share scales every API rate, so N worker processes together stay within the configured limits.
+    With shared_state the processes charge the same buckets instead and need no share."""
+
+    def _share(rate: float) -> float:
+        return rate * rate_share
+
+    # looked up on the module at call time, so a patched client class is picked up
+    return rubika_client.RubikaClient(
+        settings.bot_token,
+        settings.api_base_url,
+        timeout_seconds=settings.api_timeout_seconds,
+        retry_attempts=settings.api_retry_attempts,
+        retry_backoff=settings.api_retry_backoff,
+        rate_limit_per_second=max(1, math.floor(_share(settings.api_rate_limit_per_second))),
+        method_burst=settings.api_method_burst,
+        method_rate_limits={method: _share(rate) for method, rate in settings.api_method_rate_limits.items()},
+        global_rate_limit_per_second=_share(settings.api_global_rate_limit_per_second) or None,
+        global_burst=settings.api_global_burst,
+        chat_rate_limit_per_second=_share(settings.api_chat_rate_limit_per_second) or None,
+        chat_burst=settings.api_chat_burst,
+        chat_idle_seconds=settings.api_chat_idle_seconds,
+        max_chat_buckets=settings.api_chat_max_buckets,
+        adaptive=settings.api_adaptive_enabled,
+        adaptive_min_rate_per_second=_share(settings.api_adaptive_min_rate_per_second),
+        max_concurrency_per_method=settings.api_max_concurrency_per_method,
+        retry_budget_ratio=settings.api_retry_budget_ratio,
+        retry_budget_min_per_second=_share(settings.api_retry_budget_min_per_second),
+        retry_after_max_seconds=settings.api_retry_after_max_seconds,
+        outbound_max_pending=settings.api_outbound_max_pending,
+        outbound_deadlines=settings.api_outbound_deadlines,
+        coalesce_window_seconds=settings.api_coalesce_window_ms / 1000,
+        max_text_length=settings.api_max_text_length,
+        read_cache_size=settings.api_read_cache_size,
+        read_cache_ttls=settings.api_read_cache_ttls,
+        max_connections=settings.api_pool_max_connections,
+        max_keepalive_connections=settings.api_pool_max_keepalive,
+        keepalive_expiry_seconds=settings.api_pool_keepalive_expiry_seconds,
+        http2=settings.api_http2,
+        shared_state=shared_state,
+    )
+
+
+def build_context(
+    settings: Settings,
+    repo: Repository,
+    client: RubikaClient,
+    command_registry: CommandRegistry,
+    stats: StatsCollector,
+    shared_state: SharedStateTable | None = None,
+) -> dict[str, Any]:
+    return {
+        "repo": repo,
+        "client": client,
+        "command_registry": command_registry,
+        "report_anti_actions": True,
+        "stats": stats,
+        "version": __version__,
+        "owner_id": settings.owner_id,
+        "settings": settings,
+        "bulk_delete": BulkDeleteEngine(repo, client, concurrency=settings.bulk_delete_concurrency),
+        "moderation": ModerationExecutor(timeouts=settings.moderation_action_timeouts),
+        "shared_state": shared_state,
+    }
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.outbound import OUTBOUND_BULK
+from app.db.repository import Repository
+
+LOGGER = logging.getLogger(__name__)
+
+RESUME_KEY_PREFIX = "bulk_delete:"
+
+
+@dataclass
+class BulkDeleteJob:
+    chat_id: str
+    message_ids: list[str]
+    deleted_ids: list[str] = field(default_factory=list)
+    failed: int = 0
+    taken: int = 0
+    # taken but not answered yet, and answered with a retryable error: both still need deleting
+    in_flight: set[str] = field(default_factory=set)
+    retry_ids: set[str] = field(default_factory=set)
+    cancelled: bool = False
+    status_message_id: str | None = None
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def total(self) -> int:
+        return len(self.message_ids)
+
+    @property
+    def remaining(self) -> list[str]:
+        """What /del resume should still delete, in the original order."""
+        unsettled = self.in_flight | self.retry_ids
+        taken = [message_id for message_id in self.message_ids[: self.taken] if message_id in unsettled]
+        return taken + self.message_ids[self.taken :]
+
+    def progress_text(self) -> str:
+        done = len(self.deleted_ids) + self.failed
+        return f"در حال حذف: {done}/{self.total} | حذف شد: {len(self.deleted_ids)} | ناموفق: {self.failed}"
+
+
+class BulkDeleteEngine:
+    """Deletes many messages through a bounded set of workers; pacing comes from the client's rate limiter."""
+
+    def __init__(
+        self,
+        repo: Repository,
+        client: Any,
+        *,
+        concurrency: int = 8,
+        progress_interval_seconds: float = 3.0,
+    ) -> None:
+        self.repo = repo
+        self.client = client
+        self.concurrency = max(concurrency, 1)
+        self.progress_interval_seconds = progress_interval_seconds
+        self.jobs: dict[str, BulkDeleteJob] = {}
+        self._tasks: set[asyncio.Task[BulkDeleteJob]] = set()
+
+    def is_running(self, chat_id: str) -> bool:
+        return chat_id in self.jobs
+
+    def cancel(self, chat_id: str) -> bool:
+        job = self.jobs.get(chat_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        return True
+
+    def pending_resume(self, chat_id: str) -> list[str]:
+        raw = self.repo.get_setting(RESUME_KEY_PREFIX + chat_id)
+        return json.loads(raw) if raw else []
+
+    def start(self, chat_id: str, message_ids: list[str]) -> asyncio.Task[BulkDeleteJob]:
+        """Run the purge in the background, so the command that asked for it returns right away."""
+        job = BulkDeleteJob(chat_id=chat_id, message_ids=list(message_ids))
+        # registered before the task runs, so a second /del right after this one sees it
+        self.jobs[chat_id] = job
+        # written up front so a restart mid-purge can still be resumed
+        self._save_resume(job)
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    async def run(self, chat_id: str, message_ids: list[str]) -> BulkDeleteJob:
+        return await self.start(chat_id, message_ids)
+
+    def _finished(self, task: asyncio.Task[BulkDeleteJob]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error("Bulk delete failed", exc_info=task.exception())
+
+    async def join(self) -> None:
+        """Wait for every running purge to finish."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Stop running purges; what they did not get to stays available to /del resume."""
+        for task in self._tasks:
+            task.cancel()
+        await self.join()
+
+    async def _run(self, job: BulkDeleteJob) -> BulkDeleteJob:
+        chat_id = job.chat_id
+        try:
+            # a merged send would hand back the id of a message shared with other texts
+            sent = await self.client.send_message(chat_id, job.progress_text(), coalesce=False)
+            job.status_message_id = ((sent or {}).get("data") or {}).get("message_id")
+
+            async def _worker() -> None:
+                while not job.cancelled and job.taken < job.total:
+                    message_id = job.message_ids[job.taken]
+                    job.taken += 1
+                    job.in_flight.add(message_id)
+                    try:
+                        result = await self.client.delete_message(chat_id, message_id, outbound_class=OUTBOUND_BULK)
+                    except Exception:  # noqa: BLE001
+                        LOGGER.exception("Failed to delete message %s", message_id)
+                        result = {"ok": False}
+                    job.in_flight.discard(message_id)
+                    if result.get("ok", True):
+                        job.deleted_ids.append(message_id)
+                    else:
+                        job.failed += 1
+                        if result.get("retryable"):
+                            job.retry_ids.add(message_id)
+
+            progress = asyncio.create_task(self._report_progress(job))
+            try:
+                await asyncio.gather(*[_worker() for _ in range(self.concurrency)])
+            finally:
+                progress.cancel()
+        finally:
+            self.jobs.pop(chat_id, None)
+            self.repo.delete_messages(chat_id, job.deleted_ids)
+            self._save_resume(job)
+        await self._update_status(job, self._summary(job))
+        return job
+
+    def _summary(self, job: BulkDeleteJob) -> str:
+        text = f"حذف شد: {len(job.deleted_ids)} | ناموفق: {job.failed}"
+        remaining = job.remaining
+        if remaining:
+            text += " | لغو شد،" if job.cancelled else " |"
+            text += f" {len(remaining)} پیام باقی ماند (/del resume)"
+        return text
+
+    def _save_resume(self, job: BulkDeleteJob) -> None:
+        remaining = job.remaining
+        if remaining:
+            self.repo.set_setting(RESUME_KEY_PREFIX + job.chat_id, json.dumps(remaining))
+        else:
+            self.repo.delete_setting(RESUME_KEY_PREFIX + job.chat_id)
+
+    async def _report_progress(self, job: BulkDeleteJob) -> None:
+        if job.status_message_id is None:
+            return
+        while True:
+            await asyncio.sleep(self.progress_interval_seconds)
+            self._save_resume(job)
+            await self._update_status(job, job.progress_text())
+
+    async def _update_status(self, job: BulkDeleteJob, text: str) -> None:
+        if job.status_message_id is None:
+            await self.client.send_message(job.chat_id, text)
+            return
+        await self.client.edit_message_text(job.chat_id, job.status_message_id, text)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import logging
 from typing import Any
 
@@ -225,6 +224,24 @@ async def delete_handler(message: dict[str, Any], context: dict[str, Any], args:
         return
     repo = context["repo"]
     client = context["client"]
+    engine = context["bulk_delete"]
+    action = args[0].lower() if args else ""
+    if action == "cancel":
+        if engine.cancel(chat_id):
+            await client.send_message(chat_id, "حذف انبوه در حال توقف است.")
+        else:
+            await client.send_message(chat_id, "حذف انبوهی در جریان نیست.")
+        return
+    if engine.is_running(chat_id):
+        await client.send_message(chat_id, "حذف انبوه دیگری در جریان است. برای توقف: /del cancel")
+        return
+    if action == "resume":
+        message_ids = engine.pending_resume(chat_id)
+        if not message_ids:
+            await client.send_message(chat_id, "حذف نیمه‌کاره‌ای برای ادامه وجود ندارد.")
+            return
+        engine.start(chat_id, message_ids)
+        return
     limit = 100
     if args:
         try:
@@ -240,21 +257,7 @@ async def delete_handler(message: dict[str, Any], context: dict[str, Any], args:
     if not message_ids:
         await client.send_message(chat_id, "پیامی برای حذف پیدا نشد.")
         return
-    deleted = 0
-    failed = 0
-    for idx, message_id in enumerate(message_ids, start=1):
-        try:
-            result = await client.delete_message(chat_id, message_id)
-            if result.get("ok", True):
-                deleted += 1
-            else:
-                failed += 1
-        except Exception:  # noqa: BLE001
-            LOGGER.exception("Failed to delete message %s", message_id)
-            failed += 1
-        if idx % 25 == 0:
-            await asyncio.sleep(0.3)
-    await client.send_message(chat_id, f"حذف شد: {deleted} | ناموفق: {failed}")
+    engine.start(chat_id, message_ids)
 
 
 async def ban_handler(message: dict[str, Any], context: dict[str, Any], args: list[str]) -> None:
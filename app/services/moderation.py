@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable
+
+from app.utils.telemetry import LatencyHistogram
+
+LOGGER = logging.getLogger(__name__)
+
+MODERATION_DELETE = "delete"
+MODERATION_BAN = "ban"
+MODERATION_REPORT = "report"
+
+DEFAULT_ACTION_TIMEOUTS = {
+    MODERATION_DELETE: 10.0,
+    MODERATION_BAN: 10.0,
+    MODERATION_REPORT: 5.0,
+}
+
+
+@dataclass
+class ModerationActionStats:
+    ok: int = 0
+    failed: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "latency": self.latency.snapshot(),
+        }
+
+
+class ModerationExecutor:
+    """Runs the independent actions of one moderation decision (delete, ban, report) concurrently.
+
+    A timeout only stops waiting: the call itself keeps running in the background, so a slow
+    delete still lands and moderation calls keep their "never stale" outbound class."""
+
+    def __init__(self, *, timeouts: dict[str, float] | None = None) -> None:
+        self.timeouts = {**DEFAULT_ACTION_TIMEOUTS, **(timeouts or {})}
+        self.actions: dict[str, ModerationActionStats] = {}
+        self.decisions = LatencyHistogram()
+        self._background: set[asyncio.Task] = set()
+
+    def _action(self, name: str) -> ModerationActionStats:
+        entry = self.actions.get(name)
+        if entry is None:
+            entry = ModerationActionStats()
+            self.actions[name] = entry
+        return entry
+
+    async def run(self, actions: dict[str, Awaitable[dict[str, Any]]]) -> dict[str, dict[str, Any]]:
+        started = time.perf_counter()
+        names = list(actions)
+        results = await asyncio.gather(*[self._run_action(name, actions[name]) for name in names])
+        self.decisions.observe((time.perf_counter() - started) * 1000)
+        return dict(zip(names, results))
+
+    async def _run_action(self, name: str, call: Awaitable[dict[str, Any]]) -> dict[str, Any]:
+        stats = self._action(name)
+        started = time.perf_counter()
+        task = asyncio.ensure_future(call)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), self.timeouts.get(name))
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            self._background.add(task)
+            task.add_done_callback(self._finish_background)
+            LOGGER.warning("Moderation action %s timed out; left running", name)
+            return {"ok": False, "error": "timeout", "action": name}
+        except Exception as exc:  # noqa: BLE001
+            stats.errors += 1
+            LOGGER.exception("Moderation action %s failed", name)
+            return {"ok": False, "error": str(exc), "action": name}
+        finally:
+            stats.latency.observe((time.perf_counter() - started) * 1000)
+        if (result or {}).get("ok", True):
+            stats.ok += 1
+        else:
+            stats.failed += 1
+        return result or {}
+
+    def _finish_background(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error("Moderation action failed after timeout: %s", task.exception())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "decisions": self.decisions.snapshot(),
+            "in_background": len(self._background),
+            "actions": {name: entry.snapshot() for name, entry in self.actions.items()},
+        }
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.core.outbound import OUTBOUND_BULK
+from app.db.repository import Repository
+
+LOGGER = logging.getLogger(__name__)
+
+# idempotent moderation actions and the payload field that identifies what they act on
+OUTBOX_METHODS = {
+    "deleteMessage": "message_id",
+    "banChatMember": "user_id",
+    "unbanChatMember": "user_id",
+}
+# actions that undo each other: once one is done or queued, a pending replay of the other is stale
+OPPOSITE_METHODS = {"banChatMember": "unbanChatMember", "unbanChatMember": "banChatMember"}
+
+
+@dataclass
+class OutboxStats:
+    recorded: int = 0
+    deduped: int = 0
+    replayed: int = 0
+    discarded: int = 0
+    deferred: int = 0
+    expired: int = 0
+    superseded: int = 0
+
+
+class Outbox:
+    """Keeps moderation actions that failed because the API was unavailable and replays them later.
+
+    Several processes may record into and replay one outbox: replay_once() leases the rows it
+    takes, so each entry is replayed by one of them.
+    """
+
+    def __init__(
+        self,
+        repo: Repository,
+        *,
+        max_age_seconds: float = 3600.0,
+        batch_size: int = 50,
+        rate_per_second: float = 5.0,
+        retry_seconds: float = 30.0,
+        lease_seconds: float = 300.0,
+    ) -> None:
+        self.repo = repo
+        self.max_age_seconds = max_age_seconds
+        self.batch_size = max(batch_size, 1)
+        self.rate_per_second = max(rate_per_second, 0.1)
+        self.retry_seconds = retry_seconds
+        # long enough for a whole batch at rate_per_second, or another replayer takes it over
+        self.lease_seconds = max(lease_seconds, 2 * self.batch_size / self.rate_per_second)
+        self.stats = OutboxStats()
+
+    def attach(self, client: Any) -> None:
+        client.undelivered_sink = self.record
+        client.delivered_sink = self.delivered
+
+    def record(self, method: str, payload: dict[str, Any], result: dict[str, Any]) -> None:
+        target_field = OUTBOX_METHODS.get(method)
+        if target_field is None:
+            return
+        chat_id = payload.get("chat_id")
+        target = payload.get(target_field)
+        if not chat_id or not target:
+            return
+        self._supersede(method, str(chat_id), str(target))
+        if self.repo.enqueue_outbox(method, str(chat_id), str(target), json.dumps(payload, ensure_ascii=False)):
+            self.stats.recorded += 1
+            LOGGER.warning("Queued %s for %s in outbox after %s", method, chat_id, result.get("error"))
+        else:
+            self.stats.deduped += 1
+
+    def delivered(self, method: str, payload: dict[str, Any], result: dict[str, Any]) -> None:
+        opposite = OPPOSITE_METHODS.get(method)
+        if opposite is None:
+            return
+        chat_id = payload.get("chat_id")
+        target = payload.get(OUTBOX_METHODS[method])
+        if chat_id and target:
+            self._supersede(method, str(chat_id), str(target))
+
+    def _supersede(self, method: str, chat_id: str, target: str) -> None:
+        opposite = OPPOSITE_METHODS.get(method)
+        if opposite is None:
+            return
+        superseded = self.repo.delete_outbox_target(opposite, chat_id, target)
+        if superseded:
+            self.stats.superseded += superseded
+            LOGGER.info("Dropped queued %s for %s in %s after %s", opposite, target, chat_id, method)
+
+    async def replay_once(self, client: Any) -> int:
+        self.stats.expired += self.repo.expire_outbox(self.max_age_seconds)
+        rows = self.repo.claim_due_outbox(self.batch_size, self.lease_seconds)
+        done: list[int] = []
+        interval = 1.0 / self.rate_per_second
+        try:
+            for idx, row in enumerate(rows):
+                if idx:
+                    await asyncio.sleep(interval)
+                # bulk calls never reach the undelivered sink; failures are deferred below instead
+                result = await client.api_call(row["method"], json.loads(row["payload"]), outbound_class=OUTBOUND_BULK)
+                if result.get("retryable"):
+                    # still unavailable: leave the rest of the batch for the next round
+                    pending = [item["id"] for item in rows[idx:]]
+                    self.repo.defer_outbox(pending, time.time() + self.retry_seconds, str(result.get("error")))
+                    self.stats.deferred += len(pending)
+                    break
+                done.append(row["id"])
+                if result.get("ok", True):
+                    self.stats.replayed += 1
+                else:
+                    # the API answered, e.g. the message is already gone; retrying will not help
+                    self.stats.discarded += 1
+        finally:
+            if done:
+                self.repo.delete_outbox(done)
+        return len(done)
+
+    async def run(self, client: Any, interval_seconds: float = 10.0) -> None:
+        while True:
+            try:
+                while await self.replay_once(client) >= self.batch_size:
+                    pass
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Outbox replay failed")
+            await asyncio.sleep(interval_seconds)
+
+    def stats_dict(self) -> dict[str, int]:
+        return {"pending": self.repo.count_records("outbox"), **asdict(self.stats)}
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from app.services.handlers import (
+    about_handler,
+    admins_handler,
+    antilink_handler,
+    ban_handler,
+    calc_handler,
+    coin_handler,
+    delete_handler,
+    echo_handler,
+    filter_handler,
+    help_handler,
+    id_handler,
+    joke_handler,
+    models_handler,
+    ping_handler,
+    roll_handler,
+    settings_handler,
+    setcmd_handler,
+    stats_handler,
+    time_handler,
+    unban_handler,
+    uptime_handler,
+)
+from app.services.plugins.anti_flood import AntiFloodPlugin
+from app.services.plugins.anti_link import AntiLinkPlugin
+from app.services.plugins.commands import Command, CommandRegistry, CommandsPlugin
+from app.services.plugins.filters import FilterWordsPlugin
+from app.services.plugins.incoming_snapshot import IncomingSnapshotPlugin
+from app.services.plugins.logging import MessageLoggingPlugin
+from app.services.plugins.panel import PanelPlugin
+from app.services.plugins.registry import PluginRegistry
+
+
+def build_command_registry() -> CommandRegistry:
+    command_registry = CommandRegistry()
+    command_registry.register(Command("help", "نمایش راهنما", help_handler))
+    command_registry.register(Command("setcmd", "ثبت دستورات", setcmd_handler, admin_only=True))
+    command_registry.register(Command("ping", "تست سرعت", ping_handler))
+    command_registry.register(Command("uptime", "نمایش مدت زمان اجرا", uptime_handler))
+    command_registry.register(Command("stats", "آمار پردازش", stats_handler))
+    command_registry.register(Command("echo", "تکرار متن", echo_handler))
+    command_registry.register(Command("id", "نمایش شناسه‌ها", id_handler))
+    command_registry.register(Command("time", "زمان سرور", time_handler))
+    command_registry.register(Command("calc", "محاسبه ساده", calc_handler))
+    command_registry.register(Command("coin", "شیر یا خط", coin_handler))
+    command_registry.register(Command("roll", "تاس", roll_handler))
+    command_registry.register(Command("joke", "جوک کوتاه", joke_handler))
+    command_registry.register(Command("models", "مدل ها", models_handler))
+    command_registry.register(Command("about", "نسخه بات", about_handler))
+    command_registry.register(Command("settings", "تنظیمات گروه", settings_handler, admin_only=True))
+    command_registry.register(Command("admins", "تعداد ادمین‌ها", admins_handler, admin_only=True))
+    command_registry.register(Command("antilink", "تنظیم ضد لینک", antilink_handler, admin_only=True))
+    command_registry.register(Command("filter", "مدیریت فیلتر", filter_handler, admin_only=True))
+    command_registry.register(Command("del", "حذف انبوه", delete_handler, admin_only=True))
+    command_registry.register(Command("ban", "بن کاربر", ban_handler, admin_only=True))
+    command_registry.register(Command("unban", "رفع بن", unban_handler, admin_only=True))
+    return command_registry
+
+
+def build_plugin_registry(command_registry: CommandRegistry) -> PluginRegistry:
+    return PluginRegistry(
+        [
+            IncomingSnapshotPlugin(),
+            MessageLoggingPlugin(),
+            AntiLinkPlugin(),
+            AntiFloodPlugin(),
+            FilterWordsPlugin(),
+            CommandsPlugin(command_registry),
+            PanelPlugin(),
+        ]
+    )
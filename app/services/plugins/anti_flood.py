@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import time
 from collections import defaultdict, deque
-from typing import Any, Deque
+from typing import TYPE_CHECKING, Any, Deque
 
+from app.services.moderation import MODERATION_BAN, MODERATION_DELETE, ModerationExecutor
 from app.utils.message import extract_message, get_chat_id, get_sender_id
 from .base import Plugin
 
+if TYPE_CHECKING:
+    from app.utils.shared_state import Values
+
 
 class AntiFloodPlugin(Plugin):
     name = "anti_flood"
@@ -14,6 +18,32 @@ class AntiFloodPlugin(Plugin):
     def __init__(self, window_seconds: int = 8) -> None:
         self.window_seconds = window_seconds
         self._events: dict[str, Deque[float]] = defaultdict(deque)
+        self._last_sweep = time.monotonic()
+        self.moderation = ModerationExecutor()
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.window_seconds:
+            return
+        self._last_sweep = now
+        idle = [key for key, events in self._events.items() if not events or now - events[-1] > self.window_seconds]
+        for key in idle:
+            del self._events[key]
+
+    def _count_shared(self, values: Values, now: float) -> tuple[Values, float]:
+        # a sliding-window counter (window start, count, previous window's count) fits in a table
+        # slot where the per-message timestamps do not; the previous window is weighted by overlap
+        started, count, previous = values
+        elapsed = now - started
+        if not started:
+            started, count, previous = now, 0.0, 0.0
+        elif elapsed >= self.window_seconds:
+            windows = elapsed // self.window_seconds
+            previous = count if windows == 1 else 0.0
+            started += windows * self.window_seconds
+            count = 0.0
+        count += 1
+        overlap = 1 - (now - started) / self.window_seconds
+        return (started, count, previous), count + previous * overlap
 
     async def handle(self, update: dict[str, Any], context: dict[str, Any]) -> bool:
         repo = context["repo"]
@@ -32,14 +62,21 @@ class AntiFloodPlugin(Plugin):
             return False
         now = time.monotonic()
         key = f"{chat_id}:{sender_id}"
-        events = self._events[key]
-        while events and now - events[0] > self.window_seconds:
-            events.popleft()
-        events.append(now)
-        if len(events) > settings.flood_limit:
+        shared = context.get("shared_state")
+        if shared is not None:
+            count = shared.update(f"flood:{key}", lambda values: self._count_shared(values, now))
+        else:
+            self._sweep(now)
+            events = self._events[key]
+            while events and now - events[0] > self.window_seconds:
+                events.popleft()
+            events.append(now)
+            count = len(events)
+        if count > settings.flood_limit:
             message_id = message.get("message_id") or message.get("id")
+            actions = {MODERATION_BAN: client.ban_chat_member(chat_id, sender_id)}
             if message_id:
-                await client.delete_message(chat_id, message_id)
-            await client.ban_chat_member(chat_id, sender_id)
+                actions[MODERATION_DELETE] = client.delete_message(chat_id, message_id)
+            await (context.get("moderation") or self.moderation).run(actions)
             return True
         return False
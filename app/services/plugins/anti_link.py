@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.services.moderation import MODERATION_BAN, MODERATION_DELETE, MODERATION_REPORT, ModerationExecutor
 from app.utils.message import extract_message, get_chat_id, get_message_id, get_sender_id, get_text
 from app.utils.regex import contains_link
 from .base import Plugin
@@ -10,6 +11,9 @@ from .base import Plugin
 class AntiLinkPlugin(Plugin):
     name = "anti_link"
 
+    def __init__(self) -> None:
+        self.moderation = ModerationExecutor()
+
     async def handle(self, update: dict[str, Any], context: dict[str, Any]) -> bool:
         repo = context["repo"]
         client = context["client"]
@@ -32,10 +36,12 @@ class AntiLinkPlugin(Plugin):
         if not contains_link(text):
             return False
         message_id = get_message_id(message)
+        actions = {}
         if message_id:
-            await client.delete_message(chat_id, message_id)
+            actions[MODERATION_DELETE] = client.delete_message(chat_id, message_id)
         if sender_id:
-            await client.ban_chat_member(chat_id, sender_id)
+            actions[MODERATION_BAN] = client.ban_chat_member(chat_id, sender_id)
         if context.get("report_anti_actions"):
-            await client.send_message(chat_id, "کاربر به دلیل ارسال لینک بن شد و پیام حذف شد.")
+            actions[MODERATION_REPORT] = client.send_message(chat_id, "کاربر به دلیل ارسال لینک بن شد و پیام حذف شد.")
+        await (context.get("moderation") or self.moderation).run(actions)
         return True
@@ -77,7 +77,7 @@ class PanelPlugin(Plugin):
             await client.send_message(chat_id, f"فیلترها:\n{text}")
             return True
         if data == "panel:delete":
-            await client.send_message(chat_id, "برای حذف انبوه از /del <n> استفاده کنید.")
+            await client.send_message(chat_id, "برای حذف انبوه از /del <n> استفاده کنید (توقف: /del cancel، ادامه: /del resume).")
             return True
         return False
 
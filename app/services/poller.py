@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.core.queue import JobQueue
+from app.db.repository import Repository
+from app.webhook.router import build_job
+
+LOGGER = logging.getLogger(__name__)
+
+OFFSET_SETTING_KEY = "polling:offset"
+
+
+@dataclass
+class PollerStats:
+    polls: int = 0
+    empty_polls: int = 0
+    updates: int = 0
+    enqueued: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    errors: int = 0
+    throttled: int = 0
+    last_limit: int = 0
+
+
+def normalize_update(update: dict[str, Any]) -> dict[str, Any]:
+    # getUpdates nests the message under new_message/updated_message with chat_id on the
+    # envelope; webhook payloads carry it under "message", which is what build_job reads
+    if "message" in update:
+        return update
+    message = update.get("new_message") or update.get("updated_message")
+    if not message:
+        return update
+    return {**update, "message": {"chat_id": update.get("chat_id"), **message}}
+
+
+class UpdatePoller:
+    """Pulls updates with getUpdates into the same JobQueue the webhook feeds.
+
+    The next poll is issued as soon as a batch arrives, so enqueueing overlaps the round trip.
+    The batch size shrinks with the free room in the queue, polling pauses while admission
+    control is shedding, and the offset is stored in the
+    settings table once a batch is enqueued so a restart picks up where it stopped."""
+
+    def __init__(
+        self,
+        client: Any,
+        repo: Repository,
+        queue: JobQueue,
+        *,
+        max_batch: int = 100,
+        idle_seconds: float = 1.0,
+        high_watermark: float = 0.8,
+        max_backoff_seconds: float = 30.0,
+    ) -> None:
+        self.client = client
+        self.repo = repo
+        self.queue = queue
+        self.max_batch = max(max_batch, 1)
+        self.idle_seconds = idle_seconds
+        self.high_watermark = high_watermark
+        self.max_backoff_seconds = max_backoff_seconds
+        self.offset = repo.get_setting(OFFSET_SETTING_KEY)
+        self.stats = PollerStats()
+
+    def batch_limit(self, reserved: int = 0) -> int:
+        admission = self.queue.admission
+        if admission is not None and admission.shedding:
+            return 0
+        free = int(self.queue.max_size * self.high_watermark) - self.queue.size() - reserved
+        return max(0, min(self.max_batch, free))
+
+    async def _wait_for_room(self, reserved: int) -> int:
+        limit = self.batch_limit(reserved)
+        while limit == 0:
+            self.stats.throttled += 1
+            await asyncio.sleep(self.idle_seconds)
+            # the batch we were holding has been enqueued by now
+            limit = self.batch_limit()
+        self.stats.last_limit = limit
+        return limit
+
+    async def _fetch(self, offset: str | None, reserved: int = 0) -> dict[str, Any]:
+        limit = await self._wait_for_room(reserved)
+        self.stats.polls += 1
+        try:
+            return await self.client.get_updates(offset=offset, limit=limit)
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.exception("getUpdates raised")
+            return {"ok": False, "error": str(exc)}
+
+    async def _enqueue(self, updates: list[dict[str, Any]]) -> None:
+        for update in updates:
+            # polled updates are never shed: we already hold them, and backing off the poll is enough
+            decision = await self.queue.enqueue(build_job(normalize_update(update)), shed=False)
+            if decision in ("enqueued", "spilled"):
+                self.stats.enqueued += 1
+            elif decision == "duplicate":
+                self.stats.duplicates += 1
+            else:
+                self.stats.dropped += 1
+        self.stats.updates += len(updates)
+
+    def _commit_offset(self, offset: str | None) -> None:
+        if offset is None or offset == self.offset:
+            return
+        self.offset = offset
+        self.repo.set_setting(OFFSET_SETTING_KEY, offset)
+
+    async def run(self, *, stop_when_idle: bool = False) -> int:
+        """Polls until cancelled; with stop_when_idle it returns after the first empty batch (catch-up)."""
+        received = 0
+        backoff = self.idle_seconds
+        pending = asyncio.ensure_future(self._fetch(self.offset))
+        try:
+            while True:
+                result = await pending
+                data = result.get("data") or {}
+                if not result.get("ok", True):
+                    self.stats.errors += 1
+                    LOGGER.warning("getUpdates failed: %s", result.get("error"))
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff_seconds)
+                    pending = asyncio.ensure_future(self._fetch(self.offset))
+                    continue
+                backoff = self.idle_seconds
+                updates = data.get("updates") or []
+                next_offset = data.get("next_offset_id")
+                next_offset = str(next_offset) if next_offset is not None else self.offset
+                if not updates:
+                    self.stats.empty_polls += 1
+                    self._commit_offset(next_offset)
+                    if stop_when_idle:
+                        return received
+                    await asyncio.sleep(self.idle_seconds)
+                    pending = asyncio.ensure_future(self._fetch(next_offset))
+                    continue
+                pending = asyncio.ensure_future(self._fetch(next_offset, reserved=len(updates)))
+                await self._enqueue(updates)
+                received += len(updates)
+                self._commit_offset(next_offset)
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+    def stats_dict(self) -> dict[str, Any]:
+        return {"offset": self.offset, **asdict(self.stats)}
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Callable
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.queue import JobQueue
+from app.utils.dedup import Deduplicator
+from app.utils.fastjson import JSON_LOADERS
+from app.utils.rate_limiter import RateLimiter
+from app.utils.speedcheck import percentile
+from app.webhook.router import build_job, build_router
+
+
+class _Settings:
+    webhook_secret = None
+
+
+def _legacy_loads(raw_body: bytes) -> Any:
+    # what handle_request did before the fast path: decode to str, then parse
+    return json.loads(raw_body.decode("utf-8"))
+
+
+LOADERS: dict[str, Callable[[bytes], Any]] = {"legacy": _legacy_loads, **JSON_LOADERS}
+
+
+def sample_bodies(count: int, text_length: int = 200) -> list[bytes]:
+    bodies = []
+    for idx in range(count):
+        update = {
+            "update_id": str(idx),
+            "type": "NewMessage",
+            "message": {
+                "message_id": str(idx),
+                "chat": {"id": f"g{idx % 97}", "type": "Group", "title": "گروه آزمایشی"},
+                "sender": {"id": f"u{idx % 1009}", "first_name": "کاربر", "username": f"user{idx}"},
+                "text": ("سلام " * (text_length // 5))[:text_length],
+                "time": 1700000000 + idx,
+                "aux_data": {"button_id": None, "start_id": None},
+            },
+        }
+        bodies.append(json.dumps(update, ensure_ascii=False).encode("utf-8"))
+    return bodies
+
+
+def run_parse_benchmark(loads: Callable[[bytes], Any], bodies: list[bytes]) -> dict[str, float]:
+    timings_us = []
+    for body in bodies:
+        started = time.perf_counter()
+        build_job(loads(body))
+        timings_us.append((time.perf_counter() - started) * 1_000_000)
+    return {"p50_us": percentile(timings_us, 50), "p99_us": percentile(timings_us, 99)}
+
+
+async def run_ack_benchmark(
+    loads: Callable[[bytes], Any],
+    bodies: list[bytes],
+    *,
+    concurrency: int = 16,
+) -> dict[str, float]:
+    app = FastAPI()
+    queue = JobQueue(max_size=len(bodies) + 1, deduplicator=Deduplicator(60))
+    app.state.queue = queue
+    app.include_router(build_router(_Settings(), RateLimiter(10**9), json_loads=loads))
+    latencies_ms: list[float] = []
+    next_index = 0
+    headers = {"Content-Type": "application/json"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def _worker() -> None:
+            nonlocal next_index
+            while next_index < len(bodies):
+                body = bodies[next_index]
+                next_index += 1
+                started = time.perf_counter()
+                await client.post("/receiveUpdate", content=body, headers=headers)
+                latencies_ms.append((time.perf_counter() - started) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[_worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": float(len(bodies)),
+        "throughput_per_s": len(bodies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p99_ms": percentile(latencies_ms, 99),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ackbench")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--text-length", type=int, default=200)
+    parser.add_argument("--loaders", default=",".join(LOADERS))
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    bodies = sample_bodies(args.requests, args.text_length)
+    for name in args.loaders.split(","):
+        loads = LOADERS[name]
+        parse = run_parse_benchmark(loads, bodies)
+        ack = asyncio.run(run_ack_benchmark(loads, bodies, concurrency=args.concurrency))
+        print(
+            "AckBench -> {name:<7} parse+build p50: {p50_us:.1f}us, p99: {p99_us:.1f}us | "
+            "ack p50: {ack_p50:.2f}ms, p99: {ack_p99:.2f}ms, rate: {rate:.0f}/s".format(
+                name=name, ack_p50=ack["p50_ms"], ack_p99=ack["p99_ms"], rate=ack["throughput_per_s"], **parse
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
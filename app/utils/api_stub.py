@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request, Response
+
+from app.core.rate_limit import HierarchicalRateLimiter
+
+
+@dataclass
+class StubProfile:
+    latency: str = "constant:0"
+    method_latency: dict[str, str] = field(default_factory=dict)
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 30.0
+    retry_after_seconds: float | None = None
+    rate_limit_per_second: float | None = None
+    rate_limit_burst: int = 5
+    method_rate_limits: dict[str, float] = field(default_factory=dict)
+    seed: int | None = None
+
+
+PROFILES: dict[str, StubProfile] = {
+    "fast": StubProfile(),
+    "realistic": StubProfile(
+        latency="lognormal:40:0.5",
+        error_rate_429=0.005,
+        error_rate_5xx=0.005,
+        rate_limit_per_second=30,
+    ),
+    "degraded": StubProfile(
+        latency="lognormal:200:0.8",
+        error_rate_429=0.05,
+        error_rate_5xx=0.05,
+        timeout_rate=0.01,
+        retry_after_seconds=1.0,
+        rate_limit_per_second=10,
+    ),
+    "outage": StubProfile(error_rate_5xx=1.0),
+}
+
+
+@dataclass
+class CallRecord:
+    method: str
+    payload: dict[str, Any]
+    status_code: int
+    latency_ms: float
+    received_at: float
+    outcome: str
+
+
+def parse_latency(spec: str, rng: random.Random) -> float:
+    kind, *params = spec.split(":")
+    values = [float(item) for item in params]
+    if kind == "constant":
+        return values[0] if values else 0.0
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # median in ms and sigma of the underlying normal
+        return values[0] * rng.lognormvariate(0.0, values[1])
+    if kind == "exp":
+        return rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class RubikaApiStub:
+    def __init__(self, profile: StubProfile | None = None) -> None:
+        self.profile = profile or StubProfile()
+        self.calls: list[CallRecord] = []
+        self.pending_updates: list[dict[str, Any]] = []
+        self.connections: set[tuple[str, int]] = set()
+        self._rng = random.Random(self.profile.seed)
+        self._limiter: HierarchicalRateLimiter | None = None
+        self._next_message_id = 0
+        self._next_update_id = 0
+        self.app = self._build_app()
+
+    def configure(self, profile: StubProfile) -> None:
+        self.profile = profile
+        self._rng = random.Random(profile.seed)
+        self._limiter = None
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.connections.clear()
+        self.pending_updates.clear()
+        self._limiter = None
+
+    def push_update(self, update: dict[str, Any]) -> None:
+        self._next_update_id += 1
+        self.pending_updates.append({"update_id": str(self._next_update_id), **update})
+
+    def _rate_limited(self, method: str) -> bool:
+        rate = self.profile.method_rate_limits.get(method, self.profile.rate_limit_per_second)
+        if not rate:
+            return False
+        if self._limiter is None:
+            self._limiter = HierarchicalRateLimiter(
+                method_rate_per_second=self.profile.rate_limit_per_second or rate,
+                method_burst=self.profile.rate_limit_burst,
+                method_rates=self.profile.method_rate_limits,
+            )
+        return not self._limiter.try_acquire(method)
+
+    def _result(self, method: str, payload: dict[str, Any]) -> dict[str, Any]:
+        if method in {"sendMessage", "sendPoll", "sendLocation", "sendContact", "sendFile", "forwardMessage"}:
+            self._next_message_id += 1
+            return {"message_id": str(self._next_message_id)}
+        if method == "getMe":
+            return {"bot": {"bot_id": "stub-bot", "bot_title": "Stub", "username": "stub_bot"}}
+        if method == "getChat":
+            return {"chat": {"chat_id": payload.get("chat_id"), "chat_type": "Group", "title": "Stub chat"}}
+        if method == "getFile":
+            return {"download_url": f"http://stub.invalid/files/{payload.get('file_id')}"}
+        if method == "requestSendFile":
+            return {"upload_url": "http://stub.invalid/upload"}
+        if method == "getUpdates":
+            limit = int(payload.get("limit") or 100)
+            offset = payload.get("offset")
+            updates = [item for item in self.pending_updates if offset is None or int(item["update_id"]) >= int(offset)]
+            batch = updates[:limit]
+            next_offset = str(int(batch[-1]["update_id"]) + 1) if batch else offset
+            return {"updates": batch, "next_offset_id": next_offset}
+        return {}
+
+    async def handle(self, method: str, payload: dict[str, Any]) -> tuple[int, dict[str, Any], dict[str, str]]:
+        start = time.perf_counter()
+        profile = self.profile
+        headers: dict[str, str] = {}
+        spec = profile.method_latency.get(method, profile.latency)
+        delay_ms = parse_latency(spec, self._rng)
+        roll = self._rng.random()
+        if self._rate_limited(method):
+            status_code, outcome = 429, "rate_limited"
+        elif roll < profile.timeout_rate:
+            await asyncio.sleep(profile.timeout_seconds)
+            status_code, outcome = 504, "timeout"
+        elif roll < profile.timeout_rate + profile.error_rate_429:
+            status_code, outcome = 429, "injected_429"
+        elif roll < profile.timeout_rate + profile.error_rate_429 + profile.error_rate_5xx:
+            status_code, outcome = self._rng.choice([500, 502, 503]), "injected_5xx"
+        else:
+            status_code, outcome = 200, "ok"
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if status_code == 429 and profile.retry_after_seconds is not None:
+            headers["Retry-After"] = f"{profile.retry_after_seconds:g}"
+        if status_code == 200:
+            body = {"ok": True, "status": "OK", "data": self._result(method, payload)}
+        else:
+            body = {"ok": False, "status": "ERROR", "error": outcome}
+        self.calls.append(
+            CallRecord(
+                method=method,
+                payload=payload,
+                status_code=status_code,
+                latency_ms=(time.perf_counter() - start) * 1000,
+                received_at=time.time(),
+                outcome=outcome,
+            )
+        )
+        return status_code, body, headers
+
+    def stats(self) -> dict[str, Any]:
+        by_method: dict[str, dict[str, Any]] = {}
+        for record in self.calls:
+            entry = by_method.setdefault(
+                record.method,
+                {"calls": 0, "statuses": Counter(), "unique_payloads": set(), "latency_ms_total": 0.0},
+            )
+            entry["calls"] += 1
+            entry["statuses"][str(record.status_code)] += 1
+            entry["unique_payloads"].add(json.dumps(record.payload, sort_keys=True))
+            entry["latency_ms_total"] += record.latency_ms
+        summary: dict[str, Any] = {}
+        for method, entry in by_method.items():
+            unique = len(entry["unique_payloads"])
+            summary[method] = {
+                "calls": entry["calls"],
+                "statuses": dict(entry["statuses"]),
+                "retries": entry["calls"] - unique,
+                "avg_latency_ms": entry["latency_ms_total"] / entry["calls"],
+            }
+        if self.calls:
+            span = self.calls[-1].received_at - self.calls[0].received_at
+            ok = sum(1 for record in self.calls if record.status_code == 200)
+            summary["_total"] = {
+                "calls": len(self.calls),
+                "ok": ok,
+                "span_s": span,
+                "ok_per_s": ok / span if span > 0 else float(ok),
+                "connections": len(self.connections),
+            }
+        return summary
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Rubika API stub")
+
+        @app.get("/_stub/calls")
+        async def list_calls() -> list[dict[str, Any]]:
+            return [asdict(record) for record in self.calls]
+
+        @app.get("/_stub/stats")
+        async def get_stats() -> dict[str, Any]:
+            return self.stats()
+
+        @app.post("/_stub/reset")
+        async def reset() -> dict[str, bool]:
+            self.reset()
+            return {"ok": True}
+
+        @app.post("/_stub/profile")
+        async def set_profile(request: Request) -> dict[str, Any]:
+            self.configure(StubProfile(**(await request.json())))
+            return asdict(self.profile)
+
+        @app.post("/_stub/updates")
+        async def push_updates(request: Request) -> dict[str, int]:
+            data = await request.json()
+            for update in data if isinstance(data, list) else [data]:
+                self.push_update(update)
+            return {"pending": len(self.pending_updates)}
+
+        @app.post("/{token}/{method}")
+        async def api_method(token: str, method: str, request: Request) -> Response:
+            if request.client is not None:
+                self.connections.add((request.client.host, request.client.port))
+            raw_body = await request.body()
+            try:
+                payload = json.loads(raw_body) if raw_body else {}
+            except ValueError:
+                payload = {}
+            status_code, body, headers = await self.handle(method, payload)
+            return Response(
+                content=json.dumps(body, ensure_ascii=False),
+                status_code=status_code,
+                media_type="application/json",
+                headers=headers,
+            )
+
+        return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="api_stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--profile", default="fast", choices=sorted(PROFILES))
+    parser.add_argument("--latency", default=None, help="constant:MS, uniform:LO:HI, normal:MU:SD, lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate-429", type=float, default=None)
+    parser.add_argument("--error-rate-5xx", type=float, default=None)
+    parser.add_argument("--timeout-rate", type=float, default=None)
+    parser.add_argument("--rate-limit", type=float, default=None, help="per-method requests per second")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    args = build_parser().parse_args(argv)
+    profile = StubProfile(**asdict(PROFILES[args.profile]))
+    if args.latency is not None:
+        profile.latency = args.latency
+    if args.error_rate_429 is not None:
+        profile.error_rate_429 = args.error_rate_429
+    if args.error_rate_5xx is not None:
+        profile.error_rate_5xx = args.error_rate_5xx
+    if args.timeout_rate is not None:
+        profile.timeout_rate = args.timeout_rate
+    if args.rate_limit is not None:
+        profile.rate_limit_per_second = args.rate_limit
+    profile.seed = args.seed
+    stub = RubikaApiStub(profile)
+    uvicorn.run(stub.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
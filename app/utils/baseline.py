@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+DEFAULT_BASELINE_DIR = Path(os.environ.get("RUBIKA_BENCH_DIR", Path.home() / ".cache" / "rubika-bot" / "benchmarks"))
+
+# Two-sided 95% Student-t critical values by degrees of freedom.
+_T_95 = {
+    1: 12.706,
+    2: 4.303,
+    3: 3.182,
+    4: 2.776,
+    5: 2.571,
+    6: 2.447,
+    7: 2.365,
+    8: 2.306,
+    9: 2.262,
+    10: 2.228,
+    15: 2.131,
+    20: 2.086,
+    30: 2.042,
+}
+
+# metric name -> True when higher values are better
+TRACKED_METRICS = {
+    "throughput_per_s": True,
+    "p99_ms": False,
+}
+
+
+@dataclass
+class MetricSummary:
+    mean: float
+    low: float
+    high: float
+    samples: int
+
+
+@dataclass
+class MetricComparison:
+    metric: str
+    baseline: MetricSummary
+    current: MetricSummary
+    change_pct: float
+    regressed: bool
+
+
+def host_fingerprint() -> dict[str, str]:
+    info = {
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": str(os.cpu_count() or 0),
+        "system": platform.system(),
+        "python": platform.python_implementation() + "-" + ".".join(platform.python_version_tuple()[:2]),
+    }
+    digest = hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:16]
+    info["id"] = digest
+    return info
+
+
+def _t_critical(dof: int) -> float:
+    if dof <= 0:
+        return 0.0
+    # between tabulated rows, take the smaller dof: its wider interval never overstates significance
+    return _T_95[max(known for known in _T_95 if known <= dof)]
+
+
+def summarize(values: Iterable[float]) -> MetricSummary:
+    data = [float(value) for value in values]
+    if not data:
+        return MetricSummary(mean=0.0, low=0.0, high=0.0, samples=0)
+    mean = statistics.fmean(data)
+    if len(data) < 2:
+        return MetricSummary(mean=mean, low=mean, high=mean, samples=len(data))
+    half_width = _t_critical(len(data) - 1) * statistics.stdev(data) / math.sqrt(len(data))
+    return MetricSummary(mean=mean, low=mean - half_width, high=mean + half_width, samples=len(data))
+
+
+def compare_runs(
+    baseline_runs: list[dict[str, float]],
+    current_runs: list[dict[str, float]],
+    *,
+    threshold: float = 0.1,
+) -> list[MetricComparison]:
+    comparisons: list[MetricComparison] = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        base_values = [run[metric] for run in baseline_runs if metric in run]
+        current_values = [run[metric] for run in current_runs if metric in run]
+        if not base_values or not current_values:
+            continue
+        base = summarize(base_values)
+        current = summarize(current_values)
+        change_pct = ((current.mean - base.mean) / base.mean * 100) if base.mean else 0.0
+        if higher_is_better:
+            beyond_threshold = current.mean < base.mean * (1 - threshold)
+            significant = current.high < base.low
+        else:
+            beyond_threshold = current.mean > base.mean * (1 + threshold)
+            significant = current.low > base.high
+        comparisons.append(
+            MetricComparison(
+                metric=metric,
+                baseline=base,
+                current=current,
+                change_pct=change_pct,
+                regressed=beyond_threshold and significant,
+            )
+        )
+    return comparisons
+
+
+def baseline_path(directory: Path, name: str, fingerprint: dict[str, str] | None = None) -> Path:
+    fingerprint = fingerprint or host_fingerprint()
+    return directory / f"{name}-{fingerprint['id']}.json"
+
+
+def save_baseline(
+    directory: Path,
+    name: str,
+    runs: list[dict[str, float]],
+    *,
+    fingerprint: dict[str, str] | None = None,
+) -> Path:
+    fingerprint = fingerprint or host_fingerprint()
+    path = baseline_path(directory, name, fingerprint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "name": name,
+        "host": fingerprint,
+        "created_at": time.time(),
+        "runs": runs,
+    }
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+    return path
+
+
+def load_baseline(
+    directory: Path,
+    name: str,
+    *,
+    fingerprint: dict[str, str] | None = None,
+) -> dict | None:
+    path = baseline_path(directory, name, fingerprint)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def format_comparison(comparisons: list[MetricComparison]) -> str:
+    lines = []
+    for item in comparisons:
+        status = "REGRESSED" if item.regressed else "ok"
+        lines.append(
+            "{metric}: baseline {bmean:.2f} [{blow:.2f}, {bhigh:.2f}] -> current {cmean:.2f} "
+            "[{clow:.2f}, {chigh:.2f}] ({change:+.1f}%) {status}".format(
+                metric=item.metric,
+                bmean=item.baseline.mean,
+                blow=item.baseline.low,
+                bhigh=item.baseline.high,
+                cmean=item.current.mean,
+                clow=item.current.low,
+                chigh=item.current.high,
+                change=item.change_pct,
+                status=status,
+            )
+        )
+    return "\n".join(lines)
@@ -13,17 +13,30 @@ class LruTtlCache(Generic[K, V]):
         self.max_size = max(1, max_size)
         self.ttl_seconds = max(1, ttl_seconds)
         self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
 
     def get(self, key: K) -> V | None:
         now = time.monotonic()
         item = self._data.get(key)
         if not item:
+            self.misses += 1
             return None
         ts, value = item
         if now - ts > self.ttl_seconds:
             self._data.pop(key, None)
+            self.misses += 1
             return None
         self._data.move_to_end(key)
+        self.hits += 1
         return value
 
     def set(self, key: K, value: V) -> None:
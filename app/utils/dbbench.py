@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.db import Repository, ensure_schema
+
+PRAGMA_PROFILES: dict[str, dict[str, str]] = {
+    # SQLite's own defaults: rollback journal, full fsync, no busy handler.
+    "off": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "temp_store": "DEFAULT",
+        "cache_size": "-2000",
+        "busy_timeout": "0",
+        "wal_autocheckpoint": "1000",
+    },
+    "default": {},
+    "tuned": {
+        "busy_timeout": "10000",
+        "cache_size": "-64000",
+        "wal_autocheckpoint": "4000",
+        "mmap_size": "268435456",
+    },
+}
+
+OPERATION_MIX: dict[str, int] = {
+    "save_message": 35,
+    "save_incoming_update": 35,
+    "get_group": 10,
+    "is_admin": 10,
+    "list_filters": 10,
+}
+
+WRITE_OPERATIONS = {"save_message", "save_incoming_update"}
+
+
+@dataclass
+class _WorkerCounters:
+    ops: dict[str, int] = field(default_factory=dict)
+    locked: int = 0
+    errors: int = 0
+    busy_wait_s: float = 0.0
+    write_transactions: int = 0
+
+
+@dataclass
+class BenchConfig:
+    workers: int
+    profile: str
+    batch_size: int
+    maintenance: str = "none"
+
+
+@dataclass
+class BenchResult:
+    config: BenchConfig
+    duration_s: float
+    total_ops: int
+    ops: dict[str, int]
+    locked: int
+    errors: int
+    busy_wait_s: float
+    write_transactions: int
+    wal_max_bytes: int
+    wal_final_bytes: int
+    janitor_runs: int
+    maintenance_runs: int
+
+    @property
+    def ops_per_s(self) -> float:
+        return self.total_ops / self.duration_s if self.duration_s > 0 else 0.0
+
+    @property
+    def locked_rate(self) -> float:
+        attempts = self.total_ops + self.locked
+        return self.locked / attempts if attempts else 0.0
+
+    @property
+    def avg_busy_wait_ms(self) -> float:
+        if not self.write_transactions:
+            return 0.0
+        return self.busy_wait_s / self.write_transactions * 1000
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "workers": self.config.workers,
+            "profile": self.config.profile,
+            "batch_size": self.config.batch_size,
+            "maintenance": self.config.maintenance,
+            "duration_s": self.duration_s,
+            "ops_per_s": self.ops_per_s,
+            "ops": self.ops,
+            "locked": self.locked,
+            "locked_rate": self.locked_rate,
+            "errors": self.errors,
+            "busy_wait_s": self.busy_wait_s,
+            "avg_busy_wait_ms": self.avg_busy_wait_ms,
+            "wal_max_bytes": self.wal_max_bytes,
+            "wal_final_bytes": self.wal_final_bytes,
+            "janitor_runs": self.janitor_runs,
+            "maintenance_runs": self.maintenance_runs,
+        }
+
+
+def _is_write(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return head in {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+
+class _TimedConnection:
+    """Takes the write lock explicitly so the time spent waiting for it can be measured."""
+
+    def __init__(self, conn: sqlite3.Connection, counters: _WorkerCounters) -> None:
+        self._conn = conn
+        self._counters = counters
+
+    def _begin_write(self, sql: str) -> None:
+        if self._conn.in_transaction or not _is_write(sql):
+            return
+        start = time.perf_counter()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE;")
+        finally:
+            self._counters.busy_wait_s += time.perf_counter() - start
+        self._counters.write_transactions += 1
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        self._begin_write(sql)
+        return self._conn.execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Any) -> sqlite3.Cursor:
+        self._begin_write(sql)
+        return self._conn.executemany(sql, parameters)
+
+    def __enter__(self) -> _TimedConnection:
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> Any:
+        try:
+            return self._conn.__exit__(*exc)
+        finally:
+            self._conn.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class _BenchRepository(Repository):
+    def __init__(self, db_path: str, counters: _WorkerCounters, *, pragmas: dict[str, str]) -> None:
+        super().__init__(db_path, pragmas=pragmas)
+        self._counters = counters
+
+    def _connect(self) -> sqlite3.Connection:
+        return _TimedConnection(super()._connect(), self._counters)  # type: ignore[return-value]
+
+
+def _seed(db_path: str, chats: int, profile: str) -> None:
+    repo = Repository(db_path, pragmas=PRAGMA_PROFILES[profile])
+    for idx in range(chats):
+        chat_id = f"chat-{idx}"
+        repo.upsert_group(chat_id, f"Group {idx}")
+        repo.add_admin(chat_id, f"admin-{idx}")
+        repo.add_filter(chat_id, "spam", is_whitelist=False, regex_enabled=False)
+
+
+def _pick_operation(rng: random.Random) -> str:
+    roll = rng.randrange(sum(OPERATION_MIX.values()))
+    for name, weight in OPERATION_MIX.items():
+        if roll < weight:
+            return name
+        roll -= weight
+    return "get_group"
+
+
+def _worker(
+    worker_id: int,
+    db_path: str,
+    config: BenchConfig,
+    chats: int,
+    stop: threading.Event,
+    counters: _WorkerCounters,
+) -> None:
+    rng = random.Random(worker_id)
+    repo = _BenchRepository(db_path, counters, pragmas=PRAGMA_PROFILES[config.profile])
+    pending_messages: list[tuple[str, str, str | None, str | None]] = []
+    pending_updates: list[tuple[str, float, str | None, str | None, str | None, str | None, str | None, None]] = []
+    seq = 0
+
+    def _count(operation: str, done: int = 1) -> None:
+        counters.ops[operation] = counters.ops.get(operation, 0) + done
+
+    def _flush() -> None:
+        # a batched write counts only once its transaction has committed
+        if pending_messages:
+            repo.bulk_insert_messages(pending_messages)
+            _count("save_message", len(pending_messages))
+            pending_messages.clear()
+        if pending_updates:
+            repo.bulk_save_incoming_updates(pending_updates)
+            _count("save_incoming_update", len(pending_updates))
+            pending_updates.clear()
+
+    while not stop.is_set():
+        operation = _pick_operation(rng)
+        chat_id = f"chat-{rng.randrange(chats)}"
+        seq += 1
+        message_id = f"{worker_id}-{seq}"
+        try:
+            if operation == "save_message":
+                if config.batch_size > 1:
+                    pending_messages.append((chat_id, message_id, "user", "hello"))
+                else:
+                    repo.save_message(chat_id, message_id, "user", "hello")
+                    _count(operation)
+            elif operation == "save_incoming_update":
+                row = (message_id, time.time(), chat_id, message_id, "user", "message", "hello", None)
+                if config.batch_size > 1:
+                    pending_updates.append(row)
+                else:
+                    repo.save_incoming_update(*row)
+                    _count(operation)
+            else:
+                if operation == "get_group":
+                    repo.get_group(chat_id)
+                elif operation == "is_admin":
+                    repo.is_admin(chat_id, "user")
+                else:
+                    repo.list_filters(chat_id)
+                _count(operation)
+            if config.batch_size > 1 and len(pending_messages) + len(pending_updates) >= config.batch_size:
+                _flush()
+        except sqlite3.OperationalError as exc:
+            if "locked" in str(exc) or "busy" in str(exc):
+                counters.locked += 1
+                pending_messages.clear()
+                pending_updates.clear()
+            else:
+                counters.errors += 1
+    try:
+        _flush()
+    except sqlite3.OperationalError:
+        counters.locked += 1
+
+
+def _janitor(db_path: str, profile: str, stop: threading.Event, interval_s: float, runs: list[int]) -> None:
+    repo = Repository(db_path, pragmas=PRAGMA_PROFILES[profile])
+    while not stop.wait(interval_s):
+        try:
+            repo.cleanup_incoming_updates(5)
+            repo.trim_messages_per_chat(500)
+            runs[0] += 1
+        except sqlite3.OperationalError:
+            continue
+
+
+def _maintenance(db_path: str, mode: str, stop: threading.Event, interval_s: float, runs: list[int]) -> None:
+    statement = "VACUUM;" if mode == "vacuum" else "PRAGMA optimize;"
+    while not stop.wait(interval_s):
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(statement)
+            runs[0] += 1
+        except sqlite3.OperationalError:
+            continue
+        finally:
+            conn.close()
+
+
+def run_db_benchmark(
+    config: BenchConfig,
+    *,
+    duration_s: float = 5.0,
+    chats: int = 50,
+    directory: str | None = None,
+    janitor_interval_s: float = 1.0,
+    maintenance_interval_s: float = 2.0,
+) -> BenchResult:
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        ensure_schema(db_path)
+        _seed(db_path, chats, config.profile)
+        wal_path = Path(f"{db_path}-wal")
+        stop = threading.Event()
+        counters = [_WorkerCounters() for _ in range(config.workers)]
+        janitor_runs = [0]
+        maintenance_runs = [0]
+        threads = [
+            threading.Thread(target=_worker, args=(idx, db_path, config, chats, stop, counters[idx]))
+            for idx in range(config.workers)
+        ]
+        threads.append(
+            threading.Thread(target=_janitor, args=(db_path, config.profile, stop, janitor_interval_s, janitor_runs))
+        )
+        if config.maintenance != "none":
+            threads.append(
+                threading.Thread(
+                    target=_maintenance,
+                    args=(db_path, config.maintenance, stop, maintenance_interval_s, maintenance_runs),
+                )
+            )
+        wal_max = 0
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        deadline = start + duration_s
+        while time.perf_counter() < deadline:
+            if wal_path.exists():
+                wal_max = max(wal_max, wal_path.stat().st_size)
+            time.sleep(0.05)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        wal_final = wal_path.stat().st_size if wal_path.exists() else 0
+    ops: dict[str, int] = {}
+    for item in counters:
+        for name, count in item.ops.items():
+            ops[name] = ops.get(name, 0) + count
+    return BenchResult(
+        config=config,
+        duration_s=elapsed,
+        total_ops=sum(ops.values()),
+        ops=ops,
+        locked=sum(item.locked for item in counters),
+        errors=sum(item.errors for item in counters),
+        busy_wait_s=sum(item.busy_wait_s for item in counters),
+        write_transactions=sum(item.write_transactions for item in counters),
+        wal_max_bytes=max(wal_max, wal_final),
+        wal_final_bytes=wal_final,
+        janitor_runs=janitor_runs[0],
+        maintenance_runs=maintenance_runs[0],
+    )
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dbbench")
+    parser.add_argument("--workers", default="4,8,16,32")
+    parser.add_argument("--profiles", default="off,default,tuned", help=f"any of {', '.join(PRAGMA_PROFILES)}")
+    parser.add_argument("--batch-sizes", default="1,32", help="1 disables write batching")
+    parser.add_argument("--maintenance", default="none", help="comma list of none, vacuum, optimize")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--dir", default=os.environ.get("RUBIKA_BENCH_TMPDIR"), help="where scratch DBs are created")
+    parser.add_argument("--json", action="store_true")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    unknown = [name for name in _csv(args.profiles) if name not in PRAGMA_PROFILES]
+    if unknown:
+        print(f"DBBench -> unknown profiles: {', '.join(unknown)}")
+        return 2
+    results: list[BenchResult] = []
+    for maintenance in _csv(args.maintenance):
+        for profile in _csv(args.profiles):
+            for batch_size in [int(item) for item in _csv(args.batch_sizes)]:
+                for workers in [int(item) for item in _csv(args.workers)]:
+                    config = BenchConfig(workers=workers, profile=profile, batch_size=batch_size, maintenance=maintenance)
+                    result = run_db_benchmark(config, duration_s=args.duration, chats=args.chats, directory=args.dir)
+                    results.append(result)
+                    if not args.json:
+                        print(
+                            "DBBench -> workers: {w:>2}, pragmas: {p:<7}, batch: {b:>3}, maint: {m:<8} "
+                            "ops/s: {ops:>8.0f}, locked: {locked:>6.2%}, busy-wait: {busy:>7.2f}ms/txn, "
+                            "WAL max: {wal:>7.2f}MB".format(
+                                w=workers,
+                                p=profile,
+                                b=batch_size,
+                                m=maintenance,
+                                ops=result.ops_per_s,
+                                locked=result.locked_rate,
+                                busy=result.avg_busy_wait_ms,
+                                wal=result.wal_max_bytes / (1024**2),
+                            )
+                        )
+    if args.json:
+        print(json.dumps([result.as_dict() for result in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,51 @@
 from __future__ import annotations
 
 import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.utils.shared_state import SharedStateTable, Values
 
 
 class Deduplicator:
-    def __init__(self, ttl_seconds: int) -> None:
+    def __init__(self, ttl_seconds: int, shared: SharedStateTable | None = None) -> None:
         self.ttl_seconds = ttl_seconds
-        self._cache: dict[str, float] = {}
+        # with a shared table, a key seen by any process on the host counts as seen
+        self.shared = shared
+        self._cache: OrderedDict[str, float] = OrderedDict()
 
     def seen(self, key: str | None) -> bool:
         if key is None:
             return False
         now = time.monotonic()
-        expired = [k for k, v in self._cache.items() if now - v > self.ttl_seconds]
-        for k in expired:
-            self._cache.pop(k, None)
+        if self.shared is not None:
+            return self.shared.update(f"dedup:{key}", lambda values: self._mark(values, now))
+        while self._cache:
+            if now - next(iter(self._cache.values())) <= self.ttl_seconds:
+                break
+            self._cache.popitem(last=False)
         if key in self._cache:
             return True
         self._cache[key] = now
         return False
+
+    def contains(self, key: str | None) -> bool:
+        """Like seen(), but without recording the key."""
+        if key is None:
+            return False
+        now = time.monotonic()
+        if self.shared is not None:
+            values = self.shared.get(f"dedup:{key}")
+            return bool(values and values[0] and now - values[0] <= self.ttl_seconds)
+        seen_at = self._cache.get(key)
+        return seen_at is not None and now - seen_at <= self.ttl_seconds
+
+    def _mark(self, values: Values, now: float) -> tuple[Values, bool]:
+        seen_at = values[0]
+        if seen_at and now - seen_at <= self.ttl_seconds:
+            return values, True
+        return (now, 0.0, 0.0), False
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import json
+from importlib.util import find_spec
+from typing import Any, Callable
+
+ORJSON_AVAILABLE = find_spec("orjson") is not None
+
+
+def stdlib_loads(data: bytes | str) -> Any:
+    # json.loads detects the encoding of bytes itself, so there is no separate decode() copy
+    return json.loads(data)
+
+
+JSON_LOADERS: dict[str, Callable[[bytes | str], Any]] = {"json": stdlib_loads}
+
+if ORJSON_AVAILABLE:
+    import orjson
+
+    JSON_LOADERS["orjson"] = orjson.loads
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch ValueError either way
+loads = JSON_LOADERS["orjson"] if ORJSON_AVAILABLE else stdlib_loads
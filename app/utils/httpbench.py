@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.speedcheck import percentile
+
+
+@dataclass
+class PoolConfig:
+    name: str
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry_seconds: float
+    http2: bool = False
+    prewarm: int = 0
+
+
+POOL_CONFIGS = {
+    # httpx.AsyncClient defaults, which the client used before the pool became configurable
+    "httpx-default": PoolConfig("httpx-default", 100, 20, 5.0),
+    "tuned": PoolConfig("tuned", 32, 32, 30.0, prewarm=4),
+}
+
+
+class _StubProcess:
+    """Runs api_stub in its own process so the server does not share the client's GIL."""
+
+    def __init__(self, latency: str) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.latency = latency
+        self._process: subprocess.Popen[bytes] | None = None
+
+    def __enter__(self) -> _StubProcess:
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "app.utils.api_stub", "--port", str(self.port), "--latency", self.latency]
+        )
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.__exit__()
+                    raise RuntimeError("stub server did not start")
+                time.sleep(0.05)
+
+    def stats(self) -> dict:
+        return httpx.get(f"http://127.0.0.1:{self.port}/_stub/stats").json()
+
+    def __exit__(self, *exc: object) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=10)
+
+
+async def run_http_benchmark(
+    base_url: str,
+    config: PoolConfig,
+    *,
+    requests: int = 3000,
+    concurrency: int = 32,
+    pause_every: int = 500,
+    pause_seconds: float = 0.0,
+) -> dict[str, float]:
+    client = RubikaClient(
+        "bench-token",
+        base_url,
+        rate_limit_per_second=10**9,
+        max_concurrency_per_method=concurrency,
+        retry_attempts=0,
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry_seconds=config.keepalive_expiry_seconds,
+        http2=config.http2,
+    )
+    if config.prewarm:
+        await client.prewarm(config.prewarm)
+    latencies_ms: list[float] = []
+    failures = 0
+    max_waiting = 0
+    next_index = 0
+
+    async def _worker() -> None:
+        nonlocal failures, max_waiting, next_index
+        while next_index < requests:
+            idx = next_index
+            next_index += 1
+            if pause_seconds and idx and idx % pause_every == 0:
+                await asyncio.sleep(pause_seconds)
+            started = time.perf_counter()
+            result = await client.api_call("sendMessage", {"chat_id": f"c{idx % 50}", "text": "bench"})
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+            if result.get("ok") is False:
+                failures += 1
+            if idx % 50 == 0:
+                max_waiting = max(max_waiting, client.pool_stats().get("waiting", 0))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    pool = client.pool_stats()
+    await client.close()
+    return {
+        "requests": float(requests),
+        "elapsed_s": elapsed,
+        "throughput_per_s": requests / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p99_ms": percentile(latencies_ms, 99),
+        "failures": float(failures),
+        "pool_connections": float(pool.get("connections", 0)),
+        "max_waiting": float(max_waiting),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="httpbench")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", default="constant:5", help="stub latency, see api_stub --latency")
+    parser.add_argument("--pause-every", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="idle gap that lets short keepalives expire")
+    parser.add_argument("--configs", default=",".join(POOL_CONFIGS))
+    parser.add_argument("--http2", action="store_true", help="also run the tuned pool over HTTP/2")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    configs = [POOL_CONFIGS[name] for name in args.configs.split(",")]
+    if args.http2:
+        tuned = POOL_CONFIGS["tuned"]
+        configs.append(
+            PoolConfig(
+                "tuned-h2",
+                tuned.max_connections,
+                tuned.max_keepalive_connections,
+                tuned.keepalive_expiry_seconds,
+                http2=True,
+                prewarm=tuned.prewarm,
+            )
+        )
+    for config in configs:
+        with _StubProcess(args.latency) as server:
+            result = asyncio.run(
+                run_http_benchmark(
+                    f"http://127.0.0.1:{server.port}",
+                    config,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    pause_every=args.pause_every,
+                    pause_seconds=args.pause,
+                )
+            )
+            opened = server.stats().get("_total", {}).get("connections", 0)
+        print(
+            "HttpBench -> {name:<14} rate: {throughput_per_s:.0f}/s, p50: {p50_ms:.1f}ms, p99: {p99_ms:.1f}ms, "
+            "failures: {failures:.0f}, connections opened: {opened}, pool waiting max: {max_waiting:.0f}".format(
+                name=config.name, opened=opened, **result
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Protocol
+
+from app.core.rate_limit import PRIORITY_HIGH, PRIORITY_NORMAL, HierarchicalRateLimiter
+from app.utils.speedcheck import percentile
+
+
+class _Limiter(Protocol):
+    async def acquire(
+        self, method: str, chat_id: str | None = None, priority: int = PRIORITY_NORMAL
+    ) -> float | None: ...
+
+
+class LockedTokenBucket:
+    """The previous limiter: sleeps while holding its lock. Kept as a reference point."""
+
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        self.rate_per_second = max(rate_per_second, 0.1)
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, method: str, chat_id: str | None = None, priority: int = PRIORITY_NORMAL) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate_per_second)
+            self._last_refill = now
+            if self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate_per_second)
+                self._tokens = 0.0
+                self._last_refill = time.monotonic()
+            self._tokens -= 1.0
+
+
+async def run_limiter_benchmark(
+    limiter: _Limiter,
+    *,
+    senders: int = 500,
+    requests_per_sender: int = 2,
+    high_priority_every: int = 10,
+) -> dict[str, float]:
+    waits: list[float] = []
+    high_waits: list[float] = []
+    order: list[int] = []
+    start = time.monotonic()
+
+    async def _sender(sender_id: int) -> None:
+        for _ in range(requests_per_sender):
+            priority = PRIORITY_HIGH if high_priority_every and sender_id % high_priority_every == 0 else PRIORITY_NORMAL
+            requested = time.monotonic()
+            await limiter.acquire("sendMessage", f"chat-{sender_id}", priority)
+            wait = time.monotonic() - requested
+            (high_waits if priority == PRIORITY_HIGH else waits).append(wait * 1000)
+            order.append(sender_id)
+
+    await asyncio.gather(*[_sender(idx) for idx in range(senders)])
+    elapsed = time.monotonic() - start
+    total = senders * requests_per_sender
+    first_round = order[:senders]
+    inversions = sum(1 for prev, cur in zip(first_round, first_round[1:]) if cur < prev)
+    return {
+        "requests": float(total),
+        "elapsed_s": elapsed,
+        "achieved_per_s": total / elapsed if elapsed > 0 else 0.0,
+        "p50_wait_ms": percentile(waits, 50),
+        "p99_wait_ms": percentile(waits, 99),
+        "high_p99_wait_ms": percentile(high_waits, 99),
+        "order_inversions": float(inversions),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="limiterbench")
+    parser.add_argument("--senders", type=int, default=500)
+    parser.add_argument("--requests-per-sender", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=500.0)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--high-priority-every", type=int, default=10)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    for name, limiter in (
+        ("locked", LockedTokenBucket(args.rate, args.burst)),
+        ("gcra", HierarchicalRateLimiter(method_rate_per_second=args.rate, method_burst=args.burst)),
+    ):
+        result = asyncio.run(
+            run_limiter_benchmark(
+                limiter,
+                senders=args.senders,
+                requests_per_sender=args.requests_per_sender,
+                high_priority_every=args.high_priority_every,
+            )
+        )
+        print(
+            "LimiterBench -> {name:<6} requests: {requests:.0f}, elapsed: {elapsed_s:.2f}s, "
+            "rate: {achieved_per_s:.1f}/s, wait p50: {p50_wait_ms:.1f}ms, p99: {p99_wait_ms:.1f}ms, "
+            "high-priority p99: {high_p99_wait_ms:.1f}ms, order inversions: {order_inversions:.0f}".format(
+                name=name, **result
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, NamedTuple
 
 
 def extract_message(update: dict[str, Any]) -> dict[str, Any] | None:
@@ -31,3 +31,30 @@ def get_sender_id(message: dict[str, Any] | None) -> str | None:
         return None
     sender = message.get("sender") or {}
     return sender.get("id") or message.get("sender_id")
+
+
+class UpdateFields(NamedTuple):
+    message: dict[str, Any]
+    chat_id: str | None
+    message_id: str | None
+    sender_id: str | None
+    update_type: str | None
+    text: str | None
+    button_id: Any
+
+
+def extract_update_fields(update: dict[str, Any]) -> UpdateFields:
+    """Same lookups as the get_* helpers above, done in one pass over the update."""
+    message = update.get("message") or update.get("data") or update.get("inline_message") or {}
+    get = message.get
+    chat = get("chat") or {}
+    sender = get("sender") or {}
+    return UpdateFields(
+        message,
+        chat.get("id") or get("chat_id"),
+        get("message_id") or get("id"),
+        sender.get("id") or get("sender_id"),
+        update.get("type"),
+        get("text") or get("body"),
+        update.get("button_id") or get("button_id"),
+    )
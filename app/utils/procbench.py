@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.queue import Job, JobQueue
+from app.core.worker import WorkerPool
+from app.db import ensure_schema
+from app.db.queue_store import SqliteQueueStore
+from app.utils.dedup import Deduplicator
+from app.utils.regex import contains_link
+
+
+def seed_store(db_path: str, jobs: int, text_length: int) -> None:
+    ensure_schema(db_path)
+    store = SqliteQueueStore(db_path)
+    text = ("سلام دوستان، این یک پیام آزمایشی است " * (text_length // 36 + 1))[:text_length]
+    batch = []
+    for idx in range(jobs):
+        payload = {"message": {"message_id": str(idx), "chat_id": f"g{idx % 97}", "text": text}}
+        batch.append(
+            Job.build(
+                str(idx),
+                chat_id=f"g{idx % 97}",
+                message_id=str(idx),
+                sender_id=f"u{idx % 1009}",
+                update_type="NewMessage",
+                text=text,
+                raw_payload=payload,
+            )
+        )
+        if len(batch) == 500:
+            store.put(batch)
+            batch = []
+    if batch:
+        store.put(batch)
+    store.close()
+
+
+async def _consume(db_path: str, work: int, concurrency: int) -> None:
+    store = SqliteQueueStore(db_path)
+    queue = JobQueue(max_size=concurrency * 2, deduplicator=Deduplicator(60), backend=store, poll_seconds=0.01)
+
+    async def _handler(job: Job) -> None:
+        # stand-in for the CPU-bound part of dispatch: payload decoding and link/filter regexes
+        for _ in range(work):
+            json.loads(json.dumps(job.raw_payload, ensure_ascii=False))
+            contains_link(job.text)
+
+    pool = WorkerPool(queue, _handler, concurrency=concurrency)
+    await pool.start()
+    while True:
+        await asyncio.sleep(0.05)
+        counts = store.counts()
+        if not counts["pending"] and not counts["claimed"]:
+            break
+    await pool.stop()
+    queue.close()
+    store.close()
+
+
+def _bench_worker(db_path: str, work: int, concurrency: int, start) -> None:
+    start.wait()
+    asyncio.run(_consume(db_path, work, concurrency))
+
+
+def run_process_benchmark(
+    processes: int,
+    *,
+    jobs: int = 2000,
+    work: int = 20,
+    concurrency: int = 2,
+    text_length: int = 400,
+    directory: Path,
+) -> dict[str, float]:
+    db_path = str(directory / f"procbench-{processes}.db")
+    seed_store(db_path, jobs, text_length)
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    children = [ctx.Process(target=_bench_worker, args=(db_path, work, concurrency, start)) for _ in range(processes)]
+    for child in children:
+        child.start()
+    # give the interpreters time to import before the clock starts
+    time.sleep(1.0)
+    started = time.perf_counter()
+    start.set()
+    for child in children:
+        child.join()
+    elapsed = time.perf_counter() - started
+    return {"processes": float(processes), "throughput_per_s": jobs / elapsed if elapsed > 0 else 0.0}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="procbench")
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--work", type=int, default=20, help="decode+regex rounds per job, the CPU cost")
+    parser.add_argument("--concurrency", type=int, default=2, help="workers per process")
+    parser.add_argument("--processes", default="1,2,4,8")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    print(f"ProcBench -> {os.cpu_count()} CPU(s) available")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for processes in (int(value) for value in args.processes.split(",")):
+            result = run_process_benchmark(
+                processes,
+                jobs=args.jobs,
+                work=args.work,
+                concurrency=args.concurrency,
+                directory=Path(tmpdir),
+            )
+            baseline = baseline or result["throughput_per_s"]
+            print(
+                "ProcBench -> {processes:.0f} process(es) rate: {throughput_per_s:.0f} jobs/s, "
+                "speedup: {speedup:.2f}x".format(speedup=result["throughput_per_s"] / baseline, **result)
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.queue import Job, JobQueue
+from app.core.worker import WorkerPool
+from app.db import ensure_schema
+from app.db.queue_store import SqliteQueueStore
+from app.utils.dedup import Deduplicator
+from app.utils.speedcheck import percentile
+
+BACKENDS = {
+    "memory": None,
+    # the bot's default pragmas: WAL with synchronous=NORMAL survives a process crash
+    "sqlite": {},
+    # fsync on every commit, which also survives power loss
+    "sqlite-full": {"synchronous": "FULL"},
+}
+
+
+async def run_queue_benchmark(
+    backend: str,
+    *,
+    jobs: int = 5000,
+    concurrency: int = 4,
+    batch: int = 1,
+    directory: Path,
+) -> dict[str, float]:
+    store = None
+    if BACKENDS[backend] is not None:
+        db_path = str(directory / f"{backend}.db")
+        ensure_schema(db_path)
+        store = SqliteQueueStore(db_path, pragmas=BACKENDS[backend])
+    queue = JobQueue(max_size=1000, deduplicator=Deduplicator(60), backend=store)
+
+    async def _noop(job: Job) -> None:
+        return None
+
+    worker = WorkerPool(queue, _noop, concurrency=concurrency)
+    await worker.start()
+    enqueue_ms: list[float] = []
+    start = time.perf_counter()
+    for offset in range(0, jobs, batch):
+        chunk = [
+            Job.build(str(idx), chat_id=f"c{idx % 50}", message_id=str(idx), sender_id="u1", update_type="m", text="x")
+            for idx in range(offset, min(offset + batch, jobs))
+        ]
+        started = time.perf_counter()
+        if batch == 1:
+            await queue.enqueue(chunk[0])
+        else:
+            await queue.enqueue_many(chunk)
+        enqueue_ms.append((time.perf_counter() - started) * 1000)
+        # let workers keep up, as they would between webhook requests
+        await asyncio.sleep(0)
+    await queue.join()
+    elapsed = time.perf_counter() - start
+    await worker.stop()
+    queue.close()
+    if store is not None:
+        store.close()
+    return {
+        "jobs": float(jobs),
+        "throughput_per_s": jobs / elapsed if elapsed > 0 else 0.0,
+        "enqueue_p50_ms": percentile(enqueue_ms, 50),
+        "enqueue_p99_ms": percentile(enqueue_ms, 99),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="queuebench")
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1, help="enqueue_many batch size; 1 uses enqueue")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for backend in args.backends.split(","):
+            result = asyncio.run(
+                run_queue_benchmark(
+                    backend,
+                    jobs=args.jobs,
+                    concurrency=args.concurrency,
+                    batch=args.batch,
+                    directory=Path(tmpdir),
+                )
+            )
+            print(
+                "QueueBench -> {name:<12} rate: {throughput_per_s:.0f} jobs/s, "
+                "enqueue p50: {enqueue_p50_ms:.3f}ms, p99: {enqueue_p99_ms:.3f}ms".format(name=backend, **result)
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
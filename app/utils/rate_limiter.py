@@ -1,21 +1,180 @@
 from __future__ import annotations
 
 import time
-from collections import deque
-from typing import Deque
+from collections import Counter, OrderedDict, deque
+from typing import TYPE_CHECKING, Deque
+
+from app.core.rate_limit import GcraBucket, gcra_charge
+
+if TYPE_CHECKING:
+    from app.utils.shared_state import SharedStateTable, Values
 
 
 class RateLimiter:
-    def __init__(self, max_requests: int, window_seconds: int = 60) -> None:
+    def __init__(self, max_requests: int, window_seconds: int = 60, shared: SharedStateTable | None = None) -> None:
         self.max_requests = max_requests
         self.window_seconds = window_seconds
+        # shared across processes as one GCRA bucket: the same average rate, but a burst of
+        # max_requests refills gradually instead of all at once when the window slides past it
+        self.shared = shared
+        self._bucket = GcraBucket(max_requests / window_seconds, max_requests, key="ingress:requests")
         self._events: Deque[float] = deque()
 
-    def allow(self) -> bool:
+    def allow(self, cost: int = 1) -> bool:
+        """Admit cost requests at once, or none of them."""
         now = time.monotonic()
+        if self.shared is not None:
+            return self.shared.update(self._bucket.key, lambda values: _charge(values, self._bucket, now, cost))
         while self._events and now - self._events[0] > self.window_seconds:
             self._events.popleft()
-        if len(self._events) >= self.max_requests:
+        if len(self._events) + cost > self.max_requests:
             return False
-        self._events.append(now)
+        self._events.extend([now] * cost)
         return True
+
+
+def _charge(values: Values, bucket: GcraBucket, now: float, cost: int) -> tuple[Values, bool]:
+    # gcra_charge() for a single bucket, charged cost intervals instead of one
+    tat = max(values[0], now)
+    if tat + (cost - 1) * bucket.interval - bucket.tolerance > now:
+        return values, False
+    return (tat + cost * bucket.interval, 0.0, 0.0), True
+
+
+class KeyedRateLimiter:
+    """Ingress limits per chat and per sender under a global ceiling, one GCRA timestamp per key.
+
+    A request is admitted only if every level conforms, and only then is any level charged, so
+    updates rejected for a flooding chat do not use up the global allowance of the other chats.
+
+    With a shared table the TATs live there instead, so the limits hold across all processes;
+    the counters in stats() stay per process."""
+
+    def __init__(
+        self,
+        *,
+        chat_per_minute: float,
+        sender_per_minute: float,
+        global_per_minute: float | None = None,
+        burst: int = 10,
+        global_burst: int | None = None,
+        idle_seconds: float = 300.0,
+        max_keys: int = 50_000,
+        max_tracked_rejections: int = 1000,
+        shared: SharedStateTable | None = None,
+    ) -> None:
+        self.chat_per_minute = chat_per_minute
+        self.sender_per_minute = sender_per_minute
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self.max_keys = max(max_keys, 1)
+        self.max_tracked_rejections = max(max_tracked_rejections, 1)
+        self.global_bucket = (
+            GcraBucket(global_per_minute / 60, global_burst or int(global_per_minute)) if global_per_minute else None
+        )
+        self.shared = shared
+        # rate and burst for keys whose TAT is in the shared table
+        self._chat_template = GcraBucket(chat_per_minute / 60, burst) if chat_per_minute else None
+        self._sender_template = GcraBucket(sender_per_minute / 60, burst) if sender_per_minute else None
+        self.allowed = 0
+        self.rejected_by = {"global": 0, "chat": 0, "sender": 0}
+        self.evicted = 0
+        self.rejections: Counter[str] = Counter()
+        self._buckets: OrderedDict[str, GcraBucket] = OrderedDict()
+
+    def _bucket(self, key: str, per_minute: float, now: float) -> GcraBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self.evict_idle(now)
+            bucket = GcraBucket(per_minute / 60, self.burst)
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def evict_idle(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) < self.max_keys and not bucket.is_full(now - self.idle_seconds):
+                break
+            del self._buckets[key]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    @property
+    def key_count(self) -> int:
+        return len(self._buckets)
+
+    def check(self, chat_id: str | None, sender_id: str | None, *, keyed: bool = True) -> str | None:
+        """Return None when admitted, otherwise the level that rejected: "chat", "sender" or "global".
+
+        With keyed=False only the global ceiling is charged, for updates that must not wait behind
+        their chat or sender."""
+        now = time.monotonic()
+        if not keyed:
+            chat_id = sender_id = None
+        if self.shared is not None:
+            return self._check_shared(chat_id, sender_id, now)
+        levels: list[tuple[str, str | None, GcraBucket]] = []
+        if chat_id and self.chat_per_minute:
+            levels.append(("chat", f"chat:{chat_id}", self._bucket(f"chat:{chat_id}", self.chat_per_minute, now)))
+        if sender_id and self.sender_per_minute:
+            key = f"sender:{sender_id}"
+            levels.append(("sender", key, self._bucket(key, self.sender_per_minute, now)))
+        if self.global_bucket is not None:
+            levels.append(("global", None, self.global_bucket))
+        for level, key, bucket in levels:
+            if not bucket.conforms(now):
+                self.rejected_by[level] += 1
+                if key is not None:
+                    self._record_rejection(key)
+                return level
+        for _, _, bucket in levels:
+            bucket.consume(now)
+        self.allowed += 1
+        return None
+
+    def _check_shared(self, chat_id: str | None, sender_id: str | None, now: float) -> str | None:
+        levels: list[tuple[str, str, GcraBucket]] = []
+        if chat_id and self._chat_template is not None:
+            levels.append(("chat", f"chat:{chat_id}", self._chat_template))
+        if sender_id and self._sender_template is not None:
+            levels.append(("sender", f"sender:{sender_id}", self._sender_template))
+        if self.global_bucket is not None:
+            levels.append(("global", "global", self.global_bucket))
+        buckets = [bucket for _, _, bucket in levels]
+
+        def _charge(values: list[Values]) -> tuple[list[Values], int | None]:
+            tats, blocked = gcra_charge([value[0] for value in values], buckets, now)
+            return [(tat, 0.0, 0.0) for tat in tats], blocked
+
+        blocked = self.shared.update_many([f"ingress:{key}" for _, key, _ in levels], _charge) if levels else None
+        if blocked is None:
+            self.allowed += 1
+            return None
+        level, key, _ = levels[blocked]
+        self.rejected_by[level] += 1
+        if level != "global":
+            self._record_rejection(key)
+        return level
+
+    def _record_rejection(self, key: str) -> None:
+        self.rejections[key] += 1
+        if len(self.rejections) > self.max_tracked_rejections:
+            # keep the heavy hitters; a key that floods again climbs back quickly
+            self.rejections = Counter(dict(self.rejections.most_common(self.max_tracked_rejections // 2)))
+
+    def top_rejected(self, limit: int = 10) -> list[dict[str, object]]:
+        return [{"key": key, "rejected": count} for key, count in self.rejections.most_common(limit)]
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "allowed": self.allowed,
+            "rejected_by": dict(self.rejected_by),
+            "keys": self.key_count,
+            "evicted": self.evicted,
+            "top_rejected": self.top_rejected(),
+        }
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterable, TextIO
+
+from app import __version__
+from app.core.queue import Job, JobQueue
+from app.core.rubika_client import OUTBOUND_INTERACTIVE, RubikaClient
+from app.core.worker import WorkerPool
+from app.db import Repository, ensure_schema
+from app.services.bulk_delete import BulkDeleteEngine
+from app.services.moderation import ModerationExecutor
+from app.services.pipeline import build_command_registry, build_plugin_registry
+from app.utils.dedup import Deduplicator
+from app.utils.speedcheck import percentile
+from app.utils.stats import StatsCollector
+from app.webhook.router import build_job
+
+
+class ReplayClient(RubikaClient):
+    def __init__(self, *, latency_ms: float = 0.0, actions_out: TextIO | None = None) -> None:
+        super().__init__("replay-token", "http://replay.invalid")
+        self.latency_ms = latency_ms
+        self.actions_out = actions_out
+        self.actions: Counter[str] = Counter()
+        self._next_message_id = 0
+
+    async def api_call(
+        self,
+        method: str,
+        payload: dict[str, Any],
+        *,
+        outbound_class: str = OUTBOUND_INTERACTIVE,
+    ) -> dict[str, Any]:
+        self.actions[method] += 1
+        if self.actions_out is not None:
+            self.actions_out.write(json.dumps({"method": method, "payload": payload}, ensure_ascii=False) + "\n")
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if method == "sendMessage":
+            self._next_message_id += 1
+            return {"ok": True, "data": {"message_id": f"replay-{self._next_message_id}"}}
+        return {"ok": True}
+
+
+@dataclass
+class ReplayReport:
+    total: int = 0
+    enqueued: int = 0
+    duplicate: int = 0
+    dropped: int = 0
+    skipped: int = 0
+    source_span_s: float = 0.0
+    elapsed_s: float = 0.0
+    max_queue_size: int = 0
+    queue_size_sum: int = 0
+    errors: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+    actions: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def avg_queue_size(self) -> float:
+        return self.queue_size_sum / self.total if self.total else 0.0
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "total": float(self.total),
+            "enqueued": float(self.enqueued),
+            "duplicate": float(self.duplicate),
+            "dropped": float(self.dropped),
+            "skipped": float(self.skipped),
+            "errors": float(self.errors),
+            "source_span_s": self.source_span_s,
+            "elapsed_s": self.elapsed_s,
+            "throughput_per_s": self.enqueued / self.elapsed_s if self.elapsed_s > 0 else 0.0,
+            "p50_ms": percentile(self.latencies_ms, 50),
+            "p95_ms": percentile(self.latencies_ms, 95),
+            "p99_ms": percentile(self.latencies_ms, 99),
+            "max_queue_size": float(self.max_queue_size),
+            "avg_queue_size": self.avg_queue_size,
+        }
+
+
+async def replay_updates(
+    rows: Iterable[tuple[float, str]],
+    *,
+    scratch_db: str,
+    client: ReplayClient,
+    speed: float = 0.0,
+    concurrency: int = 4,
+    queue_max_size: int = 1000,
+    full_policy: str = "reject",
+    dedup_ttl_seconds: int = 120,
+    owner_id: str | None = None,
+) -> ReplayReport:
+    ensure_schema(scratch_db)
+    repo = Repository(scratch_db)
+    stats = StatsCollector()
+    command_registry = build_command_registry()
+    registry = build_plugin_registry(command_registry)
+    queue = JobQueue(
+        max_size=queue_max_size,
+        deduplicator=Deduplicator(dedup_ttl_seconds),
+        full_policy=full_policy,
+        stats=stats,
+    )
+    report = ReplayReport()
+    bulk_delete = BulkDeleteEngine(repo, client)
+    context = {
+        "repo": repo,
+        "client": client,
+        "command_registry": command_registry,
+        "report_anti_actions": True,
+        "stats": stats,
+        "version": __version__,
+        "owner_id": owner_id,
+        "settings": SimpleNamespace(incoming_updates_enabled=False, incoming_updates_store_raw=False),
+        "bulk_delete": bulk_delete,
+        "moderation": ModerationExecutor(),
+        "shared_state": None,
+    }
+
+    async def _process_job(job: Job) -> None:
+        try:
+            await registry.dispatch(job.raw_payload or {}, {**context, "job": job})
+        finally:
+            report.latencies_ms.append((time.time() - job.received_at) * 1000)
+
+    worker = WorkerPool(queue, _process_job, concurrency=concurrency, stats=stats)
+    await worker.start()
+    first_received: float | None = None
+    last_received = 0.0
+    start = time.perf_counter()
+    try:
+        for received_at, raw_payload in rows:
+            report.total += 1
+            try:
+                payload = json.loads(raw_payload)
+            except (TypeError, ValueError):
+                report.skipped += 1
+                continue
+            if not isinstance(payload, dict):
+                report.skipped += 1
+                continue
+            if first_received is None:
+                first_received = received_at
+            last_received = received_at
+            if speed > 0:
+                delay = (received_at - first_received) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            decision = await queue.enqueue(build_job(payload))
+            if decision in ("enqueued", "spilled"):
+                report.enqueued += 1
+            elif decision == "duplicate":
+                report.duplicate += 1
+            else:
+                report.dropped += 1
+            size = queue.size()
+            report.queue_size_sum += size
+            report.max_queue_size = max(report.max_queue_size, size)
+        await queue.join()
+        # /del purges run outside the workers; they are part of what the replay costs
+        await bulk_delete.join()
+    finally:
+        report.elapsed_s = time.perf_counter() - start
+        await worker.stop()
+        await bulk_delete.close()
+        await client.close()
+    report.source_span_s = last_received - first_received if first_received is not None else 0.0
+    report.errors = stats.total_errors
+    report.actions = dict(client.actions)
+    return report
+
+
+def iter_source_rows(
+    source_db: str,
+    *,
+    since: float = 0.0,
+    until: float | None = None,
+    limit: int | None = None,
+) -> Iterable[tuple[float, str]]:
+    repo = Repository(source_db)
+    for idx, row in enumerate(repo.iter_incoming_updates(since=since, until=until)):
+        if limit is not None and idx >= limit:
+            return
+        yield float(row["received_at"]), row["raw_payload"]
+
+
+def _parse_speed(value: str) -> float:
+    if value.lower() in {"max", "0"}:
+        return 0.0
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="replay")
+    parser.add_argument("--source", required=True, help="SQLite database with incoming_updates.raw_payload")
+    parser.add_argument("--scratch-db", default=None, help="database the pipeline writes to (temporary by default)")
+    parser.add_argument("--speed", type=_parse_speed, default=0.0, help="1, 10x, 100x ... or 'max'")
+    parser.add_argument("--since", type=float, default=0.0)
+    parser.add_argument("--until", type=float, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue-max-size", type=int, default=1000)
+    parser.add_argument("--queue-full-policy", default="reject")
+    parser.add_argument("--owner-id", default=None, help="sender treated as the bot owner, so admin commands run")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--actions-out", type=Path, default=None, help="write every stubbed API call as NDJSON")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not Path(args.source).exists():
+        print(f"Replay -> source database not found: {args.source}")
+        return 1
+    actions_out = args.actions_out.open("w", encoding="utf-8") if args.actions_out else None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch_db = args.scratch_db or str(Path(tmp) / "replay.db")
+            report = asyncio.run(
+                replay_updates(
+                    iter_source_rows(args.source, since=args.since, until=args.until, limit=args.limit),
+                    scratch_db=scratch_db,
+                    client=ReplayClient(latency_ms=args.api_latency_ms, actions_out=actions_out),
+                    speed=args.speed,
+                    concurrency=args.concurrency,
+                    queue_max_size=args.queue_max_size,
+                    full_policy=args.queue_full_policy,
+                    owner_id=args.owner_id,
+                )
+            )
+    finally:
+        if actions_out is not None:
+            actions_out.close()
+    summary = report.summary()
+    print(
+        "Replay -> updates: {total:.0f} (enqueued {enqueued:.0f}, duplicate {duplicate:.0f}, dropped {dropped:.0f}, "
+        "skipped {skipped:.0f}, errors {errors:.0f})".format(**summary)
+    )
+    print(
+        "Replay -> source span: {source_span_s:.1f}s, elapsed: {elapsed_s:.3f}s, "
+        "throughput: {throughput_per_s:.0f}/s".format(**summary)
+    )
+    print("Replay -> latency p50: {p50_ms:.2f}ms, p95: {p95_ms:.2f}ms, p99: {p99_ms:.2f}ms".format(**summary))
+    print("Replay -> queue max: {max_queue_size:.0f}, avg: {avg_queue_size:.1f}".format(**summary))
+    actions = ", ".join(f"{method}={count}" for method, count in sorted(report.actions.items())) or "none"
+    print(f"Replay -> actions: {actions}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
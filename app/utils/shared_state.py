@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Callable, TypeVar
+
+R = TypeVar("R")
+
+Values = tuple[float, float, float]
+EMPTY: Values = (0.0, 0.0, 0.0)
+
+MAGIC = b"RBSTATE1"
+# magic, slots, stripes, max_probe, boot id
+HEADER = struct.Struct("<8sIIIQ")
+HEADER_BYTES = 64
+# key hash, last touched (monotonic), three values
+SLOT = struct.Struct("<Qdddd")
+# fcntl byte-range locks live past the end of the table, one byte per stripe
+INIT_LOCK = 0
+
+
+def key_hash(key: str) -> int:
+    # hash() is salted per process; every process must place a key in the same slot
+    value = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def _boot_id() -> int:
+    # the monotonic clock restarts on reboot, and with it every stored timestamp stops meaning anything
+    try:
+        return key_hash(Path("/proc/sys/kernel/random/boot_id").read_text().strip())
+    except OSError:
+        return 0
+
+
+class SharedStateTable:
+    """Fixed-size hash table in an mmap'd file, shared by every process on the host that opens it.
+
+    Each key maps to three floats, changed only through update()/update_many(), which run the
+    caller's function under fcntl locks on the key's stripe, so a read-modify-write is atomic
+    across processes. Timestamps are time.monotonic(), which is system-wide on Linux. A key is
+    looked up within max_probe slots of its home; when they are all taken, the least recently
+    touched one is reused, so state for idle keys is forgotten first.
+    """
+
+    def __init__(self, path: str | Path, *, slots: int = 65536, stripes: int = 64, max_probe: int = 8) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stripes = max(1, min(stripes, slots))
+        self.stripe_slots = max(slots // self.stripes, 1)
+        self.slots = self.stripe_slots * self.stripes
+        self.max_probe = max(1, min(max_probe, self.stripe_slots))
+        self.size = HEADER_BYTES + self.slots * SLOT.size
+        self.evicted = 0
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self.size + INIT_LOCK)
+        try:
+            self._init_file()
+            self._map = mmap.mmap(self._fd, self.size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.size + INIT_LOCK)
+
+    def _init_file(self) -> None:
+        boot_id = _boot_id()
+        if os.fstat(self._fd).st_size >= HEADER_BYTES:
+            magic, slots, stripes, max_probe, stored_boot = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if magic == MAGIC and stored_boot == boot_id:
+                if (slots, stripes, max_probe) != (self.slots, self.stripes, self.max_probe):
+                    raise ValueError(
+                        f"{self.path} holds a table of {slots} slots/{stripes} stripes/probe {max_probe}; "
+                        "every process must open it with the same layout"
+                    )
+                return
+        # new file or written before a reboot, so no process still has it mapped: start empty
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self.size)
+        os.pwrite(self._fd, HEADER.pack(MAGIC, self.slots, self.stripes, self.max_probe, boot_id), 0)
+
+    def _locate(self, hashed: int) -> tuple[int, int]:
+        stripe = hashed % self.stripes
+        return stripe, (hashed // self.stripes) % self.stripe_slots
+
+    def _slot(self, hashed: int, now: float) -> int:
+        """Offset of the key's slot in the locked stripe, claiming one if the key is new."""
+        stripe, home = self._locate(hashed)
+        base = HEADER_BYTES + stripe * self.stripe_slots * SLOT.size
+        oldest_offset = -1
+        oldest_touched = float("inf")
+        for probe in range(self.max_probe):
+            offset = base + ((home + probe) % self.stripe_slots) * SLOT.size
+            stored, touched = struct.unpack_from("<Qd", self._map, offset)
+            if stored == hashed:
+                return offset
+            if stored == 0:
+                oldest_offset = offset
+                break
+            if touched < oldest_touched:
+                oldest_offset, oldest_touched = offset, touched
+        else:
+            self.evicted += 1
+        SLOT.pack_into(self._map, oldest_offset, hashed, now, *EMPTY)
+        return oldest_offset
+
+    def update_many(self, keys: list[str], fn: Callable[[list[Values]], tuple[list[Values], R]]) -> R:
+        """Run fn on the current values of keys (zeros when unknown) and store what it returns, atomically."""
+        hashes = [key_hash(key) for key in keys]
+        stripes = sorted({self._locate(hashed)[0] for hashed in hashes})
+        # always in stripe order, so two processes locking several stripes cannot deadlock
+        for stripe in stripes:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self.size + 1 + stripe)
+        try:
+            now = time.monotonic()
+            offsets = [self._slot(hashed, now) for hashed in hashes]
+            current = [tuple(SLOT.unpack_from(self._map, offset)[2:]) for offset in offsets]
+            values, result = fn(current)
+            for hashed, offset, new in zip(hashes, offsets, values):
+                SLOT.pack_into(self._map, offset, hashed, now, *new)
+            return result
+        finally:
+            for stripe in reversed(stripes):
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.size + 1 + stripe)
+
+    def update(self, key: str, fn: Callable[[Values], tuple[Values, R]]) -> R:
+        # update_many() for a single key, without its lists: this is the per-update hot path
+        hashed = key_hash(key)
+        lock_offset = self.size + 1 + hashed % self.stripes
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, lock_offset)
+        try:
+            now = time.monotonic()
+            offset = self._slot(hashed, now)
+            values, result = fn(SLOT.unpack_from(self._map, offset)[2:])
+            SLOT.pack_into(self._map, offset, hashed, now, *values)
+            return result
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, lock_offset)
+
+    def get(self, key: str) -> Values | None:
+        hashed = key_hash(key)
+        stripe, home = self._locate(hashed)
+        base = HEADER_BYTES + stripe * self.stripe_slots * SLOT.size
+        for probe in range(self.max_probe):
+            offset = base + ((home + probe) % self.stripe_slots) * SLOT.size
+            stored = struct.unpack_from("<Q", self._map, offset)[0]
+            if stored == hashed:
+                return tuple(SLOT.unpack_from(self._map, offset)[2:])
+            if stored == 0:
+                return None
+        return None
+
+    def used(self) -> int:
+        return sum(1 for slot in SLOT.iter_unpack(self._map[HEADER_BYTES:]) if slot[0])
+
+    def stats(self) -> dict[str, object]:
+        return {"path": str(self.path), "slots": self.slots, "used": self.used(), "evicted": self.evicted}
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
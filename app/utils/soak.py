@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque
+
+import httpx
+
+from app.core.queue import Job, JobQueue
+from app.core.rubika_client import RubikaClient
+from app.core.worker import WorkerPool
+from app.db.repository import GroupSettings
+from app.services.plugins.anti_flood import AntiFloodPlugin
+from app.utils.dedup import Deduplicator
+from app.utils.stats import StatsCollector
+
+
+@dataclass
+class SoakSample:
+    processed: int
+    active_keys: int
+    traced_bytes: int
+    elapsed_s: float
+
+    @property
+    def bytes_per_key(self) -> float:
+        return self.traced_bytes / max(self.active_keys, 1)
+
+
+@dataclass
+class SoakReport:
+    samples: list[SoakSample] = field(default_factory=list)
+    top_growth: list[tuple[str, int, int]] = field(default_factory=list)
+    budget_bytes_per_key: float = 0.0
+
+    @property
+    def final(self) -> SoakSample | None:
+        return self.samples[-1] if self.samples else None
+
+    @property
+    def within_budget(self) -> bool:
+        final = self.final
+        return final is None or final.bytes_per_key <= self.budget_bytes_per_key
+
+
+class _SoakRepository:
+    def __init__(self) -> None:
+        self._settings = GroupSettings(
+            chat_id="",
+            title=None,
+            anti_link=False,
+            anti_flood=True,
+            anti_spam=False,
+            anti_badwords=False,
+            anti_forward=False,
+            flood_limit=1_000_000,
+        )
+
+    def get_group(self, chat_id: str) -> GroupSettings:
+        return self._settings
+
+    def is_admin(self, chat_id: str, user_id: str) -> bool:
+        return False
+
+
+class _ActiveKeyWindow:
+    """Approximates how many distinct keys may legitimately be retained right now."""
+
+    def __init__(self, window_seconds: float) -> None:
+        self.window_seconds = window_seconds
+        self._buckets: Deque[list[float]] = deque()
+        self._total = 0
+
+    def add(self, now: float) -> None:
+        if self._buckets and now - self._buckets[-1][0] < 0.1:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([now, 1])
+        self._total += 1
+
+    def count(self, now: float) -> int:
+        while self._buckets and now - self._buckets[0][0] > self.window_seconds:
+            self._total -= int(self._buckets.popleft()[1])
+        return self._total
+
+
+def _ok_transport() -> httpx.MockTransport:
+    return httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+
+
+def _traced_bytes(snapshot: tracemalloc.Snapshot) -> int:
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+    )
+
+
+async def run_soak(
+    updates: int,
+    *,
+    chats: int = 1_000_000,
+    senders: int = 1_000_000,
+    snapshot_every: int = 100_000,
+    dedup_ttl_seconds: float = 2.0,
+    flood_window_seconds: float = 2.0,
+    api_call_every: int = 10,
+    concurrency: int = 4,
+    budget_bytes_per_key: float = 4096.0,
+    top: int = 10,
+) -> SoakReport:
+    report = SoakReport(budget_bytes_per_key=budget_bytes_per_key)
+    tracemalloc.start()
+    try:
+        stats = StatsCollector()
+        queue = JobQueue(max_size=10_000, deduplicator=Deduplicator(dedup_ttl_seconds), stats=stats)
+        plugin = AntiFloodPlugin(window_seconds=flood_window_seconds)
+        client = RubikaClient("soak-token", "http://soak.invalid", rate_limit_per_second=10**9, transport=_ok_transport())
+        context: dict[str, Any] = {"repo": _SoakRepository(), "client": client}
+        methods = ["sendMessage", "deleteMessage", "banChatMember", "getChat"]
+
+        async def _process(job: Job) -> None:
+            await plugin.handle(job.raw_payload or {}, context)
+            if api_call_every and int(job.job_id) % api_call_every == 0:
+                await client.api_call(methods[int(job.job_id) % len(methods)], {"chat_id": job.chat_id})
+
+        worker = WorkerPool(queue, _process, concurrency=concurrency, stats=stats)
+        await worker.start()
+        active = _ActiveKeyWindow(max(dedup_ttl_seconds, flood_window_seconds))
+        start = time.perf_counter()
+        first_snapshot: tracemalloc.Snapshot | None = None
+        last_snapshot: tracemalloc.Snapshot | None = None
+        for idx in range(updates):
+            chat_id = f"c{idx % chats}"
+            sender_id = f"u{idx % senders}"
+            payload = {
+                "update_id": str(idx),
+                "message": {"message_id": str(idx), "chat": {"id": chat_id}, "sender": {"id": sender_id}, "text": "x"},
+            }
+            job = Job.build(
+                str(idx),
+                chat_id=chat_id,
+                message_id=str(idx),
+                sender_id=sender_id,
+                update_type="message",
+                text="x",
+                raw_payload=payload,
+                dedup_key=f"{chat_id}:{idx}",
+            )
+            await queue.enqueue(job)
+            active.add(time.monotonic())
+            while queue.size() > queue.max_size // 2:
+                await asyncio.sleep(0.001)
+            if (idx + 1) % snapshot_every == 0 or idx + 1 == updates:
+                await queue.join()
+                active_keys = active.count(time.monotonic())
+                snapshot = _take_snapshot()
+                if first_snapshot is None:
+                    first_snapshot = snapshot
+                last_snapshot = snapshot
+                report.samples.append(
+                    SoakSample(
+                        processed=idx + 1,
+                        active_keys=active_keys,
+                        traced_bytes=_traced_bytes(snapshot),
+                        elapsed_s=time.perf_counter() - start,
+                    )
+                )
+        await queue.join()
+        await worker.stop()
+        await client.close()
+        if first_snapshot is not None and last_snapshot is not None and last_snapshot is not first_snapshot:
+            for stat in last_snapshot.compare_to(first_snapshot, "lineno")[:top]:
+                frame = stat.traceback[0]
+                report.top_growth.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+    finally:
+        tracemalloc.stop()
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="soak")
+    parser.add_argument("--updates", type=int, default=2_000_000)
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--senders", type=int, default=1_000_000)
+    parser.add_argument("--snapshot-every", type=int, default=200_000)
+    parser.add_argument("--dedup-ttl", type=float, default=2.0)
+    parser.add_argument("--flood-window", type=float, default=2.0)
+    parser.add_argument("--api-call-every", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--budget", type=float, default=4096.0, help="allowed traced bytes per active key")
+    parser.add_argument("--top", type=int, default=10)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    report = asyncio.run(
+        run_soak(
+            args.updates,
+            chats=args.chats,
+            senders=args.senders,
+            snapshot_every=args.snapshot_every,
+            dedup_ttl_seconds=args.dedup_ttl,
+            flood_window_seconds=args.flood_window,
+            api_call_every=args.api_call_every,
+            concurrency=args.concurrency,
+            budget_bytes_per_key=args.budget,
+            top=args.top,
+        )
+    )
+    for sample in report.samples:
+        print(
+            f"Soak -> processed: {sample.processed}, elapsed: {sample.elapsed_s:.1f}s, "
+            f"active keys: {sample.active_keys}, traced: {sample.traced_bytes / (1024**2):.2f}MB, "
+            f"per key: {sample.bytes_per_key:.0f}B"
+        )
+    for site, size_diff, count_diff in report.top_growth:
+        print(f"Soak -> growth {size_diff / 1024:+.1f}KiB ({count_diff:+d} blocks) at {site}")
+    if not report.within_budget:
+        print(f"Soak -> memory per active key exceeds budget of {report.budget_bytes_per_key:.0f}B")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import sys
 import time
+from pathlib import Path
 
 from app.core.queue import Job
 from app.core.queue import JobQueue
 from app.core.worker import WorkerPool
 from app.services.plugins.base import Plugin
 from app.services.plugins.registry import PluginRegistry
+from app.utils.baseline import (
+    DEFAULT_BASELINE_DIR,
+    compare_runs,
+    format_comparison,
+    load_baseline,
+    save_baseline,
+)
 from app.utils.dedup import Deduplicator
 from app.utils.stats import StatsCollector
 
+BASELINE_NAME = "speedcheck"
+
 
 class _NoopPlugin(Plugin):
     name = "noop"
@@ -19,13 +31,23 @@ class _NoopPlugin(Plugin):
         return False
 
 
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
 async def run_speed_check(samples: int = 200) -> dict[str, float]:
     stats = StatsCollector()
     registry = PluginRegistry([_NoopPlugin()])
-    queue = JobQueue(max_size=1000, deduplicator=Deduplicator(60), stats=stats)
+    queue = JobQueue(max_size=max(1000, samples), deduplicator=Deduplicator(60), stats=stats)
+    latencies_ms: list[float] = []
 
     async def _process(job: Job) -> None:
         await registry.dispatch(job.raw_payload or {}, {"stats": stats})
+        latencies_ms.append((time.time() - job.received_at) * 1000)
 
     worker = WorkerPool(queue, _process, concurrency=4, stats=stats)
     await worker.start()
@@ -40,17 +62,54 @@ async def run_speed_check(samples: int = 200) -> dict[str, float]:
         "samples": float(samples),
         "elapsed_s": elapsed,
         "avg_dispatch_ms": stats.average_dispatch_ms,
+        "throughput_per_s": samples / elapsed if elapsed > 0 else 0.0,
+        "p99_ms": percentile(latencies_ms, 99),
     }
 
 
-def main() -> None:
-    result = asyncio.run(run_speed_check())
-    print(
-        "SpeedCheck -> samples: {samples}, elapsed: {elapsed_s:.3f}s, avg_dispatch: {avg_dispatch_ms:.2f}ms".format(
-            **result
-        )
+def run_repeated(samples: int, repeat: int) -> list[dict[str, float]]:
+    return [asyncio.run(run_speed_check(samples)) for _ in range(max(1, repeat))]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="speedcheck")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--baseline-dir", type=Path, default=DEFAULT_BASELINE_DIR)
+    parser.add_argument("--save", action="store_true", help="store the runs as the baseline for this host")
+    parser.add_argument("--compare", action="store_true", help="fail when runs regress against the baseline")
+    parser.add_argument(
+        "--allow-missing", action="store_true", help="with --compare, pass when this host has no baseline yet"
     )
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative regression (0.1 = 10%%)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    runs = run_repeated(args.samples, args.repeat)
+    for result in runs:
+        print(
+            "SpeedCheck -> samples: {samples:.0f}, elapsed: {elapsed_s:.3f}s, avg_dispatch: {avg_dispatch_ms:.2f}ms, "
+            "throughput: {throughput_per_s:.0f}/s, p99: {p99_ms:.2f}ms".format(**result)
+        )
+    if args.compare:
+        baseline = load_baseline(args.baseline_dir, BASELINE_NAME)
+        if baseline is None:
+            print(f"SpeedCheck -> no baseline for this host in {args.baseline_dir}; run with --save first")
+            if not args.allow_missing:
+                return 2
+        else:
+            comparisons = compare_runs(baseline.get("runs", []), runs, threshold=args.threshold)
+            print(format_comparison(comparisons))
+            if any(item.regressed for item in comparisons):
+                print("SpeedCheck -> performance regression detected")
+                return 1
+    if args.save:
+        path = save_baseline(args.baseline_dir, BASELINE_NAME, runs)
+        print(f"SpeedCheck -> baseline saved to {path}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
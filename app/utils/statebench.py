@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.dedup import Deduplicator
+from app.utils.rate_limiter import KeyedRateLimiter
+from app.utils.shared_state import SharedStateTable
+
+
+def _run_ops(path: str | None, ops: int, offset: int) -> float:
+    table = SharedStateTable(path) if path else None
+    deduplicator = Deduplicator(60, shared=table)
+    limiter = KeyedRateLimiter(chat_per_minute=6000, sender_per_minute=6000, burst=10, shared=table)
+    started = time.perf_counter()
+    for idx in range(offset, offset + ops):
+        deduplicator.seen(f"u{idx}")
+        limiter.check(f"g{idx % 97}", f"s{idx % 1009}")
+    elapsed = time.perf_counter() - started
+    if table is not None:
+        table.close()
+    return elapsed
+
+
+def _worker(path: str, ops: int, offset: int, results) -> None:
+    results.put(_run_ops(path, ops, offset))
+
+
+def run_state_benchmark(processes: int, *, ops: int, path: str | None) -> dict[str, float]:
+    """Updates (one dedup check and one keyed limiter check) per second, summed over processes."""
+    if path is None or processes == 1:
+        elapsed = _run_ops(path, ops, 0)
+        return {"processes": float(processes), "ops_per_s": ops / elapsed, "us_per_update": elapsed / ops * 1e6}
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    children = [ctx.Process(target=_worker, args=(path, ops, idx * ops, results)) for idx in range(processes)]
+    started = time.perf_counter()
+    for child in children:
+        child.start()
+    busy = sum(results.get() for _ in children)
+    for child in children:
+        child.join()
+    wall = time.perf_counter() - started
+    total = ops * processes
+    return {"processes": float(processes), "ops_per_s": total / wall, "us_per_update": busy / total * 1e6}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="statebench")
+    parser.add_argument("--ops", type=int, default=20000, help="updates per process")
+    parser.add_argument("--processes", default="1,2,4")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    print(f"StateBench -> {os.cpu_count()} CPU(s) available")
+    local = run_state_benchmark(1, ops=args.ops, path=None)
+    print("StateBench -> local     1 process(es) rate: {ops_per_s:.0f} updates/s, {us_per_update:.1f}us each".format(**local))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "state.bin")
+        SharedStateTable(path).close()
+        for processes in (int(value) for value in args.processes.split(",")):
+            result = run_state_benchmark(processes, ops=args.ops, path=path)
+            print(
+                "StateBench -> shared {processes:>4.0f} process(es) rate: {ops_per_s:.0f} updates/s, "
+                "{us_per_update:.1f}us each".format(**result)
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
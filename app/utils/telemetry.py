@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+LATENCY_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+
+    @property
+    def avg_ms(self) -> float:
+        return self.sum_ms / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the percentile; the last bucket reports the largest bound."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets_ms[min(idx, len(self.buckets_ms) - 1)]
+        return self.buckets_ms[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        bounds = [str(bound) for bound in self.buckets_ms] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "avg_ms": self.avg_ms,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": dict(zip(bounds, self.counts)),
+        }
+
+
+@dataclass
+class MethodTelemetry:
+    calls: int = 0
+    retries: int = 0
+    statuses: Counter[str] = field(default_factory=Counter)
+    transport_errors: Counter[str] = field(default_factory=Counter)
+    remote: LatencyHistogram = field(default_factory=LatencyHistogram)
+    limiter_wait: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def errors(self) -> int:
+        failed = sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+        return failed + sum(self.transport_errors.values())
+
+    def snapshot(self) -> dict[str, Any]:
+        spent = self.remote.sum_ms + self.limiter_wait.sum_ms
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "transport_errors": dict(self.transport_errors),
+            "remote": self.remote.snapshot(),
+            "limiter_wait": self.limiter_wait.snapshot(),
+            "limiter_share": self.limiter_wait.sum_ms / spent if spent else 0.0,
+        }
+
+
+class ApiTelemetry:
+    """Per-method outbound counters; each attempt is split into time waiting on our limiter and time on the wire."""
+
+    def __init__(self) -> None:
+        self.methods: dict[str, MethodTelemetry] = {}
+
+    def _method(self, method: str) -> MethodTelemetry:
+        entry = self.methods.get(method)
+        if entry is None:
+            entry = MethodTelemetry()
+            self.methods[method] = entry
+        return entry
+
+    def record_call(self, method: str) -> None:
+        self._method(method).calls += 1
+
+    def record_retry(self, method: str) -> None:
+        self._method(method).retries += 1
+
+    def record_limiter_wait(self, method: str, wait_ms: float) -> None:
+        self._method(method).limiter_wait.observe(wait_ms)
+
+    def record_response(self, method: str, status_code: int, latency_ms: float) -> None:
+        entry = self._method(method)
+        entry.statuses[str(status_code)] += 1
+        entry.remote.observe(latency_ms)
+
+    def record_transport_error(self, method: str, exc: Exception, latency_ms: float) -> None:
+        entry = self._method(method)
+        entry.transport_errors[type(exc).__name__] += 1
+        entry.remote.observe(latency_ms)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {method: entry.snapshot() for method, entry in self.methods.items()}
+
+    def render_prometheus(self, prefix: str = "rubika_api") -> str:
+        # the text format wants every sample of a family together, right after its TYPE line
+        methods = sorted(self.methods.items())
+        lines: list[str] = []
+
+        def family(name: str, kind: str) -> None:
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        family("calls_total", "counter")
+        lines.extend(f'{prefix}_calls_total{{method="{method}"}} {entry.calls}' for method, entry in methods)
+        family("retries_total", "counter")
+        lines.extend(f'{prefix}_retries_total{{method="{method}"}} {entry.retries}' for method, entry in methods)
+        family("responses_total", "counter")
+        for method, entry in methods:
+            for status, count in sorted(entry.statuses.items()):
+                lines.append(f'{prefix}_responses_total{{method="{method}",status="{status}"}} {count}')
+        family("transport_errors_total", "counter")
+        for method, entry in methods:
+            for kind, count in sorted(entry.transport_errors.items()):
+                lines.append(f'{prefix}_transport_errors_total{{method="{method}",error="{kind}"}} {count}')
+        for name, attr in (("remote_latency_ms", "remote"), ("limiter_wait_ms", "limiter_wait")):
+            family(name, "histogram")
+            for method, entry in methods:
+                histogram: LatencyHistogram = getattr(entry, attr)
+                label = f'method="{method}"'
+                cumulative = 0
+                for bound, count in zip([*histogram.buckets_ms, "+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_{name}_sum{{{label}}} {histogram.sum_ms:.3f}")
+                lines.append(f"{prefix}_{name}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
@@ -1,23 +1,20 @@
 from __future__ import annotations
 
-import json
-from typing import Any
+from typing import Any, Callable
 from uuid import uuid4
 
 from fastapi import APIRouter, Request, Response, status
+from fastapi.responses import JSONResponse
 
 from app.core.queue import Job
-from app.utils.rate_limiter import RateLimiter
+from app.utils.rate_limiter import KeyedRateLimiter, RateLimiter
 from app.utils.security import verify_signature
-from app.utils.message import extract_message, get_chat_id, get_message_id, get_sender_id, get_text
+from app.utils.fastjson import loads
+from app.utils.message import extract_update_fields
 
 
-def build_router(
-    settings,
-    rate_limiter: RateLimiter,
-) -> APIRouter:
-    router = APIRouter()
-    admin_commands = {
+ADMIN_COMMANDS = frozenset(
+    {
         "ban",
         "unban",
         "del",
@@ -28,52 +25,104 @@ def build_router(
         "setcmd",
         "panel",
     }
+)
 
-    async def handle_request(request: Request) -> Response:
-        raw_body = await request.body()
+MAX_BATCH_UPDATES = 1000
+
+
+def build_job(payload: dict[str, Any]) -> Job:
+    message, chat_id, message_id, sender_id, update_type, text, button_id = extract_update_fields(payload)
+    update_id = payload.get("update_id") or payload.get("message_id") or message.get("message_id")
+    job_id = str(update_id) if update_id is not None else str(uuid4())
+    parts = [value for value in (chat_id, message_id, update_type) if value]
+    if button_id:
+        parts.append(str(button_id))
+    dedup_key = ":".join(parts) or job_id
+    priority = "normal"
+    if text:
+        command = text.lstrip("/").split(maxsplit=1)[0].lower()
+        if command in ADMIN_COMMANDS:
+            priority = "high"
+        elif "http" in text or "t.me" in text or "rubika.ir" in text:
+            priority = "high"
+    return Job.build(
+        job_id,
+        chat_id=chat_id,
+        message_id=message_id,
+        sender_id=sender_id,
+        update_type=update_type,
+        text=text,
+        raw_payload=payload,
+        dedup_key=dedup_key,
+        priority=priority,
+    )
+
+
+def parse_batch(raw_body: bytes, json_loads: Callable[[bytes], Any] = loads) -> list[Any]:
+    body = raw_body.strip()
+    if not body:
+        return []
+    if body.startswith(b"["):
+        items = json_loads(body)
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+        return items
+    return [json_loads(line) for line in body.splitlines() if line.strip()]
+
+
+def build_router(
+    settings,
+    rate_limiter: RateLimiter,
+    *,
+    json_loads: Callable[[bytes], Any] = loads,
+    ingress_limiter: KeyedRateLimiter | None = None,
+) -> APIRouter:
+    router = APIRouter()
+
+    def unauthorized(raw_body: bytes, request: Request) -> Response | None:
         signature = request.headers.get("X-Rubika-Signature")
         if not verify_signature(raw_body, signature, settings.webhook_secret):
             return Response(status_code=status.HTTP_401_UNAUTHORIZED)
-        if not rate_limiter.allow():
+        return None
+
+    def over_limit(updates: int) -> Response | None:
+        # with keyed limiting the global ceiling is charged per update, after the keys are known
+        if ingress_limiter is None and not rate_limiter.allow(updates):
             return Response(status_code=status.HTTP_429_TOO_MANY_REQUESTS)
+        return None
+
+    def limited(job: Job) -> bool:
+        if ingress_limiter is None:
+            return False
+        # admin commands and link moderation must not wait behind a flooding chat or sender,
+        # but they still count against the global ceiling
+        keyed = job.priority != "high"
+        return ingress_limiter.check(job.chat_id, job.sender_id, keyed=keyed) is not None
+
+    async def handle_request(request: Request) -> Response:
+        raw_body = await request.body()
+        rejected = unauthorized(raw_body, request) or over_limit(1)
+        if rejected is not None:
+            return rejected
         try:
-            payload = json.loads(raw_body.decode("utf-8"))
-        except json.JSONDecodeError:
+            payload = json_loads(raw_body)
+        except ValueError:
             return Response(status_code=status.HTTP_400_BAD_REQUEST)
-        message = extract_message(payload) or {}
-        update_id = payload.get("update_id") or payload.get("message_id") or message.get("message_id")
-        job_id = str(update_id) if update_id is not None else str(uuid4())
-        update_type = payload.get("type")
-        chat_id = get_chat_id(message)
-        message_id = get_message_id(message)
-        sender_id = get_sender_id(message)
-        text = get_text(message)
-        button_id = payload.get("button_id") or message.get("button_id")
-        dedup_key = ":".join(
-            [value for value in [chat_id, message_id, update_type, str(button_id) if button_id else None] if value]
-        ) or job_id
-        priority = "normal"
-        if text:
-            command = text.lstrip("/").split(maxsplit=1)[0].lower()
-            if command in admin_commands:
-                priority = "high"
-            elif "http" in text or "t.me" in text or "rubika.ir" in text:
-                priority = "high"
-        job = Job.build(
-            job_id,
-            chat_id=chat_id,
-            message_id=message_id,
-            sender_id=sender_id,
-            update_type=update_type,
-            text=text,
-            raw_payload=payload,
-            dedup_key=dedup_key,
-            priority=priority,
-        )
+        if not isinstance(payload, dict):
+            return Response(status_code=status.HTTP_400_BAD_REQUEST)
+        job = build_job(payload)
         queue = request.app.state.queue
+        # a retried update is answered before the limiter, so it does not cost its chat a token
+        if queue.is_duplicate(job):
+            return Response(status_code=status.HTTP_200_OK)
+        if limited(job):
+            return Response(status_code=status.HTTP_429_TOO_MANY_REQUESTS)
         decision = await queue.enqueue(job)
         if decision == "dropped":
             return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if decision == "shed":
+            retry_after = str(queue.admission.retry_after_seconds)
+            return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": retry_after})
         if decision == "duplicate":
             return Response(status_code=status.HTTP_200_OK)
         return Response(status_code=status.HTTP_200_OK)
@@ -86,4 +135,46 @@ def build_router(
     async def receive_inline_message(request: Request) -> Response:
         return await handle_request(request)
 
+    @router.post("/receiveUpdates")
+    async def receive_updates(request: Request) -> Response:
+        # one signature check and one queue lock for the whole batch; the rate limit counts every update
+        raw_body = await request.body()
+        rejected = unauthorized(raw_body, request)
+        if rejected is not None:
+            return rejected
+        try:
+            items = parse_batch(raw_body, json_loads)
+        except (UnicodeDecodeError, ValueError):
+            return Response(status_code=status.HTTP_400_BAD_REQUEST)
+        # a batch the limiter could never admit in one go would be refused on every retry
+        too_many = len(items) > MAX_BATCH_UPDATES or (ingress_limiter is None and len(items) > rate_limiter.max_requests)
+        if too_many:
+            return Response(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        rejected = over_limit(len(items))
+        if rejected is not None:
+            return rejected
+        results: list[str] = ["invalid"] * len(items)
+        accepted: list[tuple[int, Job]] = []
+        queue = request.app.state.queue
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            job = build_job(item)
+            if queue.is_duplicate(job):
+                results[idx] = "duplicate"
+                continue
+            if limited(job):
+                results[idx] = "rate_limited"
+                continue
+            accepted.append((idx, job))
+        decisions = await queue.enqueue_many([job for _, job in accepted])
+        for (idx, _), decision in zip(accepted, decisions):
+            results[idx] = decision
+        counts = {
+            name: results.count(name)
+            for name in ("enqueued", "spilled", "duplicate", "dropped", "shed", "rate_limited", "invalid")
+        }
+        headers = {"Retry-After": str(queue.admission.retry_after_seconds)} if counts["shed"] else None
+        return JSONResponse({"results": results, **counts}, headers=headers)
+
     return router
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+
+from app.config import settings
+from app.core.queue import JobQueue
+from app.core.worker import WorkerPool
+from app.db.queue_store import SqliteQueueStore
+from app.logging_config import setup_logging
+from app.services.outbox import Outbox
+from app.services.bootstrap import (
+    build_client,
+    build_context,
+    build_repository,
+    build_shared_state,
+    resolve_db_path,
+)
+from app.services.pipeline import build_command_registry, build_plugin_registry
+from app.utils.dedup import Deduplicator
+from app.utils.stats import StatsCollector
+
+LOGGER = logging.getLogger(__name__)
+
+RESTART_DELAY_SECONDS = 1.0
+
+
+async def run_worker(index: int, processes: int, stop: asyncio.Event | None = None) -> None:
+    """One worker process: claims jobs from the shared SQLite queue and dispatches them.
+
+    The ingest process (RUBIKA_PROCESS_ROLE=ingest) only writes to that queue. API rates are split
+    evenly, so all worker processes together stay within the configured limits, unless they
+    share one set of buckets through RUBIKA_SHARED_STATE_PATH. Every process records undelivered
+    moderation actions in the outbox; only the first one replays them.
+    """
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    repo = build_repository(settings)
+    shared_state = build_shared_state(settings)
+    client = build_client(
+        settings,
+        rate_share=1.0 if shared_state is not None else 1 / max(processes, 1),
+        shared_state=shared_state,
+    )
+    store = SqliteQueueStore(
+        resolve_db_path(settings.database_url),
+        visibility_seconds=settings.queue_visibility_seconds,
+        dedup_ttl_seconds=settings.dedup_ttl_seconds,
+        max_attempts=settings.queue_max_attempts,
+    )
+    outbox = None
+    outbox_task = None
+    if settings.outbox_enabled:
+        outbox = Outbox(
+            repo,
+            max_age_seconds=settings.outbox_max_age_seconds,
+            batch_size=settings.outbox_batch_size,
+            rate_per_second=settings.outbox_rate_per_second,
+        )
+        outbox.attach(client)
+        if index == 0:
+            outbox_task = asyncio.create_task(outbox.run(client, settings.outbox_interval_seconds))
+    stats = StatsCollector()
+    # a small buffer: whatever one process has claimed is not available to the others
+    queue = JobQueue(
+        max_size=max(settings.worker_concurrency * 2, 4),
+        deduplicator=Deduplicator(settings.dedup_ttl_seconds),
+        stats=stats,
+        backend=store,
+        poll_seconds=settings.queue_poll_ms / 1000,
+    )
+    command_registry = build_command_registry()
+    registry = build_plugin_registry(command_registry)
+    context = build_context(settings, repo, client, command_registry, stats, shared_state)
+
+    async def _process_job(job) -> None:
+        await registry.dispatch(job.raw_payload or {}, {**context, "job": job})
+
+    pool = WorkerPool(queue, _process_job, concurrency=settings.worker_concurrency, stats=stats)
+    await pool.start()
+    LOGGER.info("Worker process %s/%s started", index + 1, processes)
+    await stop.wait()
+    if outbox_task is not None:
+        outbox_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await outbox_task
+    await pool.stop()
+    await context["bulk_delete"].close()
+    queue.close()
+    store.close()
+    await client.close()
+    if shared_state is not None:
+        shared_state.close()
+    LOGGER.info("Worker process %s/%s stopped after %s jobs", index + 1, processes, stats.total_updates)
+
+
+def _worker_entry(index: int, processes: int) -> None:
+    setup_logging(settings.log_level, settings.log_file)
+    asyncio.run(run_worker(index, processes))
+
+
+def supervise(processes: int) -> int:
+    """Run worker processes and restart any that exit unexpectedly, until SIGTERM/SIGINT."""
+    ctx = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def _stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    def _spawn(index: int) -> multiprocessing.process.BaseProcess:
+        process = ctx.Process(target=_worker_entry, args=(index, processes), name=f"rubika-worker-{index}")
+        process.start()
+        return process
+
+    children = [_spawn(index) for index in range(processes)]
+    while not stopping:
+        time.sleep(RESTART_DELAY_SECONDS)
+        for index, process in enumerate(children):
+            if not process.is_alive() and not stopping:
+                LOGGER.warning("Worker process %s exited with %s, restarting", index + 1, process.exitcode)
+                children[index] = _spawn(index)
+    for process in children:
+        if process.is_alive():
+            process.terminate()
+    for process in children:
+        process.join(timeout=settings.queue_visibility_seconds)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="worker_main")
+    parser.add_argument("--processes", type=int, default=settings.worker_processes)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    setup_logging(settings.log_level, settings.log_file)
+    if args.processes <= 1:
+        asyncio.run(run_worker(0, 1))
+        return 0
+    return supervise(args.processes)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
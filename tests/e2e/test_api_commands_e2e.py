@@ -24,6 +24,9 @@ class FakeRubikaClient:
         self.commands = commands
         return {"ok": True}
 
+    async def prewarm(self, connections: int = 4) -> int:
+        return 0
+
     async def close(self) -> None:
         return None
 
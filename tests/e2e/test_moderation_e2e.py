@@ -30,6 +30,9 @@ class FakeRubikaClient:
     async def update_bot_endpoints(self, urls: list[str]) -> dict[str, object]:
         return {"ok": True}
 
+    async def prewarm(self, connections: int = 4) -> int:
+        return 0
+
     async def close(self) -> None:
         return None
 
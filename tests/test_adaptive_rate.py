@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+
+from app.core.rate_limit import AimdController
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub, StubProfile
+
+
+def _client(stub: RubikaApiStub, **kwargs) -> RubikaClient:
+    kwargs.setdefault("rate_limit_per_second", 1000)
+    return RubikaClient(
+        "token",
+        "http://stub",
+        transport=httpx.ASGITransport(app=stub.app),
+        retry_backoff=0.0,
+        **kwargs,
+    )
+
+
+def test_client_backs_off_and_honours_retry_after() -> None:
+    stub = RubikaApiStub(StubProfile(error_rate_429=1.0, retry_after_seconds=0.2, seed=1))
+
+    async def _run() -> tuple[float, dict]:
+        client = _client(stub, retry_attempts=1)
+        started = asyncio.get_running_loop().time()
+        await client.delete_message("c1", "1")
+        elapsed = asyncio.get_running_loop().time() - started
+        stats = client.rate_limiter_stats()
+        await client.close()
+        return elapsed, stats
+
+    elapsed, stats = asyncio.run(_run())
+    assert elapsed >= 0.2
+    adaptive = stats["adaptive"]["deleteMessage"]
+    assert adaptive["state"] == "throttled"
+    assert adaptive["rate_per_second"] == 500
+    assert stats["retry_budget"]["retries"] == 1
+
+
+def test_retry_budget_caps_retry_amplification() -> None:
+    stub = RubikaApiStub(StubProfile(error_rate_5xx=1.0, seed=1))
+
+    async def _run() -> dict:
+        client = _client(stub, retry_attempts=3, retry_budget_ratio=0.0, retry_budget_min_per_second=0.0)
+        client.retry_budget.balance = 2.0
+        await asyncio.gather(*[client.delete_message("c1", str(idx)) for idx in range(10)])
+        await client.close()
+        return client.retry_budget_stats()
+
+    budget = asyncio.run(_run())
+    assert len(stub.calls) == 12
+    assert budget["retries"] == 2
+    assert budget["exhausted"] >= 8
+
+
+def test_aimd_halves_once_per_cooldown_and_recovers() -> None:
+    controller = AimdController(20, floor_per_second=2, cooldown_seconds=1.0)
+    assert controller.on_throttle(now=10.0)
+    assert not controller.on_throttle(now=10.5)
+    assert controller.rate == 10 and controller.state == "throttled"
+    assert controller.on_throttle(now=11.5)
+    assert controller.rate == 5
+    for _ in range(1000):
+        controller.on_success()
+    assert controller.rate == 20 and controller.state == "steady"
@@ -0,0 +1,115 @@
+import asyncio
+
+from app.core.rate_limit import PRIORITY_HIGH, PRIORITY_LOW, HierarchicalRateLimiter
+
+
+def test_limiter_releases_waiters_by_priority_then_fifo() -> None:
+    async def _run() -> list[str]:
+        limiter = HierarchicalRateLimiter(method_rate_per_second=200, method_burst=1)
+        order: list[str] = []
+        await limiter.acquire("sendMessage")
+
+        async def _take(name: str, priority: int) -> None:
+            await limiter.acquire("sendMessage", priority=priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(_take("low-1", PRIORITY_LOW)),
+            asyncio.create_task(_take("low-2", PRIORITY_LOW)),
+            asyncio.create_task(_take("high", PRIORITY_HIGH)),
+        ]
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(_run()) == ["high", "low-1", "low-2"]
+
+
+def test_limiter_cancelled_waiter_does_not_consume_a_slot() -> None:
+    async def _run() -> HierarchicalRateLimiter:
+        limiter = HierarchicalRateLimiter(method_rate_per_second=50, method_burst=1)
+        await limiter.acquire("sendMessage")
+        cancelled = asyncio.create_task(limiter.acquire("sendMessage"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert limiter.waiting == 0
+        waited = await limiter.acquire("sendMessage")
+        assert waited < 0.05
+        return limiter
+
+    limiter = asyncio.run(_run())
+    assert limiter.stats.acquired == 2
+    assert limiter.stats.cancelled == 1
+    assert limiter.stats.waited == 1
+
+
+def test_limiter_try_acquire_respects_burst() -> None:
+    limiter = HierarchicalRateLimiter(method_rate_per_second=1, method_burst=2, chat_rate_per_second=1, chat_burst=1)
+    assert limiter.try_acquire("sendMessage", "c1")
+    assert not limiter.try_acquire("sendMessage", "c1")
+    assert limiter.try_acquire("sendMessage", "c2")
+    assert not limiter.try_acquire("sendMessage", "c3")
+    assert limiter.stats.acquired == 2
+
+
+def test_hierarchy_throttled_chat_does_not_block_other_chats() -> None:
+    async def _run() -> tuple[list[str], HierarchicalRateLimiter]:
+        limiter = HierarchicalRateLimiter(
+            method_rate_per_second=1000,
+            global_rate_per_second=1000,
+            chat_rate_per_second=5,
+            chat_burst=1,
+        )
+        order: list[str] = []
+
+        async def _send(chat_id: str) -> None:
+            await limiter.acquire("deleteMessage", chat_id)
+            order.append(chat_id)
+
+        await asyncio.gather(*[_send("busy") for _ in range(3)], _send("quiet"))
+        return order, limiter
+
+    order, limiter = asyncio.run(_run())
+    assert order.index("quiet") < 2
+    assert limiter.stats.blocked_by["chat"] >= 2
+
+
+def test_hierarchy_enforces_global_cap_across_methods() -> None:
+    limiter = HierarchicalRateLimiter(method_rate_per_second=1000, global_rate_per_second=1, global_burst=2)
+
+    async def _run() -> float:
+        await limiter.acquire("sendMessage", "c1")
+        await limiter.acquire("deleteMessage", "c2")
+        return await limiter.acquire("banChatMember", "c3")
+
+    assert asyncio.run(_run()) > 0.5
+
+
+def test_hierarchy_evicts_idle_chat_buckets(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("app.core.rate_limit.time.monotonic", lambda: now[0])
+    limiter = HierarchicalRateLimiter(chat_rate_per_second=1, chat_idle_seconds=10, max_chat_buckets=100)
+    for idx in range(50):
+        asyncio.run(limiter.acquire("sendMessage", f"chat-{idx}"))
+        now[0] += 0.1
+    assert limiter.chat_bucket_count == 50
+    now[0] += 30
+    asyncio.run(limiter.acquire("sendMessage", "fresh"))
+    assert limiter.chat_bucket_count == 1
+    assert limiter.stats.chat_buckets_evicted == 50
+
+
+def test_hierarchy_keeps_active_chat_buckets_when_full(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("app.core.rate_limit.time.monotonic", lambda: now[0])
+    limiter = HierarchicalRateLimiter(chat_rate_per_second=1, chat_burst=1, chat_idle_seconds=60, max_chat_buckets=2)
+    asyncio.run(limiter.acquire("sendMessage", "busy"))
+    asyncio.run(limiter.acquire("sendMessage", "other"))
+    now[0] += 0.5
+    # "busy" is least recently used but still has debt, so it must not be reset to a full burst
+    asyncio.run(limiter.acquire("sendMessage", "fresh"))
+    assert limiter.chat_bucket_count == 3
+    now[0] += 1
+    asyncio.run(limiter.acquire("sendMessage", "newer"))
+    assert limiter.chat_bucket_count == 3
+    assert "busy" not in limiter._chat_buckets
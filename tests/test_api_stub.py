@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub, StubProfile
+
+
+def _client(stub: RubikaApiStub, **kwargs) -> RubikaClient:
+    kwargs.setdefault("rate_limit_per_second", 1000)
+    return RubikaClient(
+        "token",
+        "http://stub",
+        transport=httpx.ASGITransport(app=stub.app),
+        retry_backoff=0.0,
+        **kwargs,
+    )
+
+
+def test_stub_records_calls_and_answers() -> None:
+    stub = RubikaApiStub()
+    stub.push_update({"type": "NewMessage", "chat_id": "c1"})
+
+    async def _run() -> tuple[dict, dict]:
+        client = _client(stub)
+        sent = await client.send_message("c1", "hi")
+        updates = await client.get_updates(limit=10)
+        await client.close()
+        return sent, updates
+
+    sent, updates = asyncio.run(_run())
+    assert sent["data"]["message_id"] == "1"
+    assert updates["data"]["updates"][0]["chat_id"] == "c1"
+    assert [record.method for record in stub.calls] == ["sendMessage", "getUpdates"]
+
+
+def test_stub_injects_errors_and_counts_retries() -> None:
+    stub = RubikaApiStub(StubProfile(error_rate_5xx=1.0, seed=1))
+
+    async def _run() -> dict:
+        client = _client(stub, retry_attempts=2)
+        result = await client.delete_message("c1", "m1")
+        await client.close()
+        return result
+
+    result = asyncio.run(_run())
+    assert result["ok"] is False
+    stats = stub.stats()
+    assert stats["deleteMessage"]["calls"] == 3
+    assert stats["deleteMessage"]["retries"] == 2
+
+
+def test_stub_per_method_rate_limit() -> None:
+    stub = RubikaApiStub(StubProfile(method_rate_limits={"sendMessage": 1}, rate_limit_burst=1, retry_after_seconds=2))
+    status_codes = []
+    for _ in range(2):
+        status_code, _, headers = asyncio.run(stub.handle("sendMessage", {"chat_id": "c1"}))
+        status_codes.append(status_code)
+    assert status_codes == [200, 429]
+    assert headers["Retry-After"] == "2"
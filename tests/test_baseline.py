@@ -0,0 +1,39 @@
+from app.utils import speedcheck
+from app.utils.baseline import _t_critical, compare_runs, host_fingerprint, load_baseline, save_baseline, summarize
+
+
+def test_summarize_confidence_interval() -> None:
+    summary = summarize([10.0, 12.0, 11.0, 13.0])
+    assert summary.low < summary.mean < summary.high
+    assert summary.samples == 4
+
+
+def test_compare_runs_flags_significant_regression() -> None:
+    baseline = [{"throughput_per_s": value, "p99_ms": 5.0} for value in (1000, 1010, 990, 1005)]
+    slower = [{"throughput_per_s": value, "p99_ms": 5.0} for value in (700, 710, 690, 705)]
+    noisy = [{"throughput_per_s": value, "p99_ms": 5.0} for value in (400, 1600, 900, 1100)]
+    regressed = {item.metric: item.regressed for item in compare_runs(baseline, slower, threshold=0.1)}
+    assert regressed["throughput_per_s"]
+    assert not regressed["p99_ms"]
+    assert not any(item.regressed for item in compare_runs(baseline, noisy, threshold=0.1))
+
+
+def test_baseline_roundtrip(tmp_path) -> None:
+    fingerprint = {"id": "abc"}
+    save_baseline(tmp_path, "speedcheck", [{"throughput_per_s": 1.0}], fingerprint=fingerprint)
+    stored = load_baseline(tmp_path, "speedcheck", fingerprint=fingerprint)
+    assert stored["runs"] == [{"throughput_per_s": 1.0}]
+    assert load_baseline(tmp_path, "speedcheck", fingerprint={"id": "other"}) is None
+
+
+def test_t_critical_rounds_down_to_the_nearest_tabulated_dof() -> None:
+    assert _t_critical(12) == _t_critical(10)
+    assert _t_critical(29) == _t_critical(20)
+    assert _t_critical(200) == _t_critical(30) > 1.96
+    assert "node" not in host_fingerprint()
+
+
+def test_speedcheck_compare_fails_without_a_baseline(tmp_path) -> None:
+    args = ["--samples", "20", "--compare", "--baseline-dir", str(tmp_path)]
+    assert speedcheck.main(args) != 0
+    assert speedcheck.main([*args, "--allow-missing"]) == 0
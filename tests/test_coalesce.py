@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub
+
+
+def _client(stub: RubikaApiStub, **kwargs) -> RubikaClient:
+    kwargs.setdefault("rate_limit_per_second", 1000)
+    return RubikaClient(
+        "token",
+        "http://stub",
+        transport=httpx.ASGITransport(app=stub.app),
+        retry_backoff=0.0,
+        **kwargs,
+    )
+
+
+def test_coalescing_merges_texts_and_collapses_edits() -> None:
+    stub = RubikaApiStub()
+
+    async def _run() -> dict:
+        client = _client(stub, coalesce_window_seconds=0.05, max_text_length=12)
+        await asyncio.gather(
+            client.send_message("c1", "first"),
+            client.send_message("c1", "second"),
+            client.send_message("c1", "third"),
+            client.send_message("c2", "other"),
+            *[client.edit_inline_keypad("c1", "m1", {"rows": [idx]}) for idx in range(5)],
+        )
+        stats = client.coalesce_stats()
+        await client.close()
+        return stats
+
+    stats = asyncio.run(_run())
+    texts = sorted(record.payload["text"] for record in stub.calls if record.method == "sendMessage")
+    assert texts == ["first\nsecond", "other", "third"]
+    edits = [record.payload for record in stub.calls if record.method == "editInlineKeypad"]
+    assert edits == [{"chat_id": "c1", "message_id": "m1", "inline_keypad": {"rows": [4]}}]
+    assert stats["calls_saved"] == 5
+
+
+def test_uncoalesced_send_keeps_its_own_message_id() -> None:
+    stub = RubikaApiStub()
+
+    async def _run() -> list[dict]:
+        client = _client(stub, coalesce_window_seconds=0.05)
+        results = await asyncio.gather(
+            client.send_message("c1", "hello"),
+            client.send_message("c1", "Deleting 0/10 messages", coalesce=False),
+        )
+        await client.close()
+        return results
+
+    merged, status = asyncio.run(_run())
+    texts = sorted(record.payload["text"] for record in stub.calls if record.method == "sendMessage")
+    assert texts == ["Deleting 0/10 messages", "hello"]
+    assert merged["data"]["message_id"] != status["data"]["message_id"]
@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+
+
+def test_pool_stats_and_prewarm() -> None:
+    async def _run() -> tuple[dict, dict]:
+        mocked = RubikaClient("token", "http://stub", transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+        pooled = RubikaClient("token", "http://127.0.0.1:9", max_connections=4, timeout_seconds=0.5)
+        warmed = await pooled.prewarm(2)
+        stats = mocked.pool_stats(), {**pooled.pool_stats(), "warmed": warmed}
+        await mocked.close()
+        await pooled.close()
+        return stats
+
+    mocked, pooled = asyncio.run(_run())
+    assert mocked == {"available": False}
+    assert pooled["available"] is True
+    assert pooled["warmed"] == 0
+    assert pooled["waiting"] == 0
+
+
+def test_pool_stats_are_unavailable_on_an_unknown_httpcore(monkeypatch) -> None:
+    monkeypatch.setattr("app.core.rubika_client.httpcore.__version__", "2.0.0")
+
+    async def _run() -> dict:
+        client = RubikaClient("token", "http://127.0.0.1:9")
+        stats = client.pool_stats()
+        await client.close()
+        return stats
+
+    assert asyncio.run(_run()) == {"available": False}
@@ -0,0 +1,35 @@
+import sqlite3
+
+from app.utils.dbbench import BenchConfig, _BenchRepository, run_db_benchmark
+
+
+def test_db_benchmark_reports_operations(tmp_path) -> None:
+    result = run_db_benchmark(
+        BenchConfig(workers=2, profile="default", batch_size=8),
+        duration_s=0.3,
+        chats=3,
+        directory=str(tmp_path),
+        janitor_interval_s=0.1,
+    )
+    assert result.total_ops > 0
+    assert result.ops_per_s > 0
+    assert result.write_transactions > 0
+    assert result.errors == 0
+
+
+def test_db_benchmark_counts_batched_writes_only_once_committed(tmp_path, monkeypatch) -> None:
+    def _locked(self, rows) -> None:
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(_BenchRepository, "bulk_insert_messages", _locked)
+    monkeypatch.setattr(_BenchRepository, "bulk_save_incoming_updates", _locked)
+    result = run_db_benchmark(
+        BenchConfig(workers=1, profile="default", batch_size=4),
+        duration_s=0.2,
+        chats=3,
+        directory=str(tmp_path),
+    )
+    assert result.locked > 0
+    assert "save_message" not in result.ops
+    assert "save_incoming_update" not in result.ops
+    assert result.ops["get_group"] > 0
@@ -1,6 +1,7 @@
 import asyncio
 
 from app.db import Repository, ensure_schema
+from app.services.bulk_delete import BulkDeleteEngine
 from app.services.handlers import delete_handler
 
 
@@ -9,7 +10,7 @@ class DummyClient:
         self.deleted: list[tuple[str, str]] = []
         self.messages: list[tuple[str, str]] = []
 
-    async def delete_message(self, chat_id: str, message_id: str) -> dict[str, bool]:
+    async def delete_message(self, chat_id: str, message_id: str, **kwargs) -> dict[str, bool]:
         self.deleted.append((chat_id, message_id))
         return {"ok": True}
 
@@ -31,10 +32,91 @@ def test_delete_handler_deletes_recent_messages(tmp_path):
     )
     client = DummyClient()
     message = {"chat": {"id": "chat-1"}, "message_id": "m10", "sender": {"id": "admin"}, "text": "/del 2"}
-    context = {"repo": repo, "client": client}
+    engine = BulkDeleteEngine(repo, client)
+    context = {"repo": repo, "client": client, "bulk_delete": engine}
 
-    asyncio.run(delete_handler(message, context, ["2"]))
+    async def _run() -> None:
+        await delete_handler(message, context, ["2"])
+        # the purge runs in the background, and a second one for the chat is refused meanwhile
+        assert engine.is_running("chat-1")
+        await delete_handler(message, context, ["2"])
+        await engine.join()
+
+    asyncio.run(_run())
 
     assert len(client.deleted) == 2
     assert client.messages
+    assert any("در جریان است" in text for _, text in client.messages)
     assert "حذف شد" in client.messages[-1][1]
+
+
+def test_bulk_delete_removes_rows_and_resumes_after_cancel(tmp_path):
+    db_path = tmp_path / "bot.db"
+    ensure_schema(str(db_path))
+    repo = Repository(str(db_path))
+    repo.bulk_insert_messages([("chat-1", f"m{idx}", "u1", "text") for idx in range(6)])
+    client = DummyClient()
+    engine = BulkDeleteEngine(repo, client, concurrency=1)
+    original_delete = client.delete_message
+
+    async def _cancel_after_two(chat_id: str, message_id: str, **kwargs) -> dict[str, bool]:
+        result = await original_delete(chat_id, message_id)
+        if len(client.deleted) == 2:
+            engine.cancel(chat_id)
+        return result
+
+    client.delete_message = _cancel_after_two
+    message_ids = repo.fetch_recent_message_ids("chat-1", 6)
+    job = asyncio.run(engine.run("chat-1", message_ids))
+
+    assert job.cancelled
+    assert len(job.deleted_ids) == 2
+    assert repo.count_records("messages") == 4
+    assert engine.pending_resume("chat-1") == message_ids[2:]
+
+    client.delete_message = original_delete
+    context = {"repo": repo, "client": client, "bulk_delete": engine}
+    message = {"chat": {"id": "chat-1"}, "message_id": "m10", "sender": {"id": "admin"}, "text": "/del resume"}
+
+    async def _resume() -> None:
+        await delete_handler(message, context, ["resume"])
+        await engine.join()
+
+    asyncio.run(_resume())
+
+    assert len(client.deleted) == 6
+    assert repo.count_records("messages") == 0
+    assert engine.pending_resume("chat-1") == []
+
+
+def test_bulk_delete_keeps_in_flight_and_retryable_ids_resumable(tmp_path):
+    db_path = tmp_path / "bot.db"
+    ensure_schema(str(db_path))
+    repo = Repository(str(db_path))
+    client = DummyClient()
+    engine = BulkDeleteEngine(repo, client, concurrency=2)
+    release = asyncio.Event()
+
+    async def _delete(chat_id: str, message_id: str, **kwargs) -> dict:
+        if message_id == "m1":
+            return {"ok": False, "error": "outbound_queue_full", "retryable": True}
+        if message_id == "m2":
+            await release.wait()
+        client.deleted.append((chat_id, message_id))
+        return {"ok": True}
+
+    client.delete_message = _delete
+
+    async def _run() -> None:
+        engine.start("chat-1", ["m0", "m1", "m2", "m3"])
+        while len(client.deleted) < 2:
+            await asyncio.sleep(0)
+        # shutdown while m2 is still waiting on the API
+        await engine.close()
+
+    asyncio.run(_run())
+    assert engine.pending_resume("chat-1") == ["m1", "m2"]
+
+    client.delete_message = DummyClient().delete_message
+    asyncio.run(engine.run("chat-1", engine.pending_resume("chat-1")))
+    assert repo.get_setting("bulk_delete:chat-1") is None
@@ -1,4 +1,4 @@
-from app.cli.doctor_utils import mask_secret, parse_sqlite_path
+from app.cli.doctor_utils import mask_secret, parse_sqlite_path, summarize_api_telemetry
 
 
 def test_mask_secret() -> None:
@@ -9,3 +9,22 @@ def test_mask_secret() -> None:
 def test_parse_sqlite_path() -> None:
     assert parse_sqlite_path("sqlite:///data/bot.db") == "data/bot.db"
     assert parse_sqlite_path("/tmp/test.db") == "/tmp/test.db"
+
+
+def test_summarize_api_telemetry() -> None:
+    rows = summarize_api_telemetry(
+        {
+            "getMe": {"calls": 1, "errors": 0, "remote": {"count": 1}},
+            "sendMessage": {
+                "calls": 10,
+                "retries": 2,
+                "errors": 3,
+                "remote": {"count": 12, "p99_ms": 250.0},
+                "limiter_wait": {"avg_ms": 40.0},
+                "limiter_share": 0.6,
+            },
+        }
+    )
+    assert [row["method"] for row in rows] == ["sendMessage", "getMe"]
+    assert rows[0]["error_rate"] == 0.25
+    assert rows[0]["limiter_share"] == 0.6
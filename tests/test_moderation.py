@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from app.services.moderation import ModerationExecutor
+
+
+def test_moderation_actions_run_concurrently_and_timeouts_do_not_cancel() -> None:
+    executor = ModerationExecutor(timeouts={"ban": 0.05})
+    finished: list[str] = []
+
+    async def _call(name: str, delay: float, ok: bool = True) -> dict[str, object]:
+        await asyncio.sleep(delay)
+        finished.append(name)
+        return {"ok": ok}
+
+    async def _run() -> tuple[dict[str, dict], float]:
+        start = time.perf_counter()
+        results = await executor.run(
+            {
+                "delete": _call("delete", 0.1),
+                "ban": _call("ban", 0.2),
+                "report": _call("report", 0.1, ok=False),
+            }
+        )
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.2)
+        return results, elapsed
+
+    results, elapsed = asyncio.run(_run())
+
+    assert elapsed < 0.18
+    assert results["delete"]["ok"] is True
+    assert results["ban"]["error"] == "timeout"
+    assert "ban" in finished
+    stats = executor.stats()
+    assert stats["in_background"] == 0
+    assert stats["actions"]["delete"]["ok"] == 1
+    assert stats["actions"]["report"]["failed"] == 1
+    assert stats["actions"]["ban"]["timeouts"] == 1
+    assert stats["decisions"]["count"] == 1
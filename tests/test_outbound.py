@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub
+
+
+def _client(stub: RubikaApiStub, **kwargs) -> RubikaClient:
+    kwargs.setdefault("rate_limit_per_second", 1000)
+    return RubikaClient(
+        "token",
+        "http://stub",
+        transport=httpx.ASGITransport(app=stub.app),
+        retry_backoff=0.0,
+        **kwargs,
+    )
+
+
+def test_moderation_calls_overtake_bulk_and_stale_bulk_is_dropped() -> None:
+    stub = RubikaApiStub()
+
+    async def _run() -> tuple[float, list[dict], dict]:
+        client = _client(
+            stub,
+            rate_limit_per_second=20,
+            method_burst=1,
+            outbound_deadlines={"bulk": 0.5},
+        )
+        bulk = [
+            asyncio.create_task(client.delete_message("c1", str(idx), outbound_class="bulk")) for idx in range(40)
+        ]
+        await asyncio.sleep(0.05)
+        started = asyncio.get_running_loop().time()
+        await client.delete_message("c2", "spam")
+        moderation_s = asyncio.get_running_loop().time() - started
+        results = await asyncio.gather(*bulk)
+        stats = client.rate_limiter_stats()["outbound"]
+        await client.close()
+        return moderation_s, results, stats
+
+    moderation_s, results, stats = asyncio.run(_run())
+    assert moderation_s < 0.15
+    assert any(result.get("error") == "deadline_exceeded" for result in results)
+    assert stats["bulk"]["expired"] > 0
+    assert stats["moderation"]["completed"] == 1
+
+
+def test_outbound_class_queue_is_bounded() -> None:
+    stub = RubikaApiStub()
+
+    async def _run() -> list[dict]:
+        client = _client(stub, rate_limit_per_second=1, method_burst=1, outbound_max_pending={"interactive": 2})
+        results = await asyncio.gather(*[client.send_message("c1", str(idx)) for idx in range(5)])
+        await client.close()
+        return results
+
+    results = asyncio.run(_run())
+    assert sum(1 for result in results if result.get("error") == "outbound_queue_full") == 2
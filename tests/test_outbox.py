@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import httpx
+
+from app.core.outbound import OUTBOUND_BULK
+from app.core.rubika_client import RubikaClient
+from app.db import Repository, ensure_schema
+from app.services.outbox import Outbox
+from app.utils.api_stub import RubikaApiStub, StubProfile
+
+
+def test_outbox_keeps_failed_moderation_and_replays_after_recovery(tmp_path) -> None:
+    db_path = str(tmp_path / "bot.db")
+    ensure_schema(db_path)
+    repo = Repository(db_path)
+    stub = RubikaApiStub(StubProfile(error_rate_5xx=1.0))
+    outbox = Outbox(repo, rate_per_second=1000)
+
+    async def _run() -> tuple[int, int]:
+        client = RubikaClient(
+            "token",
+            "http://stub",
+            transport=httpx.ASGITransport(app=stub.app),
+            retry_attempts=0,
+            rate_limit_per_second=1000,
+        )
+        outbox.attach(client)
+        await client.delete_message("c1", "m1")
+        await client.delete_message("c1", "m1")
+        await client.ban_chat_member("c1", "u1")
+        await client.send_message("c1", "not queued")
+        deferred = await outbox.replay_once(client)
+        stub.configure(StubProfile())
+        stub.reset()
+        repo.defer_outbox([row["id"] for row in repo.claim_due_outbox(10, 0.0, now=float("inf"))], 0.0, None)
+        replayed = await outbox.replay_once(client)
+        await client.close()
+        return deferred, replayed
+
+    deferred, replayed = asyncio.run(_run())
+    assert deferred == 0
+    assert replayed == 2
+    assert [record.method for record in stub.calls] == ["deleteMessage", "banChatMember"]
+    assert outbox.stats.recorded == 2
+    assert outbox.stats.replayed == 2
+    assert repo.count_records("outbox") == 0
+
+
+def test_outbox_skips_bulk_deletes_shed_by_the_scheduler(tmp_path) -> None:
+    db_path = str(tmp_path / "bot.db")
+    ensure_schema(db_path)
+    repo = Repository(db_path)
+    stub = RubikaApiStub(StubProfile())
+
+    async def _run() -> list[str]:
+        client = RubikaClient(
+            "token",
+            "http://stub",
+            transport=httpx.ASGITransport(app=stub.app),
+            rate_limit_per_second=1,
+            method_burst=1,
+            global_rate_limit_per_second=None,
+            outbound_deadlines={"bulk": 0.05},
+        )
+        Outbox(repo).attach(client)
+        await client.delete_message("c1", "m1", outbound_class=OUTBOUND_BULK)
+        # the bucket is empty for a second, longer than the bulk deadline
+        result = await client.delete_message("c1", "m2", outbound_class=OUTBOUND_BULK)
+        await client.close()
+        return [result.get("error")]
+
+    assert asyncio.run(_run()) == ["deadline_exceeded"]
+    assert repo.count_records("outbox") == 0
+
+
+def test_outbox_expires_old_entries(tmp_path) -> None:
+    db_path = str(tmp_path / "bot.db")
+    ensure_schema(db_path)
+    repo = Repository(db_path)
+    outbox = Outbox(repo, max_age_seconds=60)
+    repo.enqueue_outbox("deleteMessage", "c1", "m1", '{"chat_id": "c1", "message_id": "m1"}', now=0.0)
+
+    class _Client:
+        async def api_call(self, *args, **kwargs) -> dict:
+            raise AssertionError("expired entries must not be replayed")
+
+    assert asyncio.run(outbox.replay_once(_Client())) == 0
+    assert outbox.stats.expired == 1
+
+
+def test_outbox_drops_queued_actions_undone_by_a_later_one(tmp_path) -> None:
+    db_path = str(tmp_path / "bot.db")
+    ensure_schema(db_path)
+    repo = Repository(db_path)
+    outbox = Outbox(repo)
+    member = {"chat_id": "c1", "user_id": "u1"}
+    outbox.record("banChatMember", member, {"error": "timeout"})
+    outbox.record("unbanChatMember", member, {"error": "timeout"})
+    assert [row["method"] for row in repo.claim_due_outbox(10, 0.0, now=float("inf"))] == ["unbanChatMember"]
+    outbox.delivered("banChatMember", member, {"ok": True})
+    assert repo.count_records("outbox") == 0
+    assert outbox.stats.superseded == 2
+
+    for message_id in ("m1", "m2", "m3"):
+        outbox.record("deleteMessage", {"chat_id": "c1", "message_id": message_id}, {"error": "timeout"})
+    # a second replayer does not get the entries the first one is working on
+    assert len(repo.claim_due_outbox(10, 60.0)) == 3
+    assert repo.claim_due_outbox(10, 60.0) == []
+    assert len(repo.claim_due_outbox(10, 60.0, now=time.time() + 61)) == 3
+
+
+def test_only_the_first_worker_process_replays_the_outbox(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("RUBIKA_BOT_TOKEN", "token")
+    from app import worker_main
+
+    db_path = str(tmp_path / "bot.db")
+    calls: list[str] = []
+    clients: list = []
+
+    class _Client:
+        def __init__(self, *args, **kwargs) -> None:
+            self.undelivered_sink = None
+            clients.append(self)
+
+        async def api_call(self, method: str, payload: dict, **kwargs) -> dict:
+            calls.append(method)
+            return {"ok": True}
+
+        async def close(self) -> None:
+            pass
+
+    monkeypatch.setattr("app.core.rubika_client.RubikaClient", _Client)
+    for name, value in {
+        "database_url": f"sqlite:///{db_path}",
+        "outbox_enabled": True,
+        "outbox_interval_seconds": 0.01,
+        "outbox_rate_per_second": 1000.0,
+        "shared_state_path": "",
+    }.items():
+        monkeypatch.setattr(worker_main.settings, name, value)
+
+    async def _run(index: int) -> None:
+        stop = asyncio.Event()
+        task = asyncio.create_task(worker_main.run_worker(index, 2, stop))
+        await asyncio.sleep(0.2)
+        stop.set()
+        await task
+
+    ensure_schema(db_path)
+    Repository(db_path).enqueue_outbox("deleteMessage", "c1", "m1", '{"chat_id": "c1", "message_id": "m1"}')
+    asyncio.run(_run(1))
+    assert calls == []
+    asyncio.run(_run(0))
+    assert calls == ["deleteMessage"]
+    assert all(client.undelivered_sink is not None for client in clients)
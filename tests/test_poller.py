@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from app.core.queue import JobQueue
+from app.core.rubika_client import RubikaClient
+from app.db import Repository, ensure_schema
+from app.services.poller import UpdatePoller
+from app.utils.api_stub import RubikaApiStub
+from app.utils.dedup import Deduplicator
+
+
+def test_poller_catches_up_and_persists_offset(tmp_path) -> None:
+    db_path = str(tmp_path / "bot.db")
+    ensure_schema(db_path)
+    repo = Repository(db_path)
+    stub = RubikaApiStub()
+    for idx in range(7):
+        stub.push_update({"type": "NewMessage", "chat_id": "c1", "new_message": {"message_id": str(idx), "text": "hi"}})
+
+    async def _run(max_size: int) -> tuple[UpdatePoller, JobQueue, int]:
+        client = RubikaClient(
+            "token", "http://stub", transport=httpx.ASGITransport(app=stub.app), rate_limit_per_second=1000
+        )
+        queue = JobQueue(max_size=max_size, deduplicator=Deduplicator(60))
+        poller = UpdatePoller(client, repo, queue, max_batch=3, idle_seconds=0.01)
+
+        async def _drain() -> None:
+            while True:
+                queue.task_done(await queue.get())
+
+        drainer = asyncio.create_task(_drain())
+        received = await poller.run(stop_when_idle=True)
+        drainer.cancel()
+        await client.close()
+        return poller, queue, received
+
+    poller, _, received = asyncio.run(_run(max_size=5))
+    assert received == 7
+    assert poller.stats.dropped == 0
+    assert poller.stats.last_limit <= 3
+    assert repo.get_setting("polling:offset") == "8"
+
+    stub.push_update({"type": "NewMessage", "chat_id": "c1", "new_message": {"message_id": "7", "text": "late"}})
+    poller, queue, received = asyncio.run(_run(max_size=100))
+    assert received == 1
+    assert poller.stats.enqueued == 1
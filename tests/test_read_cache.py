@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub, StubProfile
+
+
+def _client(stub: RubikaApiStub, **kwargs) -> RubikaClient:
+    kwargs.setdefault("rate_limit_per_second", 1000)
+    return RubikaClient(
+        "token",
+        "http://stub",
+        transport=httpx.ASGITransport(app=stub.app),
+        retry_backoff=0.0,
+        **kwargs,
+    )
+
+
+def test_reads_are_cached_and_single_flight() -> None:
+    stub = RubikaApiStub(StubProfile(latency="constant:20"))
+
+    async def _run() -> dict:
+        client = _client(stub)
+        results = await asyncio.gather(*[client.get_chat("c1") for _ in range(10)])
+        assert all(result["data"]["chat"]["chat_id"] == "c1" for result in results)
+        await client.get_chat("c1")
+        await client.get_chat("c2")
+        stats = client.read_cache_stats()["getChat"]
+        await client.close()
+        return stats
+
+    stats = asyncio.run(_run())
+    assert [record.payload["chat_id"] for record in stub.calls] == ["c1", "c2"]
+    assert stats["coalesced"] == 9
+    assert stats["hits"] == 1
+    assert stats["size"] == 2
+
+
+def test_failed_reads_are_not_cached() -> None:
+    stub = RubikaApiStub(StubProfile(error_rate_5xx=1.0))
+
+    async def _run() -> None:
+        client = _client(stub, retry_attempts=0)
+        await client.get_me()
+        await client.get_me()
+        await client.close()
+
+    asyncio.run(_run())
+    assert len(stub.calls) == 2
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from app.db import Repository, ensure_schema
+from app.utils.replay import ReplayClient, iter_source_rows, replay_updates
+
+
+def _store(repo: Repository, job_id: str, received_at: float, payload: dict) -> None:
+    repo.save_incoming_update(job_id, received_at, None, None, None, None, None, json.dumps(payload))
+
+
+def test_replay_runs_updates_through_pipeline(tmp_path) -> None:
+    source = str(tmp_path / "source.db")
+    ensure_schema(source)
+    repo = Repository(source)
+    link = {
+        "update_id": "2",
+        "message": {"message_id": "m2", "chat": {"id": "g1", "type": "Group"}, "sender": {"id": "u2"}, "text": "t.me/x"},
+    }
+    hello = {
+        "update_id": "1",
+        "message": {"message_id": "m1", "chat": {"id": "g1", "type": "Group"}, "sender": {"id": "u1"}, "text": "hi"},
+    }
+    _store(repo, "2", 200.0, link)
+    _store(repo, "1", 100.0, hello)
+    repo.save_incoming_update("3", 150.0, None, None, None, None, None, None)
+
+    rows = list(iter_source_rows(source))
+    assert [received_at for received_at, _ in rows] == [100.0, 200.0]
+
+    report = asyncio.run(
+        replay_updates(rows, scratch_db=str(tmp_path / "scratch.db"), client=ReplayClient(), speed=0)
+    )
+
+    assert report.enqueued == 2
+    assert report.source_span_s == 100.0
+    assert report.actions["deleteMessage"] == 1
+    assert report.actions["banChatMember"] == 1
+    assert len(report.latencies_ms) == 2
+
+
+def test_replay_runs_admin_purges(tmp_path) -> None:
+    def _message(update_id: int, sender: str, text: str) -> tuple[float, str]:
+        payload = {
+            "update_id": str(update_id),
+            "message": {"message_id": f"m{update_id}", "chat": {"id": "g1"}, "sender": {"id": sender}, "text": text},
+        }
+        return float(update_id), json.dumps(payload)
+
+    scratch_db = str(tmp_path / "scratch.db")
+    # a separate run, since the command would otherwise jump the queue ahead of the messages it deletes
+    asyncio.run(replay_updates([_message(idx, "u1", "hi") for idx in range(1, 4)], scratch_db=scratch_db, client=ReplayClient()))
+    report = asyncio.run(
+        replay_updates([_message(4, "owner", "/del 4")], scratch_db=scratch_db, client=ReplayClient(), owner_id="owner")
+    )
+
+    assert report.errors == 0
+    assert report.actions["deleteMessage"] == 4
+    assert Repository(scratch_db).count_records("messages") == 0
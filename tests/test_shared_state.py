@@ -0,0 +1,54 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from app.core.rate_limit import HierarchicalRateLimiter
+from app.utils.dedup import Deduplicator
+from app.utils.rate_limiter import KeyedRateLimiter
+from app.utils.shared_state import SharedStateTable
+
+
+def _count_fresh(path: str, keys: list[str], results) -> None:
+    table = SharedStateTable(path, slots=4096)
+    deduplicator = Deduplicator(60, shared=table)
+    results.put(sum(1 for key in keys if not deduplicator.seen(key)))
+    table.close()
+
+
+def test_shared_deduplicator_admits_each_key_once_across_processes(tmp_path) -> None:
+    path = str(tmp_path / "state.bin")
+    SharedStateTable(path, slots=4096).close()
+    keys = [f"update-{idx}" for idx in range(300)]
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_count_fresh, args=(path, keys, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    fresh = sum(results.get(timeout=10) for _ in processes)
+    for process in processes:
+        process.join(timeout=10)
+    assert fresh == len(keys)
+
+
+def test_shared_limiters_charge_one_allowance(tmp_path) -> None:
+    path = str(tmp_path / "state.bin")
+    first, second = SharedStateTable(path, slots=1024), SharedStateTable(path, slots=1024)
+    limiters = [
+        KeyedRateLimiter(chat_per_minute=60, sender_per_minute=60, burst=2, shared=table) for table in (first, second)
+    ]
+    assert [limiters[idx % 2].check("g1", f"u{idx}") for idx in range(3)] == [None, None, "chat"]
+    # another chat is not held back by the flooding one
+    assert limiters[1].check("g2", "u9") is None
+
+    async def _acquire() -> None:
+        api = [HierarchicalRateLimiter(global_rate_per_second=1, global_burst=2, shared=table) for table in (first, second)]
+        await api[0].acquire("sendMessage")
+        await api[0].acquire("sendMessage")
+        with pytest.raises(asyncio.TimeoutError):
+            await api[1].acquire("sendMessage", deadline=time.monotonic() + 0.05)
+
+    asyncio.run(_acquire())
+    with pytest.raises(ValueError):
+        SharedStateTable(path, slots=2048)
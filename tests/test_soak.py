@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services.plugins.anti_flood import AntiFloodPlugin
+from app.utils.soak import _SoakRepository, run_soak
+
+
+class _Client:
+    async def delete_message(self, chat_id: str, message_id: str) -> dict:
+        return {"ok": True}
+
+    async def ban_chat_member(self, chat_id: str, user_id: str) -> dict:
+        return {"ok": True}
+
+
+def test_anti_flood_evicts_idle_senders(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("app.services.plugins.anti_flood.time.monotonic", lambda: now[0])
+    plugin = AntiFloodPlugin(window_seconds=8)
+    context = {"repo": _SoakRepository(), "client": _Client()}
+
+    async def _send(sender: str) -> None:
+        update = {"message": {"message_id": "m", "chat": {"id": "c1"}, "sender": {"id": sender}}}
+        await plugin.handle(update, context)
+
+    for idx in range(50):
+        asyncio.run(_send(f"u{idx}"))
+    assert len(plugin._events) == 50
+    now[0] += 20
+    asyncio.run(_send("fresh"))
+    assert list(plugin._events) == ["c1:fresh"]
+
+
+def test_soak_reports_samples() -> None:
+    # windows longer than the run keep every key active, so bytes per key is what each one really costs
+    report = asyncio.run(
+        run_soak(2000, snapshot_every=1000, dedup_ttl_seconds=60, flood_window_seconds=60, budget_bytes_per_key=4096, top=3)
+    )
+    assert [sample.processed for sample in report.samples] == [1000, 2000]
+    assert report.final.active_keys == 2000
+    assert report.within_budget
+
+
+def test_soak_memory_stays_flat_once_keys_expire() -> None:
+    # every key is forgotten within 50ms; keeping them (~1KB each) would add about 6MB after the first sample
+    report = asyncio.run(run_soak(8000, snapshot_every=2000, dedup_ttl_seconds=0.05, flood_window_seconds=0.05))
+    traced = [sample.traced_bytes for sample in report.samples]
+    assert len(traced) == 4
+    assert traced[-1] - traced[0] < 600_000
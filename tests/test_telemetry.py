@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+
+from app.core.rubika_client import RubikaClient
+from app.utils.api_stub import RubikaApiStub, StubProfile
+
+
+def test_telemetry_splits_limiter_wait_from_remote_latency() -> None:
+    stub = RubikaApiStub(StubProfile(latency="constant:20", method_latency={"getMe": "constant:0"}))
+
+    async def _run() -> tuple[dict, str]:
+        client = RubikaClient(
+            "token",
+            "http://stub",
+            transport=httpx.ASGITransport(app=stub.app),
+            rate_limit_per_second=20,
+            method_burst=1,
+            read_cache_ttls={"getMe": 0},
+        )
+        await asyncio.gather(*[client.send_message("c1", str(idx)) for idx in range(3)])
+        await client.get_me()
+        telemetry = client.telemetry.snapshot()
+        text = client.telemetry.render_prometheus()
+        await client.close()
+        return telemetry, text
+
+    telemetry, text = asyncio.run(_run())
+    send = telemetry["sendMessage"]
+    assert send["calls"] == 3
+    assert send["statuses"] == {"200": 3}
+    assert send["remote"]["count"] == 3 and send["remote"]["avg_ms"] >= 20
+    assert send["limiter_wait"]["sum_ms"] >= 50
+    assert 'rubika_api_calls_total{method="getMe"} 1' in text
+    assert 'rubika_api_remote_latency_ms_bucket{method="sendMessage",le="+Inf"} 3' in text
+    # each family's samples follow its own TYPE line, before the next family starts
+    families: list[str] = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE"):
+            families.append(line.split()[2])
+        else:
+            assert line.split("{")[0] in {families[-1] + suffix for suffix in ("", "_bucket", "_sum", "_count")}
+    assert len(families) == len(set(families)) == 6
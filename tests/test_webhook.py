@@ -5,3 +5,14 @@ def test_deduplicator():
     dedup = Deduplicator(10)
     assert not dedup.seen("1")
     assert dedup.seen("1")
+
+
+def test_deduplicator_expires_old_keys(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.utils.dedup.time.monotonic", lambda: now[0])
+    dedup = Deduplicator(10)
+    assert not dedup.seen("1")
+    now[0] += 11
+    assert not dedup.seen("2")
+    assert len(dedup) == 1
+    assert not dedup.seen("1")
@@ -1,10 +1,15 @@
+import json
+
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from app.core.queue import JobQueue
 from app.db import Repository, ensure_schema
 from app.utils.dedup import Deduplicator
-from app.utils.rate_limiter import RateLimiter
+from app.utils.fastjson import loads
+from app.utils.message import extract_message, extract_update_fields, get_chat_id, get_message_id, get_sender_id, get_text
+from app.utils.rate_limiter import KeyedRateLimiter, RateLimiter
+from app.utils.shared_state import SharedStateTable
 from app.webhook.router import build_router
 
 
@@ -34,3 +39,111 @@ def test_webhook_handler_returns_200(tmp_path) -> None:
     response = client.post("/receiveUpdate", json=payload)
     assert response.status_code == 200
     assert queue.size() == 1
+
+
+def test_batch_endpoint_reports_per_item_results() -> None:
+    queue = JobQueue(max_size=2, deduplicator=Deduplicator(60))
+    app = FastAPI()
+    app.state.queue = queue
+    app.include_router(build_router(settings=_Settings(), rate_limiter=RateLimiter(1000)))
+    client = TestClient(app)
+
+    def _update(message_id: str) -> dict:
+        return {"message": {"message_id": message_id, "chat": {"id": "c1"}, "sender": {"id": "u1"}, "text": "hi"}}
+
+    response = client.post("/receiveUpdates", json=[_update("m1"), _update("m1"), "junk", _update("m2"), _update("m3")])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["results"] == ["enqueued", "duplicate", "invalid", "enqueued", "dropped"]
+    assert queue.size() == 2
+
+    ndjson = "\n".join(json.dumps(_update(message_id)) for message_id in ["m4", "m1"])
+    response = client.post("/receiveUpdates", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["results"] == ["dropped", "duplicate"]
+    assert client.post("/receiveUpdates", content="{not json").status_code == 400
+
+
+def test_extract_update_fields_matches_helpers() -> None:
+    updates = [
+        {"type": "NewMessage", "message": {"id": "m1", "chat_id": "c1", "sender_id": "u1", "body": "hey"}},
+        {"inline_message": {"message_id": "m2", "chat": {"id": "c2"}, "sender": {"id": "u2"}, "button_id": "b"}},
+        {"update_id": "3"},
+    ]
+    for update in updates:
+        message = extract_message(update)
+        fields = extract_update_fields(update)
+        assert fields.chat_id == get_chat_id(message)
+        assert fields.message_id == get_message_id(message)
+        assert fields.sender_id == get_sender_id(message)
+        assert fields.text == get_text(message)
+    assert extract_update_fields(updates[1]).button_id == "b"
+    assert loads(b'{"a": "\xd8\xb3"}') == {"a": "س"}
+
+
+def test_keyed_ingress_limit_isolates_a_flooding_chat() -> None:
+    queue = JobQueue(max_size=100, deduplicator=Deduplicator(60))
+    limiter = KeyedRateLimiter(chat_per_minute=60, sender_per_minute=0, global_per_minute=600, burst=3)
+    app = FastAPI()
+    app.state.queue = queue
+    app.include_router(build_router(settings=_Settings(), rate_limiter=RateLimiter(1), ingress_limiter=limiter))
+    client = TestClient(app)
+
+    def _post(chat_id: str, message_id: int) -> int:
+        payload = {"message": {"message_id": str(message_id), "chat": {"id": chat_id}, "text": "spam"}}
+        return client.post("/receiveUpdate", json=payload).status_code
+
+    flood = [_post("flood", idx) for idx in range(10)]
+    assert flood.count(200) == 3
+    assert [_post("quiet", idx) for idx in range(2)] == [200, 200]
+    stats = limiter.stats()
+    assert stats["rejected_by"] == {"global": 0, "chat": 7, "sender": 0}
+    assert stats["top_rejected"][0] == {"key": "chat:flood", "rejected": 7}
+
+
+def test_keyed_ingress_limit_spares_retries_and_admin_commands() -> None:
+    queue = JobQueue(max_size=100, deduplicator=Deduplicator(60))
+    limiter = KeyedRateLimiter(chat_per_minute=60, sender_per_minute=0, global_per_minute=600, burst=2)
+    app = FastAPI()
+    app.state.queue = queue
+    app.include_router(build_router(settings=_Settings(), rate_limiter=RateLimiter(5), ingress_limiter=limiter))
+    client = TestClient(app)
+
+    def _post(message_id: int, text: str = "spam") -> int:
+        payload = {"message": {"message_id": str(message_id), "chat": {"id": "flood"}, "text": text}}
+        return client.post("/receiveUpdate", json=payload).status_code
+
+    assert [_post(0), _post(0), _post(0), _post(1)] == [200, 200, 200, 200]
+    assert limiter.stats()["allowed"] == 2
+    assert _post(2) == 429
+    # the chat is out of tokens, but moderating it must still get through
+    assert _post(3, "/ban u1") == 200
+    assert limiter.stats()["allowed"] == 3
+    # ...but not past the global ceiling
+    ceiling = KeyedRateLimiter(chat_per_minute=60, sender_per_minute=60, global_per_minute=60, global_burst=1)
+    assert ceiling.check("c1", "u1") is None
+    assert ceiling.check("c2", "u2", keyed=False) == "global"
+    response = client.post("/receiveUpdates", json=[{"message": {"message_id": "1", "chat": {"id": "flood"}}}])
+    assert response.json()["results"] == ["duplicate"]
+    assert queue.size() == 3
+
+
+def test_batch_endpoint_charges_the_rate_limit_per_update(tmp_path) -> None:
+    queue = JobQueue(max_size=100, deduplicator=Deduplicator(60))
+    app = FastAPI()
+    app.state.queue = queue
+    app.include_router(build_router(settings=_Settings(), rate_limiter=RateLimiter(5)))
+    client = TestClient(app)
+
+    def _batch(*message_ids: int) -> list[dict]:
+        return [{"message": {"message_id": str(idx), "chat": {"id": "c1"}}} for idx in message_ids]
+
+    assert client.post("/receiveUpdates", json=_batch(1, 2, 3)).status_code == 200
+    # two slots left: a batch of three is refused as a whole, one of two still fits
+    assert client.post("/receiveUpdates", json=_batch(4, 5, 6)).status_code == 429
+    assert client.post("/receiveUpdates", json=_batch(4, 5)).status_code == 200
+    assert client.post("/receiveUpdate", json=_batch(6)[0]).status_code == 429
+    # larger than the whole allowance: no retry could succeed, so it is refused as too large
+    assert client.post("/receiveUpdates", json=_batch(*range(10, 16))).status_code == 413
+
+    shared = RateLimiter(5, shared=SharedStateTable(tmp_path / "state.bin", slots=64))
+    assert [shared.allow(3), shared.allow(3), shared.allow(2), shared.allow()] == [True, False, True, False]